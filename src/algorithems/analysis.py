@@ -1,12 +1,17 @@
-from decimal import Decimal
-from typing import Any, Optional
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from typing import Any, NamedTuple, Optional, Union
 from numpy import Infinity
 import numpy as np
 from numpy import ndarray as NDArray
 
-from consts.algorithem_consts import ANALYSIS_GAP
+from consts.algorithem_consts import (
+    ANALYSIS_ENGINE,
+    ANALYSIS_GAP,
+    MAX_RATIO_GRID_CHUNK_SIZE,
+)
 from consts.trading_consts import MAX_STOP_LOSS
 from models.evaluation import EvaluationResults
+from models.evaluation_table import EvaluationTable
 from utils.math_utils import D
 
 possible_profits = [
@@ -16,6 +21,34 @@ possible_profits = [
 ]
 
 
+class PackedResults(NamedTuple):
+    """Extremum sequences of a group packed for the numpy engine.
+
+    `highs` and `lows` are padded (evaluations x extremums) arrays holding the
+    running max / min of every sequence in whole ANALYSIS_GAP ticks (rounded
+    down / up so comparisons against tick thresholds stay exact), and `last`
+    holds the last extremum of every sequence as given.
+    """
+
+    highs: NDArray[Any, Any]
+    lows: NDArray[Any, Any]
+    last: list[Decimal]
+
+
+class RatioStats(NamedTuple):
+    """Sufficient statistics of a group for every ratio_grid pair.
+
+    Per pair: how many of the group's evaluations hit the target profit first,
+    how many hit the stop loss first, and the float sum of the last extremum
+    of the rest. Stats of disjoint evaluations add up.
+    """
+
+    evaluations_count: int
+    target_hits: NDArray[Any, Any]
+    stop_hits: NDArray[Any, Any]
+    last_sums: NDArray[Any, Any]
+
+
 def get_profit_for_ratio(
     target_profit: Decimal, stop_loss: Decimal, evaluation_result: list[Decimal]
 ) -> Decimal:
@@ -63,11 +96,292 @@ def get_possible_stop_losses(target_profit: Decimal) -> NDArray[Any, Any]:
         )
 
 
-def get_best_ratio(
+def _to_ticks(value: Decimal, rounding: str) -> int:
+    return int((Decimal(value) / ANALYSIS_GAP).to_integral_value(rounding=rounding))
+
+
+ratio_grid: list[tuple[Decimal, Decimal]] = [
+    (target_profit, stop_loss)
+    for target_profit in possible_profits
+    for stop_loss in get_possible_stop_losses(target_profit)
+]
+_grid_target_ticks = np.array(
+    [_to_ticks(target, ROUND_FLOOR) for target, _ in ratio_grid]
+)
+_grid_stop_ticks = np.array([_to_ticks(stop, ROUND_FLOOR) for _, stop in ratio_grid])
+_grid_is_long = np.array([target > 0 for target, _ in ratio_grid])
+_lowest_tick = int(min(_grid_target_ticks.min(), _grid_stop_ticks.min()))
+_highest_tick = int(max(_grid_target_ticks.max(), _grid_stop_ticks.max()))
+_levels_count = _highest_tick - _lowest_tick + 1
+# Columns of the hits table: the first `_levels_count` columns are "running max
+# reached the level", the rest are "running min reached the level".
+_grid_target_columns = np.where(
+    _grid_is_long,
+    _grid_target_ticks - _lowest_tick,
+    _levels_count + _grid_target_ticks - _lowest_tick,
+)
+_grid_stop_columns = np.where(
+    _grid_is_long,
+    _levels_count + _grid_stop_ticks - _lowest_tick,
+    _grid_stop_ticks - _lowest_tick,
+)
+_grid_target_gains = np.array(
+    [float(target if target > 0 else 0 - target) for target, _ in ratio_grid]
+)
+_grid_stop_gains = np.array(
+    [float(stop if stop < 0 else 0 - stop) for _, stop in ratio_grid]
+)
+
+
+def pack_evaluation_results(
     evaluation_results: list[EvaluationResults],
-) -> Optional[dict[str, Decimal]]:
-    if len(evaluation_results) == 0:
-        return None
+) -> PackedResults:
+    width = max(len(result.data) for result in evaluation_results)
+    highs = np.empty((len(evaluation_results), width), dtype=np.int64)
+    lows = np.empty((len(evaluation_results), width), dtype=np.int64)
+    for index, result in enumerate(evaluation_results):
+        length = len(result.data)
+        highs[index, :length] = [_to_ticks(value, ROUND_FLOOR) for value in result.data]
+        lows[index, :length] = [
+            _to_ticks(value, ROUND_CEILING) for value in result.data
+        ]
+        # Pad with the last value so the running extremes stay unchanged.
+        highs[index, length:] = highs[index, length - 1]
+        lows[index, length:] = lows[index, length - 1]
+
+    return PackedResults(
+        highs=np.maximum.accumulate(highs, axis=1),
+        lows=np.minimum.accumulate(lows, axis=1),
+        last=[result.data[-1] for result in evaluation_results],
+    )
+
+
+# ANALYSIS_GAP is 1 / _ticks_per_unit, so tick k is the float k / _ticks_per_unit.
+_ticks_per_unit = int(1 / ANALYSIS_GAP)
+
+
+def _to_floor_ticks(values: NDArray[Any, Any]) -> NDArray[Any, Any]:
+    """_to_ticks(Decimal(repr(value)), ROUND_FLOOR) of every float value.
+
+    Doubles have disjoint rounding intervals, so a value's shortest repr
+    reaches tick k exactly when the value reaches the double nearest to k;
+    the float estimate is corrected against those doubles.
+    """
+    ticks = np.floor(values * _ticks_per_unit)
+    ticks -= values < ticks / _ticks_per_unit
+    ticks += values >= (ticks + 1) / _ticks_per_unit
+    floor_ticks: NDArray[Any, Any] = ticks.astype(np.int64)
+    return floor_ticks
+
+
+def _to_ceiling_ticks(values: NDArray[Any, Any]) -> NDArray[Any, Any]:
+    ticks = np.ceil(values * _ticks_per_unit)
+    ticks += values > ticks / _ticks_per_unit
+    ticks -= values <= (ticks - 1) / _ticks_per_unit
+    ceiling_ticks: NDArray[Any, Any] = ticks.astype(np.int64)
+    return ceiling_ticks
+
+
+def pack_evaluation_table(table: EvaluationTable) -> PackedResults:
+    """pack_evaluation_results of a table, without a Decimal per extremum."""
+    lengths = table.get_lengths()
+    # Rows shorter than the widest repeat their last value as padding.
+    positions = table.offsets[:-1, None] + np.minimum(
+        np.arange(lengths.max()), lengths[:, None] - 1
+    )
+    values = table.values[positions]
+    return PackedResults(
+        highs=np.maximum.accumulate(_to_floor_ticks(values), axis=1),
+        lows=np.minimum.accumulate(_to_ceiling_ticks(values), axis=1),
+        last=[Decimal(repr(last)) for last in table.get_lasts().tolist()],
+    )
+
+
+def pack_evaluations(
+    evaluations: Union[list[EvaluationResults], EvaluationTable]
+) -> PackedResults:
+    if isinstance(evaluations, EvaluationTable):
+        return pack_evaluation_table(evaluations)
+    return pack_evaluation_results(evaluations)
+
+
+def _get_first_hits(
+    running: NDArray[Any, Any], levels: Optional[NDArray[Any, Any]] = None
+) -> NDArray[Any, Any]:
+    """Index of the first element reaching every tick level, per row.
+
+    `levels` are offsets from the lowest tick, all of them by default. Rows of
+    `running` must be non-decreasing. The rows are clipped to the level range
+    and shifted into disjoint bands so one searchsorted call covers them all.
+    Levels that are never reached get the row width.
+    """
+    if levels is None:
+        levels = np.arange(_levels_count, dtype=np.int64)
+    rows, width = running.shape
+    span = _levels_count + 2
+    row_indexes: NDArray[Any, Any] = np.arange(rows, dtype=np.int64)[:, None]
+    shifted = np.clip(running, _lowest_tick - 1, _highest_tick + 1) - (_lowest_tick - 1)
+    flat = (shifted + row_indexes * span).ravel()
+    queries = (levels + 1)[None, :] + row_indexes * span
+    hits: NDArray[Any, Any] = np.searchsorted(flat, queries.ravel(), side="left")
+    first_hits: NDArray[Any, Any] = hits.reshape(rows, len(levels))
+    first_hits -= row_indexes * width
+    return first_hits
+
+
+def _get_mirrored_lows(packed: PackedResults) -> NDArray[Any, Any]:
+    """The running min mirrored so it is non-decreasing, level k of it being
+    level `_levels_count - 1 - k` of the lows."""
+    mirrored: NDArray[Any, Any] = 0 - packed.lows + _lowest_tick + _highest_tick
+    return mirrored
+
+
+def _get_hits_table(packed: PackedResults) -> NDArray[Any, Any]:
+    highs_hits = _get_first_hits(packed.highs)
+    lows_hits = _get_first_hits(_get_mirrored_lows(packed))[:, ::-1]
+    return np.concatenate([highs_hits, lows_hits], axis=1)
+
+
+def _get_hits_columns(
+    packed: PackedResults, columns: NDArray[Any, Any]
+) -> NDArray[Any, Any]:
+    """`columns` of the hits table, without working out the others."""
+    is_high = columns < _levels_count
+    hits = np.empty((len(packed.last), len(columns)), dtype=np.int64)
+    hits[:, is_high] = _get_first_hits(packed.highs, columns[is_high])
+    hits[:, ~is_high] = _get_first_hits(
+        _get_mirrored_lows(packed), 2 * _levels_count - 1 - columns[~is_high]
+    )
+    return hits
+
+
+def _get_outcomes(
+    target_hits: NDArray[Any, Any], stop_hits: NDArray[Any, Any]
+) -> tuple[NDArray[Any, Any], NDArray[Any, Any]]:
+    return target_hits < stop_hits, stop_hits < target_hits
+
+
+def _get_exact_average(
+    packed: PackedResults,
+    target_hits: NDArray[Any, Any],
+    stop_hits: NDArray[Any, Any],
+    pair_index: int,
+) -> Decimal:
+    """The pair's average over `packed`, given the first hits of its target
+    and stop levels per row."""
+    target_profit, stop_loss = ratio_grid[pair_index]
+    target_first, stop_first = _get_outcomes(target_hits, stop_hits)
+    target_gain = target_profit if target_profit > 0 else 0 - target_profit
+    stop_gain = stop_loss if stop_loss < 0 else 0 - stop_loss
+    profits: list[Decimal] = [
+        (target_gain if target_first[row] else stop_gain if stop_first[row] else last)
+        for row, last in enumerate(packed.last)
+    ]
+    return D(sum(profits) / len(profits))
+
+
+def _get_ratio_stats(packed: PackedResults, hits: NDArray[Any, Any]) -> RatioStats:
+    rows = len(packed.last)
+    last = np.array([float(value) for value in packed.last])
+    chunk_size = max(1, MAX_RATIO_GRID_CHUNK_SIZE // rows)
+    target_hits = np.empty(len(ratio_grid), dtype=np.int64)
+    stop_hits = np.empty(len(ratio_grid), dtype=np.int64)
+    last_sums = np.empty(len(ratio_grid))
+    for start in range(0, len(ratio_grid), chunk_size):
+        pair_indexes = np.arange(start, min(start + chunk_size, len(ratio_grid)))
+        target_first, stop_first = _get_outcomes(
+            hits[:, _grid_target_columns[pair_indexes]],
+            hits[:, _grid_stop_columns[pair_indexes]],
+        )
+        target_hits[pair_indexes] = target_first.sum(axis=0)
+        stop_hits[pair_indexes] = stop_first.sum(axis=0)
+        last_sums[pair_indexes] = last @ ~(target_first | stop_first)
+    return RatioStats(rows, target_hits, stop_hits, last_sums)
+
+
+def get_ratio_stats(packed: PackedResults) -> RatioStats:
+    return _get_ratio_stats(packed, _get_hits_table(packed))
+
+
+def merge_ratio_stats(stats: RatioStats, other: RatioStats) -> RatioStats:
+    return RatioStats(
+        stats.evaluations_count + other.evaluations_count,
+        stats.target_hits + other.target_hits,
+        stats.stop_hits + other.stop_hits,
+        stats.last_sums + other.last_sums,
+    )
+
+
+def _get_candidate_pairs(stats: RatioStats) -> NDArray[Any, Any]:
+    averages = (
+        stats.target_hits * _grid_target_gains
+        + stats.stop_hits * _grid_stop_gains
+        + stats.last_sums
+    ) / stats.evaluations_count
+    # Averages are quantized to PRECISION decimals, so every pair within one
+    # quantum of the float maximum may win; those are scored exactly.
+    candidates: NDArray[Any, Any] = np.flatnonzero(
+        averages >= averages.max() - 1e-4 - 1e-9
+    )
+    return candidates
+
+
+def get_best_ratio_packed(packed: PackedResults) -> dict[str, Decimal]:
+    hits = _get_hits_table(packed)
+    return get_best_average(
+        [
+            {
+                "target_profit": ratio_grid[pair_index][0],
+                "stop_loss": ratio_grid[pair_index][1],
+                "average": _get_exact_average(
+                    packed,
+                    hits[:, _grid_target_columns[pair_index]],
+                    hits[:, _grid_stop_columns[pair_index]],
+                    pair_index,
+                ),
+            }
+            for pair_index in _get_candidate_pairs(_get_ratio_stats(packed, hits))
+        ]
+    )
+
+
+def get_best_ratio_from_stats(
+    stats: RatioStats, table: EvaluationTable
+) -> dict[str, Decimal]:
+    """Best ratio of a group from its accumulated stats.
+
+    Only the few pairs the float averages can't separate are rescored exactly
+    over `table`, the group's evaluations the stats were built from, and only
+    their target and stop levels are searched for.
+    """
+    packed = pack_evaluation_table(table)
+    candidates = _get_candidate_pairs(stats)
+    columns = np.unique(
+        np.concatenate(
+            [_grid_target_columns[candidates], _grid_stop_columns[candidates]]
+        )
+    )
+    hits = _get_hits_columns(packed, columns)
+    return get_best_average(
+        [
+            {
+                "target_profit": ratio_grid[pair_index][0],
+                "stop_loss": ratio_grid[pair_index][1],
+                "average": _get_exact_average(
+                    packed,
+                    hits[:, np.searchsorted(columns, _grid_target_columns[pair_index])],
+                    hits[:, np.searchsorted(columns, _grid_stop_columns[pair_index])],
+                    pair_index,
+                ),
+            }
+            for pair_index in candidates
+        ]
+    )
+
+
+def _get_best_ratio_decimal(
+    evaluation_results: list[EvaluationResults],
+) -> dict[str, Decimal]:
     averages: list[dict[str, Decimal]] = []
     for target_profit in possible_profits:
         for stop_loss in get_possible_stop_losses(target_profit):
@@ -89,3 +403,18 @@ def get_best_ratio(
 
     best_average = get_best_average(averages)
     return best_average
+
+
+def get_best_ratio(
+    evaluation_results: Union[list[EvaluationResults], EvaluationTable],
+    engine: str = ANALYSIS_ENGINE,
+) -> Optional[dict[str, Decimal]]:
+    if len(evaluation_results) == 0:
+        return None
+    if engine == "decimal":
+        if isinstance(evaluation_results, EvaluationTable):
+            evaluation_results = evaluation_results.to_results()
+        return _get_best_ratio_decimal(evaluation_results)
+    if engine == "numpy":
+        return get_best_ratio_packed(pack_evaluations(evaluation_results))
+    raise ValueError(f"Unknown analysis engine: {engine}")
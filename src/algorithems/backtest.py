@@ -0,0 +1,160 @@
+from typing import Any, NamedTuple
+import numpy as np
+from numpy import ndarray as NDArray
+from pandas import DataFrame
+
+# Exit reasons of simulated trades.
+NOT_FILLED = 0
+TARGET_PROFIT_EXIT = 1
+STOP_LOSS_EXIT = 2
+WINDOW_END_EXIT = 3
+
+
+class StackedBars(NamedTuple):
+    """Bars of many evaluations as (evaluations x bars) float arrays, padded
+    with NaN past every evaluation's `lengths`."""
+
+    open: NDArray[Any, Any]
+    high: NDArray[Any, Any]
+    low: NDArray[Any, Any]
+    close: NDArray[Any, Any]
+    lengths: NDArray[Any, Any]
+
+
+class BracketArrays(NamedTuple):
+    """One bracket order per evaluation, `is_placed` False where no order was
+    placed (the other fields are then ignored)."""
+
+    is_placed: NDArray[Any, Any]
+    is_long: NDArray[Any, Any]
+    quantity: NDArray[Any, Any]
+    price_limit: NDArray[Any, Any]
+    target_profit: NDArray[Any, Any]
+    stop_loss: NDArray[Any, Any]
+
+
+class SimulatedTrades(NamedTuple):
+    exit_reason: NDArray[Any, Any]
+    entry_price: NDArray[Any, Any]
+    exit_price: NDArray[Any, Any]
+    pnl: NDArray[Any, Any]
+
+
+def stack_bars(dfs: list[DataFrame]) -> StackedBars:
+    lengths = np.array([len(df) for df in dfs], dtype=np.int64)
+    width = int(lengths.max()) if len(dfs) > 0 else 0
+    columns = {}
+    for column in ["open", "high", "low", "close"]:
+        stacked = np.full((len(dfs), width), np.nan)
+        for index, df in enumerate(dfs):
+            stacked[index, : len(df)] = df[column].to_numpy(dtype=np.float64)
+        columns[column] = stacked
+    return StackedBars(lengths=lengths, **columns)
+
+
+def _get_first_true(mask: NDArray[Any, Any]) -> NDArray[Any, Any]:
+    """Column of the first True in every row, the row width where there is none."""
+    first: NDArray[Any, Any] = np.where(
+        mask.any(axis=1), mask.argmax(axis=1), mask.shape[1]
+    )
+    return first
+
+
+def _get_at(values: NDArray[Any, Any], columns: NDArray[Any, Any]) -> NDArray[Any, Any]:
+    columns = np.minimum(columns, values.shape[1] - 1)[:, None]
+    at: NDArray[Any, Any] = np.take_along_axis(values, columns, axis=1)[:, 0]
+    return at
+
+
+def simulate_brackets(
+    bars: StackedBars,
+    brackets: BracketArrays,
+    signal_index: int,
+    commission_per_share: float,
+) -> SimulatedTrades:
+    """Replays bracket orders sent at the close of bar `signal_index`.
+
+    The parent limit fills on the first later bar trading through its limit,
+    at the open if that is better. Children only work from the bar after the
+    fill: the take profit fills at its limit (or a better open), the stop at
+    its price (or a worse open), and a bar touching both counts as stopped out
+    since the order within the bar is unknown. Positions still open when the
+    bars run out are closed at the last close.
+    """
+    rows, width = bars.close.shape
+    columns = np.arange(width)[None, :]
+    is_long = brackets.is_long[:, None]
+    tradable = (columns > signal_index) & (columns < bars.lengths[:, None])
+
+    entry_hits = tradable & np.where(
+        is_long,
+        bars.low <= brackets.price_limit[:, None],
+        bars.high >= brackets.price_limit[:, None],
+    )
+    fill_column = _get_first_true(entry_hits)
+    is_filled = brackets.is_placed & (fill_column < width)
+    fill_open = _get_at(bars.open, fill_column)
+    entry_price = np.where(
+        brackets.is_long,
+        np.minimum(fill_open, brackets.price_limit),
+        np.maximum(fill_open, brackets.price_limit),
+    )
+
+    working = tradable & (columns > fill_column[:, None])
+    target_column = _get_first_true(
+        working
+        & np.where(
+            is_long,
+            bars.high >= brackets.target_profit[:, None],
+            bars.low <= brackets.target_profit[:, None],
+        )
+    )
+    stop_column = _get_first_true(
+        working
+        & np.where(
+            is_long,
+            bars.low <= brackets.stop_loss[:, None],
+            bars.high >= brackets.stop_loss[:, None],
+        )
+    )
+    is_stopped = stop_column <= target_column
+    is_stopped &= stop_column < width
+    is_targeted = target_column < stop_column
+
+    target_open = _get_at(bars.open, target_column)
+    stop_open = _get_at(bars.open, stop_column)
+    last_close = _get_at(bars.close, np.maximum(bars.lengths - 1, 0))
+    exit_price = np.select(
+        [is_targeted, is_stopped],
+        [
+            np.where(
+                brackets.is_long,
+                np.maximum(target_open, brackets.target_profit),
+                np.minimum(target_open, brackets.target_profit),
+            ),
+            np.where(
+                brackets.is_long,
+                np.minimum(stop_open, brackets.stop_loss),
+                np.maximum(stop_open, brackets.stop_loss),
+            ),
+        ],
+        last_close,
+    )
+    exit_reason = np.select(
+        [~is_filled, is_targeted, is_stopped],
+        [NOT_FILLED, TARGET_PROFIT_EXIT, STOP_LOSS_EXIT],
+        WINDOW_END_EXIT,
+    )
+    direction = np.where(brackets.is_long, 1.0, -1.0)
+    pnl = np.where(
+        is_filled,
+        (exit_price - entry_price) * direction * brackets.quantity
+        - 2 * commission_per_share * brackets.quantity,
+        0.0,
+    )
+    return SimulatedTrades(
+        exit_reason=exit_reason,
+        entry_price=np.where(is_filled, entry_price, np.nan),
+        exit_price=np.where(is_filled, exit_price, np.nan),
+        pnl=pnl,
+    )
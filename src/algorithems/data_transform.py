@@ -1,5 +1,8 @@
 from decimal import Decimal
 import math
+from typing import Any
+import numpy as np
+from numpy import ndarray as NDArray
 from pandas import DataFrame
 
 from consts.time_consts import BAR_SIZE_SECONDS, HOURS_FROM_START, SECONDS_FROM_END
@@ -10,7 +13,7 @@ def get_change_percentage(a: Decimal, b: Decimal) -> Decimal:
     return (a / b) - 1
 
 
-def _get_extremums(df: DataFrame, original_price: Decimal) -> list[Decimal]:
+def _get_extremums_iterrows(df: DataFrame, original_price: Decimal) -> list[Decimal]:
     extremums: list[Decimal] = [original_price]
     for _, row in df.iterrows():
         if row["low"] < original_price and row["low"] < extremums[-1]:
@@ -33,14 +36,78 @@ def _get_extremums(df: DataFrame, original_price: Decimal) -> list[Decimal]:
     return extremums[1:]
 
 
-def get_extremums(df: DataFrame) -> list[Decimal]:
-    starting_index = math.floor(
+def _get_extremums_batch(
+    lows: list[NDArray[Any, Any]],
+    highs: list[NDArray[Any, Any]],
+    lasts: list[Any],
+    original_prices: list[Any],
+) -> list[list[Decimal]]:
+    """Same extremums as _get_extremums_iterrows for many bar sequences at once.
+
+    Every bar is a "low below the original price" event followed by a "high
+    above it" event, keeping only the events that happened. The loop's last
+    extremum only moves within a run of same-side events and a new one starts
+    when the side flips, so the extremums are the min / max of every run.
+    """
+    lengths = np.array([len(low) for low in lows], dtype=np.int64)
+    values = np.empty(2 * int(lengths.sum()), dtype=np.result_type(*lows, *highs))
+    values[0::2] = np.concatenate(lows)
+    values[1::2] = np.concatenate(highs)
+    is_high = np.tile([False, True], int(lengths.sum()))
+    segments = np.repeat(np.arange(len(lows)), 2 * lengths)
+    prices = np.array(original_prices)[segments]
+
+    happened = np.where(is_high, values > prices, values < prices)
+    values = values[happened]
+    is_high = is_high[happened]
+    segments = segments[happened]
+    prices = prices[happened]
+
+    run_starts = np.flatnonzero(
+        np.concatenate(
+            [
+                np.ones(min(len(values), 1), dtype=bool),
+                (is_high[1:] != is_high[:-1]) | (segments[1:] != segments[:-1]),
+            ]
+        )
+    )
+    if len(run_starts) > 0:
+        run_values = np.where(
+            is_high[run_starts],
+            np.maximum.reduceat(values, run_starts),
+            np.minimum.reduceat(values, run_starts),
+        )
+        run_changes = run_values / prices[run_starts] - 1
+    else:
+        run_changes = values
+    run_counts = np.bincount(segments[run_starts], minlength=len(lows))
+    return [
+        changes.tolist() + [get_change_percentage(last, original_price)]
+        for changes, last, original_price in zip(
+            np.split(run_changes, np.cumsum(run_counts)[:-1]), lasts, original_prices
+        )
+    ]
+
+
+def get_starting_index() -> int:
+    """Index of the bar closing when the article was published."""
+    return math.floor(
         (SECONDS_FROM_END - hours_to_seconds(HOURS_FROM_START)) / BAR_SIZE_SECONDS
     )
-    original_price = df.iloc[starting_index]["close"]
-    sliced_df = df.iloc[starting_index + 1 :]
-    sliced_df.reset_index()
 
-    extremums = _get_extremums(sliced_df, original_price)
 
-    return extremums
+def get_extremums_batch(dfs: list[DataFrame]) -> list[list[Decimal]]:
+    if len(dfs) == 0:
+        return []
+    starting_index = get_starting_index()
+    sliced_dfs = [df.iloc[starting_index + 1 :] for df in dfs]
+    return _get_extremums_batch(
+        [df["low"].to_numpy() for df in sliced_dfs],
+        [df["high"].to_numpy() for df in sliced_dfs],
+        [df["close"].iloc[-1] for df in sliced_dfs],
+        [df["close"].iloc[starting_index] for df in dfs],
+    )
+
+
+def get_extremums(df: DataFrame) -> list[Decimal]:
+    return get_extremums_batch([df])[0]
@@ -0,0 +1,362 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from queue import Queue
+import socket
+import struct
+from threading import Lock, Thread
+import time
+from typing import Any, BinaryIO, Callable, NamedTuple, Optional
+from ibapi.common import BarData
+from ibapi.message import IN, OUT
+from ibapi.server_versions import MIN_SERVER_VER_REPLACE_FA_END
+
+from consts.time_consts import BAR_SIZE_SECONDS, HISTORICAL_DATA_BARS_CAPACITY
+from ib.app import IBapi  # type: ignore
+from utils.rate_utils import TokenBucket
+
+# Replies are encoded as this server version, any ibapi from 9.81 on accepts it.
+SERVER_VERSION = MIN_SERVER_VER_REPLACE_FA_END
+ACCOUNT = "DU0000000"
+PACING_VIOLATION_CODE = 162
+# Account summary tags the "$LEDGER" group expands to.
+LEDGER_TAGS = ("CashBalance", "NetLiquidationByCurrency")
+DEFAULT_PRICE = 100.0
+
+
+class PlacedOrder(NamedTuple):
+    order_id: int
+    symbol: str
+    action: str
+    quantity: str
+    order_type: str
+    limit_price: str
+    aux_price: str
+    transmit: bool
+    parent_id: int
+
+
+def get_canned_bars(count: int = HISTORICAL_DATA_BARS_CAPACITY) -> list[BarData]:
+    """5 second bars of a window ending at 09:32, swinging around 100."""
+    start = datetime(2024, 1, 2, 9, 32) - timedelta(seconds=count * BAR_SIZE_SECONDS)
+    bars: list[BarData] = []
+    for index in range(count):
+        close = 100 + (index % 40 - 20) / 100
+        bar = BarData()
+        bar.date = f"{start + timedelta(seconds=index * BAR_SIZE_SECONDS):%Y%m%d %H:%M:%S} US/Eastern"
+        bar.open = close
+        bar.high = round(close + 0.05, 2)
+        bar.low = round(close - 0.05, 2)
+        bar.close = close
+        bar.volume = 100
+        bar.average = close
+        bar.barCount = 10
+        bars.append(bar)
+    return bars
+
+
+def make_message(*fields: Any) -> bytes:
+    payload = "".join(f"{field}\0" for field in fields).encode("ascii")
+    return struct.pack("!I", len(payload)) + payload
+
+
+def _read_message(stream: BinaryIO) -> Optional[list[str]]:
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    payload = stream.read(struct.unpack("!I", header)[0])
+    return payload.decode("ascii").split("\0")[:-1]
+
+
+class FakeTWSServer:
+    """A localhost TWS speaking enough of the API wire protocol for IBapi.
+
+    Covers the handshake and nextValidId, reqHistoricalData with canned
+    bars, reqMktData, reqAccountSummary, reqPositions and placeOrder with
+    orderStatus replies. Every reply is sent `latency` seconds after its
+    request, and historical data requests the `historical_data_pacing`
+    bucket refuses get a pacing violation error.
+    """
+
+    latency: float
+    bars: list[BarData]
+    prices: dict[str, float]
+    account_summary: dict[str, str]
+    historical_data_pacing: Optional[TokenBucket]
+    fill_orders: bool
+    next_order_id: int
+    orders: dict[int, PlacedOrder]
+    request_counts: Counter[int]
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        bars: Optional[list[BarData]] = None,
+        prices: Optional[dict[str, float]] = None,
+        account_summary: Optional[dict[str, str]] = None,
+        historical_data_pacing: Optional[TokenBucket] = None,
+        fill_orders: bool = True,
+        next_order_id: int = 1,
+    ) -> None:
+        self.latency = latency
+        self.bars = get_canned_bars() if bars is None else bars
+        self.prices = prices or {}
+        self.account_summary = account_summary or {
+            "NetLiquidation": "100000",
+            "BuyingPower": "400000",
+            "CashBalance": "100000",
+        }
+        self.historical_data_pacing = historical_data_pacing
+        self.fill_orders = fill_orders
+        self.next_order_id = next_order_id
+        self.orders = {}
+        self.request_counts = Counter()
+        self.lock = Lock()
+        # The bars part of every historical data reply is the same.
+        self._bars_fields = "".join(
+            f"{bar.date}\0{bar.open}\0{bar.high}\0{bar.low}\0{bar.close}\0"
+            f"{bar.volume}\0{bar.average}\0{bar.barCount}\0"
+            for bar in self.bars
+        ).encode("ascii")
+        self._untransmitted: dict[int, list[PlacedOrder]] = {}
+        self._handlers: dict[int, Callable[[list[str], Queue[Any]], None]] = {
+            OUT.START_API: self._start_api,
+            OUT.REQ_IDS: self._req_ids,
+            OUT.REQ_HISTORICAL_DATA: self._req_historical_data,
+            OUT.REQ_MKT_DATA: self._req_mkt_data,
+            OUT.REQ_ACCOUNT_SUMMARY: self._req_account_summary,
+            OUT.REQ_POSITIONS: self._req_positions,
+            OUT.PLACE_ORDER: self._place_order,
+        }
+        self.socket = socket.create_server(("127.0.0.1", 0))
+        self.port: int = self.socket.getsockname()[1]
+        self._connections: list[socket.socket] = []
+        self._accept_thread = Thread(target=self._accept, daemon=True)
+
+    def start(self) -> "FakeTWSServer":
+        self._accept_thread.start()
+        return self
+
+    def stop(self) -> None:
+        # Shutting the socket down wakes the accept thread, closing doesn't.
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+        with self.lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+    def __enter__(self) -> "FakeTWSServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self._connections.append(connection)
+            Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: socket.socket) -> None:
+        replies = Queue[Any]()
+        Thread(target=self._send, args=(connection, replies), daemon=True).start()
+        stream = connection.makefile("rb")
+        try:
+            if stream.read(4) != b"API\0" or _read_message(stream) is None:
+                return
+            replies.put(
+                (
+                    0.0,
+                    make_message(
+                        SERVER_VERSION, f"{datetime.now():%Y%m%d %H:%M:%S} EST"
+                    ),
+                )
+            )
+            while True:
+                fields = _read_message(stream)
+                if fields is None:
+                    return
+                message_id = int(fields[0])
+                with self.lock:
+                    self.request_counts[message_id] += 1
+                handler = self._handlers.get(message_id)
+                if handler is not None:
+                    handler(fields, replies)
+        except OSError:
+            return
+        finally:
+            replies.put(None)
+            stream.close()
+
+    def _send(self, connection: socket.socket, replies: Queue[Any]) -> None:
+        """Sends replies once they're due, batching the ones already due."""
+        while True:
+            reply = replies.get()
+            if reply is None:
+                return
+            due_time, message = reply
+            delay = due_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            messages = [message]
+            while not replies.empty():
+                reply = replies.queue[0]
+                if reply is None or reply[0] > time.monotonic():
+                    break
+                messages.append(replies.get()[1])
+            try:
+                connection.sendall(b"".join(messages))
+            except OSError:
+                return
+
+    def _reply(self, replies: Queue[Any], *messages: bytes) -> None:
+        due_time = time.monotonic() + self.latency
+        for message in messages:
+            replies.put((due_time, message))
+
+    def _start_api(self, fields: list[str], replies: Queue[Any]) -> None:
+        self._reply(
+            replies,
+            make_message(IN.NEXT_VALID_ID, 1, self.next_order_id),
+            make_message(IN.MANAGED_ACCTS, 1, ACCOUNT),
+        )
+
+    def _req_ids(self, fields: list[str], replies: Queue[Any]) -> None:
+        self._reply(replies, make_message(IN.NEXT_VALID_ID, 1, self.next_order_id))
+
+    def _req_historical_data(self, fields: list[str], replies: Queue[Any]) -> None:
+        req_id = fields[1]
+        if (
+            self.historical_data_pacing is not None
+            and not self.historical_data_pacing.try_acquire()
+        ):
+            self._reply(
+                replies,
+                make_message(
+                    IN.ERR_MSG,
+                    2,
+                    req_id,
+                    PACING_VIOLATION_CODE,
+                    "Historical Market Data Service error message:"
+                    "API historical data query cancelled: pacing violation",
+                ),
+            )
+            return
+        start = self.bars[0].date if len(self.bars) > 0 else ""
+        end = self.bars[-1].date if len(self.bars) > 0 else ""
+        header = make_message(IN.HISTORICAL_DATA, req_id, start, end, len(self.bars))
+        size = struct.unpack("!I", header[:4])[0] + len(self._bars_fields)
+        self._reply(replies, struct.pack("!I", size) + header[4:] + self._bars_fields)
+
+    def _req_mkt_data(self, fields: list[str], replies: Queue[Any]) -> None:
+        # msgId, version, reqId, conId, symbol, ..., snapshot at 17 for STK.
+        req_id, symbol, is_snapshot = fields[2], fields[4], fields[17] == "1"
+        price = self.prices.get(symbol, DEFAULT_PRICE)
+        messages = [
+            make_message(IN.TICK_PRICE, 6, req_id, tick_type, tick_price, 100, 0)
+            for tick_type, tick_price in [
+                (1, round(price - 0.01, 2)),
+                (2, price),
+                (4, price),
+            ]
+        ]
+        if is_snapshot:
+            messages.append(make_message(IN.TICK_SNAPSHOT_END, 1, req_id))
+        self._reply(replies, *messages)
+
+    def _req_account_summary(self, fields: list[str], replies: Queue[Any]) -> None:
+        req_id, tags = fields[2], fields[4].split(",")
+        if "$LEDGER" in tags:
+            tags += LEDGER_TAGS
+        self._reply(
+            replies,
+            *[
+                make_message(IN.ACCOUNT_SUMMARY, 1, req_id, ACCOUNT, tag, value, "USD")
+                for tag, value in self.account_summary.items()
+                if tag in tags
+            ],
+            make_message(IN.ACCOUNT_SUMMARY_END, 1, req_id),
+        )
+
+    def _req_positions(self, fields: list[str], replies: Queue[Any]) -> None:
+        self._reply(replies, make_message(IN.POSITION_END, 1))
+
+    def _place_order(self, fields: list[str], replies: Queue[Any]) -> None:
+        # msgId, orderId, contract (14 fields), then the main order fields.
+        order = PlacedOrder(
+            order_id=int(fields[1]),
+            symbol=fields[3],
+            action=fields[16],
+            quantity=fields[17],
+            order_type=fields[18],
+            limit_price=fields[19],
+            aux_price=fields[20],
+            transmit=fields[27] == "1",
+            parent_id=int(fields[28]),
+        )
+        with self.lock:
+            self.orders[order.order_id] = order
+            self.next_order_id = max(self.next_order_id, order.order_id + 1)
+            # Like TWS, a bracket is only sent once its last order transmits.
+            group_id = order.parent_id or order.order_id
+            group = self._untransmitted.setdefault(group_id, [])
+            group.append(order)
+            if not order.transmit:
+                return
+            del self._untransmitted[group_id]
+        messages = [self._get_order_status(placed, "Submitted") for placed in group]
+        if self.fill_orders:
+            messages += [
+                self._get_order_status(placed, "Filled")
+                for placed in group
+                if placed.parent_id == 0
+            ]
+        self._reply(replies, *messages)
+
+    def _get_order_status(self, order: PlacedOrder, status: str) -> bytes:
+        price = (
+            float(order.limit_price)
+            if order.limit_price
+            else self.prices.get(order.symbol, DEFAULT_PRICE)
+        )
+        is_filled = status == "Filled"
+        return make_message(
+            IN.ORDER_STATUS,
+            order.order_id,
+            status,
+            order.quantity if is_filled else 0,
+            0 if is_filled else order.quantity,
+            price if is_filled else 0,
+            order.order_id,
+            order.parent_id,
+            price if is_filled else 0,
+            0,
+            "",
+            0,
+        )
+
+
+def connect_app(server: FakeTWSServer, timeout: float = 5) -> tuple[IBapi, Thread]:
+    """An IBapi connected to the server, once it got its nextValidId."""
+    app = IBapi(Queue[Any]())
+    app.connect("127.0.0.1", server.port, 1)
+    thread = Thread(target=app.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while app.nextValidOrderId == 0:
+        if time.monotonic() > deadline:
+            raise TimeoutError("No nextValidId from the fake TWS")
+        time.sleep(0.01)
+    return app, thread
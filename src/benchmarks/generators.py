@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+from dateutil import tz
+from ibapi.common import BarData
+import numpy as np
+from numpy.random import Generator
+from pandas import DataFrame
+
+from consts.time_consts import (
+    BAR_SIZE_SECONDS,
+    HISTORICAL_DATA_BARS_CAPACITY,
+    TIMEZONE,
+)
+from ib.bars import BarsBuffer
+from models.evaluation import Evaluation, EvaluationResults
+
+# Bars of a window end two minutes after a 09:30 article.
+BARS_START = datetime(2024, 1, 2, 7, 30)
+SCORES = np.arange(-10, 10.5, 0.5)
+
+
+def get_generator(seed: int = 0) -> Generator:
+    return np.random.default_rng(seed)
+
+
+def get_bar_series(
+    rng: Generator, count: int = HISTORICAL_DATA_BARS_CAPACITY
+) -> list[BarData]:
+    """5 second bars of a random walk, as IB sends them to historicalData."""
+    closes = rng.uniform(5, 200) * np.exp(np.cumsum(rng.normal(0, 0.0008, count)))
+    opens = np.concatenate([closes[:1], closes[:-1]])
+    spreads = np.abs(rng.normal(0, 0.0004, (2, count))) * closes
+    highs = np.maximum(opens, closes) + spreads[0]
+    lows = np.minimum(opens, closes) - spreads[1]
+    volumes = rng.integers(0, 5000, count)
+    bars: list[BarData] = []
+    for index in range(count):
+        bar = BarData()
+        date = BARS_START + timedelta(seconds=index * BAR_SIZE_SECONDS)
+        bar.date = f"{date:%Y%m%d %H:%M:%S} {TIMEZONE}"
+        bar.open = round(float(opens[index]), 2)
+        bar.high = round(float(highs[index]), 2)
+        bar.low = round(float(lows[index]), 2)
+        bar.close = round(float(closes[index]), 2)
+        bar.volume = Decimal(int(volumes[index]))
+        bar.barCount = int(volumes[index] // 50)
+        bar.average = round(float((highs[index] + lows[index]) / 2), 2)
+        bars.append(bar)
+    return bars
+
+
+def get_bars_df(bars: list[BarData]) -> DataFrame:
+    buffer = BarsBuffer(bars[0], len(bars))
+    for bar in bars:
+        buffer.append(bar)
+    return buffer.to_df()
+
+
+def get_extremums_list(rng: Generator) -> list[Any]:
+    """Extremums as _get_extremums_batch gives them: alternating changes in
+    percent ending with the change to the last close."""
+    count = int(rng.integers(1, 40))
+    changes = np.abs(rng.normal(0, 0.02, count))
+    changes[int(rng.integers(0, 2)) :: 2] *= -1
+    return [Decimal(repr(round(float(change), 6))) for change in changes]
+
+
+def get_evaluations_raw_data(rng: Generator, count: int) -> list[EvaluationResults]:
+    time_zone = tz.gettz(TIMEZONE)
+    return [
+        EvaluationResults(
+            data=get_extremums_list(rng),
+            evaluation=Evaluation(
+                datetime=datetime(2024, 1, 2, 9, 30, tzinfo=time_zone)
+                + timedelta(minutes=index),
+                score=Decimal(repr(float(rng.choice(SCORES)))),
+                symbol=f"S{int(rng.integers(0, 500))}",
+                url=f"https://www.example.com/{index}",
+            ),
+        )
+        for index in range(count)
+    ]
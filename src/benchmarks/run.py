@@ -0,0 +1,245 @@
+"""Benchmarks of the evaluation and analysis hot paths on synthetic data.
+
+Every stage and corpus size runs in a fresh process, timed without tracing
+and then once more under tracemalloc. Results are compared against the
+stored baseline, and growth past the thresholds is reported as a
+regression:
+
+    python -m benchmarks.run [--sizes 100 1000] [--stages extremums ...]
+    python -m benchmarks.run --save-baseline
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import gc
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, NamedTuple, Optional
+import ujson
+
+from algorithems.data_transform import get_extremums_batch
+from benchmarks.generators import (
+    get_bar_series,
+    get_bars_df,
+    get_evaluations_raw_data,
+    get_generator,
+)
+from controllers.evaluation.groups import (
+    get_group_ratios,
+    split_table_to_groups,
+    split_to_groups,
+)
+from ib.app import IBapi  # type: ignore
+from logger.logger import logger
+from models.evaluation_table import EvaluationTable
+
+BASELINE_FILE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SIZES = [100, 1000, 10000]
+# Bar series take about 70KB each as frames, so bar stages stop at 1k.
+MAX_BAR_SERIES = 1000
+REPEATS = 3
+# A stage regresses when it is this much slower or allocates this much more
+# than the baseline, time differences under the noise floor are ignored.
+TIME_THRESHOLD = 1.25
+MEMORY_THRESHOLD = 1.1
+TIME_NOISE_FLOOR_SECONDS = 0.005
+
+
+class Stage(NamedTuple):
+    # Builds the stage's input for a corpus size, outside of the measurements.
+    setup: Callable[[int], Any]
+    run: Callable[[Any], Any]
+    max_size: Optional[int] = None
+
+
+def _setup_historical_data(size: int) -> Any:
+    rng = get_generator()
+    series = [get_bar_series(rng) for _ in range(min(size, 10))]
+    app = IBapi(None)
+    return app, [series[index % len(series)] for index in range(size)]
+
+
+def _run_historical_data(setup: Any) -> None:
+    app, series = setup
+    for request_id, bars in enumerate(series):
+        queue = app.router.register(request_id)
+        for bar in bars:
+            app.historicalData(request_id, bar)
+        app.historicalDataEnd(request_id, "", "")
+        queue.get_nowait()
+        app.router.unregister(request_id)
+
+
+def _setup_extremums(size: int) -> Any:
+    rng = get_generator()
+    dfs = [get_bars_df(get_bar_series(rng)) for _ in range(min(size, 10))]
+    return [dfs[index % len(dfs)] for index in range(size)]
+
+
+def _run_extremums(dfs: Any) -> None:
+    get_extremums_batch(dfs)
+
+
+def _setup_evaluations(size: int) -> Any:
+    return get_evaluations_raw_data(get_generator(), size)
+
+
+def _setup_table(size: int) -> Any:
+    return EvaluationTable.from_results(_setup_evaluations(size))
+
+
+def _run_split_to_groups(evaluations_raw_data: Any) -> None:
+    split_to_groups(evaluations_raw_data)
+
+
+def _run_split_table_to_groups(table: Any) -> None:
+    split_table_to_groups(table)
+
+
+def _setup_groups(size: int) -> Any:
+    return split_to_groups(_setup_evaluations(size))
+
+
+def _setup_table_groups(size: int) -> Any:
+    return split_table_to_groups(_setup_table(size))
+
+
+def _run_group_ratios(groups: Any) -> None:
+    get_group_ratios(groups, workers=1)
+
+
+STAGES: dict[str, Stage] = {
+    "historical_data": Stage(
+        _setup_historical_data, _run_historical_data, MAX_BAR_SERIES
+    ),
+    "extremums": Stage(_setup_extremums, _run_extremums, MAX_BAR_SERIES),
+    "split_to_groups": Stage(_setup_evaluations, _run_split_to_groups),
+    "split_table_to_groups": Stage(_setup_table, _run_split_table_to_groups),
+    "group_ratios": Stage(_setup_groups, _run_group_ratios),
+    "group_ratios_table": Stage(_setup_table_groups, _run_group_ratios),
+}
+
+
+def _get_max_rss_bytes() -> int:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _measure(name: str, size: int, repeats: int) -> dict[str, Any]:
+    """Runs in its own process, so peak RSS belongs to this stage alone."""
+    # Logs go to files and Discord, which isn't what is measured.
+    logger.setLevel(logging.WARNING)
+    stage = STAGES[name]
+    setup = stage.setup(size)
+    gc.collect()
+    rss_before = _get_max_rss_bytes()
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage.run(setup)
+        seconds.append(time.perf_counter() - start)
+    rss_growth = _get_max_rss_bytes() - rss_before
+
+    tracemalloc.start()
+    stage.run(setup)
+    _, allocated_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": min(seconds),
+        "rss_growth_bytes": rss_growth,
+        "allocated_peak_bytes": allocated_peak,
+    }
+
+
+def run_benchmarks(
+    names: list[str], sizes: list[int], repeats: int = REPEATS
+) -> dict[str, dict[str, Any]]:
+    results: dict[str, dict[str, Any]] = {}
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        for size in sizes:
+            max_size = STAGES[name].max_size
+            if max_size is not None and size > max_size:
+                continue
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(_measure, name, size, repeats).result()
+            results[f"{name}[{size}]"] = result
+            print(
+                f"{name}[{size}]: {result['seconds'] * 1000:.1f} ms, "
+                f"RSS +{result['rss_growth_bytes'] / 2**20:.1f} MB, "
+                f"allocated peak {result['allocated_peak_bytes'] / 2**20:.1f} MB",
+                flush=True,
+            )
+    return results
+
+
+def get_regressions(
+    results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]]
+) -> list[str]:
+    regressions: list[str] = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        if (
+            result["seconds"] > expected["seconds"] * TIME_THRESHOLD
+            and result["seconds"] - expected["seconds"] > TIME_NOISE_FLOOR_SECONDS
+        ):
+            regressions.append(
+                f"{key}: {result['seconds'] * 1000:.1f} ms, "
+                f"baseline {expected['seconds'] * 1000:.1f} ms"
+            )
+        if (
+            result["allocated_peak_bytes"]
+            > expected["allocated_peak_bytes"] * MEMORY_THRESHOLD
+        ):
+            regressions.append(
+                f"{key}: allocated peak {result['allocated_peak_bytes']} bytes, "
+                f"baseline {expected['allocated_peak_bytes']} bytes"
+            )
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_FILE_PATH) -> dict[str, dict[str, Any]]:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r") as baseline_file:
+        baseline: dict[str, dict[str, Any]] = ujson.load(baseline_file)
+    return baseline
+
+
+def save_baseline(
+    results: dict[str, dict[str, Any]], path: str = BASELINE_FILE_PATH
+) -> None:
+    baseline = {**load_baseline(path), **results}
+    with open(path, "w") as baseline_file:
+        ujson.dump(dict(sorted(baseline.items())), baseline_file, indent=2)
+        baseline_file.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=None)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.stages or list(STAGES), args.sizes, args.repeats)
+    if args.save_baseline:
+        save_baseline(results)
+        return
+    regressions = get_regressions(results, load_baseline())
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""End to end throughput of IBapi against the fake TWS over localhost.
+
+Keeps `--in-flight` requests open and sends the next one as each reply
+arrives, then reports requests per second and reply latency percentiles:
+
+    python -m benchmarks.throughput [--requests 5000] [--kind market_data]
+"""
+
+import argparse
+import logging
+from queue import Queue
+import time
+from typing import Any, Callable
+
+from benchmarks.fake_tws import FakeTWSServer, connect_app, get_canned_bars
+from ib.app import IBapi  # type: ignore
+from ib.wrapper import get_contract
+from logger.latency import LatencyHistogram
+from logger.logger import logger
+
+REQUESTS = 5000
+IN_FLIGHT = 50
+# Small replies, so the client and the wire are what is measured.
+HISTORICAL_DATA_BARS = 24
+
+
+def _request_market_data(app: IBapi, req_id: int) -> None:
+    app.reqMktData(req_id, get_contract("AAPL", "SMART"), "", True, False, [])
+
+
+def _request_historical_data(app: IBapi, req_id: int) -> None:
+    app.reqHistoricalData(
+        req_id,
+        get_contract("AAPL", "SMART"),
+        "20240102 09:32:00 US/Eastern",
+        "120 S",
+        "5 secs",
+        "TRADES",
+        0,
+        1,
+        False,
+        [],
+    )
+
+
+REQUEST_KINDS: dict[str, Callable[[IBapi, int], None]] = {
+    "market_data": _request_market_data,
+    "historical_data": _request_historical_data,
+}
+
+
+def measure_throughput(
+    app: IBapi,
+    request: Callable[[IBapi, int], None],
+    requests: int = REQUESTS,
+    in_flight: int = IN_FLIGHT,
+) -> tuple[float, LatencyHistogram]:
+    """Requests per second and the histogram of reply latencies in ns."""
+    histogram = LatencyHistogram()
+    responses = Queue[Any]()
+    sent_at: dict[int, int] = {}
+    req_ids = [app.get_request_id() for _ in range(requests)]
+    for req_id in req_ids:
+        app.router.register(req_id, responses)
+    start = time.perf_counter()
+    sent = 0
+    for _ in range(requests):
+        while sent < requests and len(sent_at) < in_flight:
+            sent_at[req_ids[sent]] = time.perf_counter_ns()
+            request(app, req_ids[sent])
+            sent += 1
+        req_id, _ = responses.get(timeout=10)
+        histogram.record(time.perf_counter_ns() - sent_at.pop(req_id))
+    seconds = time.perf_counter() - start
+    for req_id in req_ids:
+        app.router.unregister(req_id)
+    return requests / seconds, histogram
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", choices=list(REQUEST_KINDS), default="market_data")
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--in-flight", type=int, default=IN_FLIGHT)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Every reply is logged at INFO, which would be measured instead.
+    logger.setLevel(logging.WARNING)
+    with FakeTWSServer(
+        latency=args.latency, bars=get_canned_bars(HISTORICAL_DATA_BARS)
+    ) as server:
+        app, thread = connect_app(server)
+        requests_per_second, histogram = measure_throughput(
+            app, REQUEST_KINDS[args.kind], args.requests, args.in_flight
+        )
+        app.disconnect()
+        thread.join()
+    print(
+        f"{args.kind}: {requests_per_second:.0f} requests/s, "
+        f"p50 {histogram.get_percentile(50) / 1000:.0f} us, "
+        f"p99 {histogram.get_percentile(99) / 1000:.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from decimal import Decimal
+import os
 from utils.math_utils import D
 
 
@@ -7,3 +8,10 @@ SCORE_GROUP_RANGE = D("0.5")
 ANALYSIS_GAP = D("0.001")
 
 PRECISION = 4
+
+# "numpy" scores the ratio grid vectorized, "decimal" is the reference loop.
+ANALYSIS_ENGINE = "numpy"
+# Max (evaluations x ratios) cells the numpy engine scores at once.
+MAX_RATIO_GRID_CHUNK_SIZE = 2000000
+# Processes the group optimisation is spread over, 1 keeps it serial.
+OPTIMISATION_WORKERS: int = os.cpu_count() or 1
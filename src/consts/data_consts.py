@@ -1,5 +1,17 @@
+import logging
+
 GROUPS_FILE_PATH = "data/groups.json"
+BARS_CACHE_DIR_PATH = "data/bars_cache"
+BARS_CACHE_MAX_SIZE: int = 2000000000
 
 LOG_FILE_PATH: str = "logs/logs.log"
 ROTATING_FILE_MAX_SIZE: int = 9000000
 BACKUP_COUNT: int = 35
+# Records waiting for the logging thread, newer ones are dropped past this.
+LOG_QUEUE_SIZE: int = 10000
+# Every TWS callback is logged at this level, INFO makes it reach the file.
+CALLBACK_LOG_LEVEL: int = logging.DEBUG
+BACKTEST_REPORT_FILE_PATH = "data/backtest.json"
+EVALUATION_STORE_FILE_PATH = "data/evaluations.jsonl"
+GROUP_STATS_FILE_PATH = "data/group_stats.npz"
+STOCKS_JSON_CACHE_FILE_PATH = "data/stocks.json"
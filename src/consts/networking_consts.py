@@ -2,3 +2,46 @@ NUMBER_OF_CONNECTIONS: int = 5
 LISTENING_PORT: int = 5789
 
 S3_BUCKET_NAME: str = "barak-trading-bucket"
+S3_CHUNK_SIZE: int = 1024 * 1024
+
+REQUEST_ID_START: int = 1000000
+
+# IB allows 60 historical requests per 10 minutes and 6 for the same contract
+# within 2 seconds: a burst of 6 refilled at 54 per 10 minutes keeps under both.
+HISTORICAL_DATA_PACING_BURST: int = 6
+HISTORICAL_DATA_PACING_RATE: float = 54 / 600
+HISTORICAL_DATA_MAX_IN_FLIGHT: int = 6
+HISTORICAL_DATA_TIMEOUT_SECONDS: int = 60
+HISTORICAL_DATA_MAX_RETRIES: int = 3
+# 162: pacing violation / HMDS error, 366: no historical data query found.
+HISTORICAL_DATA_RETRY_ERROR_CODES: tuple[int, ...] = (162, 366)
+
+# TWS sends a snapshot's ticks within 11 seconds.
+MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS: int = 15
+
+# TWS errors that are warnings about a request that still goes on: 399 order
+# warnings, 10090 / 10167 partly subscribed or delayed market data and 10197
+# no data during a competing session. 2100-2199 are notifications too.
+INFORMATIONAL_ERROR_CODES: frozenset[int] = frozenset({399, 10090, 10167, 10197})
+# Connectivity between TWS and IB restored with the subscriptions lost.
+DATA_LOST_ERROR_CODE: int = 1101
+
+LATENCY_ENDPOINT_PORT: int = 5790
+
+# Stock ingestion: newline delimited JSON over persistent connections.
+LISTENER_READ_SIZE: int = 64 * 1024
+LISTENER_MAX_MESSAGE_BYTES: int = 1024 * 1024
+# Connections stop being read while the trader has this many stocks queued.
+LISTENER_MAX_QUEUED_STOCKS: int = 1000
+LISTENER_BACKPRESSURE_POLL_SECONDS: float = 0.01
+# How long a first object without a newline waits for one before it's taken
+# as the single message of an old style connection.
+LISTENER_FRAMING_WAIT_SECONDS: float = 0.05
+
+# Discord allows 5 webhook requests per 2 seconds, errors are sent well below.
+DISCORD_RATE_LIMIT_BURST: int = 5
+DISCORD_RATE_LIMIT_PER_SECOND: float = 0.5
+DISCORD_MESSAGE_MAX_SIZE: int = 1900
+# Error messages waiting for Discord, the oldest are dropped past this.
+DISCORD_BUFFER_SIZE: int = 100
+DISCORD_CLOSE_TIMEOUT_SECONDS: float = 5
@@ -8,3 +8,7 @@ AWARE_DATETIME_FORMATTING = f"{DATETIME_FORMATTING} ZZZ"
 HOURS_FROM_START = 2
 SECONDS_FROM_END = hours_to_seconds(HOURS_FROM_START) + 120
 BAR_SIZE_SECONDS = 5
+
+LATENCY_REPORT_INTERVAL_SECONDS = 60
+# Bars of a full evaluation window, the initial buffer size per request.
+HISTORICAL_DATA_BARS_CAPACITY = SECONDS_FROM_END // BAR_SIZE_SECONDS
@@ -4,6 +4,47 @@ from utils.math_utils import D
 MAX_STOP_LOSS = D("0.1")
 MIN_TARGET_PROFIT = D("0.002")
 
+MIN_STOCK_PRICE = D("1")
+MAX_STOCK_PRICE = D("30")
+
 PERSUMED_TICK_SIZE = D("0.01")
 
+# Cash committed to open positions at once, over all the trading lanes.
 MAX_CASH_VALUE = D("500")
+# Signals of one symbol always go to the same lane, so they're traded in order.
+TRADING_LANES: int = 4
+TRADING_LANE_MAX_QUEUED_STOCKS: int = 100
+
+# Positions still open this long after their bracket was placed are closed.
+POSITION_MAX_HOLD_SECONDS: int = 5 * 60
+# Closing orders are limit orders this far past the price, to fill at once.
+CLOSE_PRICE_SLIPPAGE = D("0.01")
+# A parent in one of these before filling takes its bracket with it.
+DEAD_ORDER_STATUSES: tuple[str, ...] = ("Cancelled", "ApiCancelled", "Inactive")
+# A bracket's parent not filled by then is cancelled.
+BRACKET_FILL_TIMEOUT_SECONDS: float = 60
+
+# Symbols whose contract is kept for placing orders.
+CONTRACT_CACHE_SIZE: int = 1024
+
+# IB accounts get 100 market data lines by default.
+MAX_MARKET_DATA_SUBSCRIPTIONS: int = 50
+# A streamed ask not updated for this long may come from a stalled stream or a
+# halted symbol, so a snapshot is taken instead.
+MAX_QUOTE_AGE_SECONDS: float = 10
+
+ACCOUNT_SUMMARY_TAGS: str = "BuyingPower,$LEDGER"
+# An account summary requested while the subscription is down is reused this
+# long.
+ACCOUNT_STATE_MAX_AGE_SECONDS: int = 200
+# A dead account summary subscription is requested again at most this often.
+ACCOUNT_SUBSCRIPTION_RETRY_SECONDS: float = 10
+
+# IB fixed pricing, charged on both legs of backtested trades.
+BACKTEST_COMMISSION_PER_SHARE = D("0.005")
+
+# Signals for a symbol within this window are traded once, on the strongest.
+SIGNAL_COALESCE_WINDOW_SECONDS: float = 1.0
+# The same article reported again within this time is dropped.
+SIGNAL_DEDUP_TTL_SECONDS: float = 600
+SIGNAL_DEDUP_MAX_ENTRIES: int = 10000
@@ -0,0 +1,148 @@
+from decimal import Decimal
+from typing import Optional
+import numpy as np
+from pandas import DataFrame
+
+from algorithems.backtest import (
+    STOP_LOSS_EXIT,
+    TARGET_PROFIT_EXIT,
+    BracketArrays,
+    SimulatedTrades,
+    simulate_brackets,
+    stack_bars,
+)
+from algorithems.data_transform import get_starting_index
+from consts.trading_consts import BACKTEST_COMMISSION_PER_SHARE, MAX_CASH_VALUE
+from controllers.evaluation.groups import GroupIndex
+from controllers.trading.brackets import get_bracket_order, is_tradable_price
+from ib.wrapper import get_historical_data_cache_key, get_historical_data_request
+from models.backtest import BacktestReport, GroupBacktest
+from models.evaluation import Evaluation
+from models.trading import GroupRatio
+from persistency.bars_cache import load_bars_from_cache
+from logger.logger import logger
+from utils.math_utils import D
+
+
+def load_cached_bars(evaluations: list[Evaluation]) -> list[Optional[DataFrame]]:
+    return [
+        load_bars_from_cache(
+            get_historical_data_cache_key(get_historical_data_request(evaluation))
+        )
+        for evaluation in evaluations
+    ]
+
+
+def _get_brackets(
+    evaluations: list[Evaluation],
+    dfs: list[DataFrame],
+    groups: GroupIndex,
+    account_usd: Decimal,
+) -> tuple[BracketArrays, list[Optional[int]]]:
+    """Runs every signal through the Trader's decision, returning the orders
+    it would place and the index of the group each signal fell in."""
+    starting_index = get_starting_index()
+    group_indexes: list[Optional[int]] = []
+    is_placed = np.zeros(len(evaluations), dtype=bool)
+    is_long = np.zeros(len(evaluations), dtype=bool)
+    quantity = np.zeros(len(evaluations))
+    prices = np.zeros((3, len(evaluations)))
+    for index, (evaluation, df) in enumerate(zip(evaluations, dfs)):
+        try:
+            group_index = groups.get_index(evaluation.score)
+        except ValueError:
+            group_indexes.append(None)
+            continue
+        group_indexes.append(group_index)
+        group_ratio = groups.groups[group_index]
+        stock_price = D(float(df["close"].iloc[starting_index]))
+        if not is_tradable_price(stock_price):
+            continue
+        bracket_order = get_bracket_order(stock_price, group_ratio, account_usd)
+        if bracket_order is None:
+            continue
+        is_placed[index] = True
+        is_long[index] = bracket_order.action == "BUY"
+        quantity[index] = bracket_order.quantity
+        prices[:, index] = [
+            bracket_order.price_limit,
+            bracket_order.target_profit,
+            bracket_order.stop_loss,
+        ]
+    return (
+        BracketArrays(is_placed, is_long, quantity, prices[0], prices[1], prices[2]),
+        group_indexes,
+    )
+
+
+def _get_hit_rate(target_profit_hits: int, trades: int) -> Decimal:
+    return D(target_profit_hits / trades) if trades > 0 else D("0")
+
+
+def _get_report(
+    groups: list[GroupRatio],
+    group_indexes: list[Optional[int]],
+    trades: SimulatedTrades,
+) -> BacktestReport:
+    group_backtests: list[GroupBacktest] = []
+    for group_index, group_ratio in enumerate(groups):
+        rows = np.array([index == group_index for index in group_indexes], dtype=bool)
+        exit_reasons = trades.exit_reason[rows]
+        filled = int(np.count_nonzero(exit_reasons))
+        target_profit_hits = int(np.count_nonzero(exit_reasons == TARGET_PROFIT_EXIT))
+        group_backtests.append(
+            GroupBacktest(
+                score_range=group_ratio.score_range,
+                signals=int(rows.sum()),
+                trades=filled,
+                target_profit_hits=target_profit_hits,
+                stop_loss_hits=int(np.count_nonzero(exit_reasons == STOP_LOSS_EXIT)),
+                hit_rate=_get_hit_rate(target_profit_hits, filled),
+                pnl=D(float(trades.pnl[rows].sum())),
+            )
+        )
+
+    filled = sum(group.trades for group in group_backtests)
+    return BacktestReport(
+        signals=sum(group.signals for group in group_backtests),
+        trades=filled,
+        hit_rate=_get_hit_rate(
+            sum(group.target_profit_hits for group in group_backtests), filled
+        ),
+        pnl=D(float(trades.pnl.sum())),
+        groups=group_backtests,
+    )
+
+
+def run_backtest(
+    evaluations: list[Evaluation],
+    dfs: list[Optional[DataFrame]],
+    groups: list[GroupRatio],
+    account_usd: Decimal = MAX_CASH_VALUE,
+    commission_per_share: Decimal = BACKTEST_COMMISSION_PER_SHARE,
+) -> BacktestReport:
+    """Replays the bars of every evaluation through the Trader's bracket
+    decision and a simulated fill model, see simulate_brackets."""
+    starting_index = get_starting_index()
+    replayed = [
+        (evaluation, df)
+        for evaluation, df in zip(evaluations, dfs)
+        if df is not None and len(df) > starting_index + 1
+    ]
+    logger.info(
+        "Backtesting %s of %s evaluations with bars", len(replayed), len(evaluations)
+    )
+    replayed_dfs = [df for _, df in replayed]
+    brackets, group_indexes = _get_brackets(
+        [evaluation for evaluation, _ in replayed],
+        replayed_dfs,
+        GroupIndex(groups),
+        account_usd,
+    )
+    trades = simulate_brackets(
+        stack_bars(replayed_dfs),
+        brackets,
+        starting_index,
+        float(commission_per_share),
+    )
+    return _get_report(groups, group_indexes, trades)
@@ -1,22 +1,29 @@
+from datetime import datetime
 from queue import Queue
 import time
-from typing import Any
+from typing import Any, Iterator
 import arrow
+from dateutil import tz
 from pandas import DataFrame
 
-from algorithems.analysis import get_best_ratio
-from algorithems.data_transform import get_extremums
-from consts.algorithem_consts import SCORE_GROUP_RANGE
+from algorithems.analysis import RatioStats
+from algorithems.data_transform import get_extremums_batch
 from consts.time_consts import TIMEZONE
 from ib.app import IBapi  # type: ignore
-from ib.wrapper import get_historical_data
-from controllers.evaluation.groups import split_to_groups
-from integrations.cloud.s3 import get_stocks_json_from_bucket
+from ib.wrapper import get_end_date_time, get_historical_data_batch
+from controllers.evaluation.groups import (
+    get_group_ratios_from_stats,
+    split_table_to_groups,
+    update_group_stats,
+)
+from integrations.cloud.s3 import iterate_stocks_json_from_bucket
 from models.evaluation import Evaluation, EvaluationResults
 from logger.logger import logger
 from models.trading import GroupRatio
+from persistency.bars_cache import evict_bars_cache
 from persistency.data_handler import save_groups_to_file
-from utils.math_utils import D
+from persistency.evaluation_store import EvaluationStore
+from persistency.group_stats import load_group_stats, save_group_stats
 
 
 def sleep_until_time(kill_queue: Queue[Any]) -> None:
@@ -30,71 +37,98 @@ def sleep_until_time(kill_queue: Queue[Any]) -> None:
             return
 
 
-def iterate_evaluations(
-    app: IBapi,
-    evaluations: list[Evaluation],
-    response_queue: Queue[Any],
-    kill_queue: Queue[Any],
+def _load_group_stats(store: EvaluationStore) -> dict[int, RatioStats]:
+    group_stats = load_group_stats()
+    # Evaluations scored below every group aren't in the stats.
+    groups = split_table_to_groups(store.get_table())
+    if sum(stats.evaluations_count for stats in group_stats.values()) != sum(
+        len(group) for group in groups
+    ):
+        logger.warning("Rebuilding group stats from the evaluation store")
+        group_stats = {}
+        update_group_stats(group_stats, groups)
+        save_group_stats(group_stats)
+    return group_stats
+
+
+def evaluate_new_articles(
+    app: IBapi, store: EvaluationStore, group_stats: dict[int, RatioStats]
 ) -> None:
+    """Reduces the evaluations missing from the store and updates the groups.
+
+    Evaluations whose bars window hasn't ended yet are left for a later run,
+    stored extremums are final.
+    """
+    now = arrow.now(tz=TIMEZONE)
+    evaluations = [
+        evaluation
+        for evaluation in stream_evaluations()
+        if evaluation not in store and get_end_date_time(evaluation) < now
+    ]
+    logger.info("Evaluating %s new evaluations", len(evaluations))
+    dfs = get_historical_data_batch(app, evaluations)
+    fetched: list[tuple[Evaluation, DataFrame]] = []
+    for evaluation, df in zip(evaluations, dfs):  # TODO: change this when ready
+        if df is None:
+            logger.error("Error getting data for evaluation: %s", evaluation)
+            continue
+        fetched.append((evaluation, df))
+    extremums = get_extremums_batch([df for _, df in fetched])
+    new_table = store.add(
+        [
+            EvaluationResults(evaluation=evaluation, data=data)
+            for (evaluation, _), data in zip(fetched, extremums)
+        ]
+    )
+    logger.info("Finished getting data for all evaluations")
+    evict_bars_cache()
+    if len(new_table) > 0:
+        update_group_stats(group_stats, split_table_to_groups(new_table))
+        save_group_stats(group_stats)
+    groups = split_table_to_groups(store.get_table())
+    group_ratios: list[GroupRatio] = get_group_ratios_from_stats(groups, group_stats)
+    save_groups_to_file(group_ratios)
+
+
+def iterate_evaluations(app: IBapi, kill_queue: Queue[Any]) -> None:
+    store = EvaluationStore()
+    group_stats = _load_group_stats(store)
+    last_run_date = None
     while True:
         sleep_until_time(kill_queue)
         if not kill_queue.empty():
             return
+        # A run takes a fraction of the hour sleep_until_time lets through.
+        if arrow.now(tz=TIMEZONE).date() == last_run_date:
+            time.sleep(20)
+            continue
+        last_run_date = arrow.now(tz=TIMEZONE).date()
         logger.info("Iterating evaluations")
-        evaluations_raw_data: list[EvaluationResults] = []
-        for index, evaluation in enumerate(
-            evaluations
-        ):  # TODO: change this when you're ready
-            df: DataFrame = get_historical_data(app, evaluation, response_queue, index)
-            if df is None:
-                logger.error("Error getting data for evaluation: %s", evaluation)
-                continue
-            extremums = get_extremums(df)
-            evaluations_raw_data.append(
-                EvaluationResults(evaluation=evaluation, data=extremums)
-            )
-        logger.info("Finished getting data for all evaluations")
-        groups: list[list[EvaluationResults]] = split_to_groups(evaluations_raw_data)
-        group_ratios: list[GroupRatio] = []
-        for index, group in enumerate(groups):
-            if len(group) == 0:
-                continue
-            best_ratio = get_best_ratio(group)
-            if best_ratio is None:
-                continue
-            group_ratios.append(
-                GroupRatio(
-                    score_range=(
-                        D(-10 + (index * SCORE_GROUP_RANGE)),
-                        D(-10 + (index + 1) * SCORE_GROUP_RANGE),
-                    ),
-                    target_profit=best_ratio["target_profit"],
-                    stop_loss=best_ratio["stop_loss"],
-                    average=best_ratio["average"],
-                    urls=[evaluation.evaluation.url for evaluation in group],
-                )
-            )
-        save_groups_to_file(group_ratios)
+        evaluate_new_articles(app, store, group_stats)
 
 
-def get_evaluations() -> list[Evaluation]:
-    logger.info("Getting evaluations")
-    evaluations: list[Evaluation] = []
+def warm_bars_cache(app: IBapi, evaluations: list[Evaluation]) -> None:
+    logger.info("Warming bars cache")
+    get_historical_data_batch(app, evaluations)
+    evict_bars_cache()
 
-    stocks_json = get_stocks_json_from_bucket()
-    for stock in stocks_json:
+
+def stream_evaluations() -> Iterator[Evaluation]:
+    logger.info("Getting evaluations")
+    time_zone = tz.gettz(TIMEZONE)
+    for stock in iterate_stocks_json_from_bucket():
         for evaluation in stock["evaluations"]:
+            article_datetime = datetime.strptime(
+                evaluation["article_date"], "%Y-%m-%d %H:%M:%S"
+            ).replace(tzinfo=time_zone)
             for evaluated_stock in evaluation["stocks"]:
-                evaluations.append(
-                    Evaluation(
-                        datetime=arrow.get(
-                            evaluation["article_date"],
-                            "YYYY-MM-DD HH:mm:ss",
-                            tzinfo="US/Eastern",
-                        ).datetime,
-                        score=evaluated_stock["score"],
-                        symbol=evaluated_stock["symbol"],
-                        url=evaluation["article_url"],
-                    )
+                yield Evaluation(
+                    datetime=article_datetime,
+                    score=evaluated_stock["score"],
+                    symbol=evaluated_stock["symbol"],
+                    url=evaluation["article_url"],
                 )
-    return evaluations
+
+
+def get_evaluations() -> list[Evaluation]:
+    return list(stream_evaluations())
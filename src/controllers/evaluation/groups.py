@@ -1,31 +1,180 @@
+import bisect
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
+import multiprocessing
+from typing import Any, Optional, Sequence, Union
 import numpy as np
+from numpy import ndarray as NDArray
 
-from consts.algorithem_consts import SCORE_GROUP_RANGE
+from algorithems.analysis import (
+    RatioStats,
+    get_best_ratio,
+    get_best_ratio_from_stats,
+    get_best_ratio_packed,
+    get_ratio_stats,
+    merge_ratio_stats,
+    pack_evaluation_table,
+    pack_evaluations,
+)
+from consts.algorithem_consts import OPTIMISATION_WORKERS, SCORE_GROUP_RANGE
 from models.evaluation import EvaluationResults
+from models.evaluation_table import EvaluationTable
 from models.trading import GroupRatio
+from utils.math_utils import D
+
+
+SCORE_LOWER_BOUNDS: NDArray[Any, Any] = np.arange(-10, 10, SCORE_GROUP_RANGE)
+# Table scores are the floats of the Decimal scores, so are their bounds.
+_FLOAT_SCORE_LOWER_BOUNDS = SCORE_LOWER_BOUNDS.astype(np.float64)
+
+
+def _get_group_indexes(scores: NDArray[Any, Any]) -> NDArray[Any, Any]:
+    """The score range of every score, -1 under -10.
+
+    A range holds its lower bound, the last one also everything above it.
+    """
+    lower_bounds = (
+        _FLOAT_SCORE_LOWER_BOUNDS if scores.dtype == np.float64 else SCORE_LOWER_BOUNDS
+    )
+    indexes: NDArray[Any, Any] = np.searchsorted(lower_bounds, scores, side="right") - 1
+    return indexes
 
 
 def split_to_groups(
     evaluations_raw_data: list[EvaluationResults],
 ) -> list[list[EvaluationResults]]:
-    groups: list[list[EvaluationResults]] = []
-
-    for lower_bound_range in np.arange(-10, 10, SCORE_GROUP_RANGE):
-        curr_group: list[EvaluationResults] = []
-        for evaluation_raw_data in evaluations_raw_data:
-            curr_score = evaluation_raw_data.evaluation.score
-            if lower_bound_range <= curr_score and (
-                lower_bound_range == 10 - SCORE_GROUP_RANGE
-                or curr_score < lower_bound_range + SCORE_GROUP_RANGE
-            ):
-                curr_group.append(evaluation_raw_data)
-        groups.append(curr_group)
+    groups: list[list[EvaluationResults]] = [[] for _ in SCORE_LOWER_BOUNDS]
+    scores = np.empty(len(evaluations_raw_data), dtype=object)
+    scores[:] = [
+        evaluation_raw_data.evaluation.score
+        for evaluation_raw_data in evaluations_raw_data
+    ]
+    for evaluation_raw_data, index in zip(
+        evaluations_raw_data, _get_group_indexes(scores)
+    ):
+        if index >= 0:
+            groups[index].append(evaluation_raw_data)
     return groups
 
 
-def get_group_for_score(groups: list[GroupRatio], score: Decimal) -> GroupRatio:
-    for group in groups:
-        if group.score_range[0] <= score <= group.score_range[1]:
-            return group
-    raise ValueError("No group found for score")
+def split_table_to_groups(table: EvaluationTable) -> list[EvaluationTable]:
+    """split_to_groups of a table, one table per score range."""
+    indexes = _get_group_indexes(table.scores)
+    order = np.argsort(indexes, kind="stable")
+    ends = np.searchsorted(indexes[order], np.arange(len(SCORE_LOWER_BOUNDS) + 1))
+    return [table.take(order[start:end]) for start, end in zip(ends[:-1], ends[1:])]
+
+
+class GroupIndex:
+    """Finds the group of a score by bisecting the groups' upper bounds.
+
+    A score on the bound of two groups goes to the lower one, as both ends
+    of a score range are inclusive.
+    """
+
+    groups: list[GroupRatio]
+
+    def __init__(self, groups: list[GroupRatio]) -> None:
+        self.groups = groups
+        self._order = sorted(
+            range(len(groups)), key=lambda index: groups[index].score_range
+        )
+        self._upper_bounds = [groups[index].score_range[1] for index in self._order]
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def get_index(self, score: Decimal) -> int:
+        """The index in groups of the group of the score."""
+        position = bisect.bisect_left(self._upper_bounds, score)
+        if position < len(self._order):
+            index = self._order[position]
+            if self.groups[index].score_range[0] <= score:
+                return index
+        raise ValueError("No group found for score")
+
+    def get_group(self, score: Decimal) -> GroupRatio:
+        return self.groups[self.get_index(score)]
+
+
+def _get_best_ratios_in_pool(
+    groups: Sequence[Union[list[EvaluationResults], EvaluationTable]], workers: int
+) -> list[Optional[dict[str, Decimal]]]:
+    # Workers only get the packed arrays, and spawn keeps them clear of the
+    # locks held by the IB threads at fork time.
+    packed_groups = [pack_evaluations(group) for group in groups]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(packed_groups)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        return list(executor.map(get_best_ratio_packed, packed_groups))
+
+
+def _get_group_urls(
+    group: Union[list[EvaluationResults], EvaluationTable]
+) -> list[str]:
+    if isinstance(group, EvaluationTable):
+        return group.get_urls()
+    return [evaluation.evaluation.url for evaluation in group]
+
+
+def _get_group_ratio(
+    index: int,
+    group: Union[list[EvaluationResults], EvaluationTable],
+    best_ratio: dict[str, Decimal],
+) -> GroupRatio:
+    return GroupRatio(
+        score_range=(
+            D(-10 + (index * SCORE_GROUP_RANGE)),
+            D(-10 + (index + 1) * SCORE_GROUP_RANGE),
+        ),
+        target_profit=best_ratio["target_profit"],
+        stop_loss=best_ratio["stop_loss"],
+        average=best_ratio["average"],
+        urls=_get_group_urls(group),
+    )
+
+
+def get_group_ratios(
+    groups: Sequence[Union[list[EvaluationResults], EvaluationTable]],
+    workers: int = OPTIMISATION_WORKERS,
+) -> list[GroupRatio]:
+    indexes = [index for index, group in enumerate(groups) if len(group) > 0]
+    non_empty_groups = [groups[index] for index in indexes]
+    best_ratios: list[Optional[dict[str, Decimal]]]
+    if workers > 1 and len(non_empty_groups) > 1:
+        best_ratios = _get_best_ratios_in_pool(non_empty_groups, workers)
+    else:
+        best_ratios = [get_best_ratio(group) for group in non_empty_groups]
+
+    return [
+        _get_group_ratio(index, group, best_ratio)
+        for index, group, best_ratio in zip(indexes, non_empty_groups, best_ratios)
+        if best_ratio is not None
+    ]
+
+
+def update_group_stats(
+    group_stats: dict[int, RatioStats], new_groups: list[EvaluationTable]
+) -> None:
+    """Adds the stats of newly evaluated articles to their groups' stats."""
+    for index, group in enumerate(new_groups):
+        if len(group) == 0:
+            continue
+        stats = get_ratio_stats(pack_evaluation_table(group))
+        if index in group_stats:
+            stats = merge_ratio_stats(group_stats[index], stats)
+        group_stats[index] = stats
+
+
+def get_group_ratios_from_stats(
+    groups: list[EvaluationTable], group_stats: dict[int, RatioStats]
+) -> list[GroupRatio]:
+    """Same as get_group_ratios for groups whose stats are up to date."""
+    return [
+        _get_group_ratio(
+            index, group, get_best_ratio_from_stats(group_stats[index], group)
+        )
+        for index, group in enumerate(groups)
+        if len(group) > 0
+    ]
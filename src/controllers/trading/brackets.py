@@ -0,0 +1,96 @@
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from consts.trading_consts import (
+    MAX_STOCK_PRICE,
+    MAX_STOP_LOSS,
+    MIN_STOCK_PRICE,
+    MIN_TARGET_PROFIT,
+    PERSUMED_TICK_SIZE,
+)
+from models.trading import GroupRatio
+
+TICKS_PER_DOLLAR = int(1 / PERSUMED_TICK_SIZE)
+# The parent's limit is 1% past the price, to fill at once.
+PRICE_LIMIT_PERCENT = 1
+_MIN_TARGET_PROFIT = MIN_TARGET_PROFIT.as_integer_ratio()
+_MAX_STOP_LOSS = MAX_STOP_LOSS.as_integer_ratio()
+
+
+class BracketOrder(NamedTuple):
+    action: str
+    quantity: int
+    price_limit: Decimal
+    target_profit: Decimal
+    stop_loss: Decimal
+
+
+def is_tradable_price(stock_price: Decimal) -> bool:
+    return MIN_STOCK_PRICE <= stock_price <= MAX_STOCK_PRICE
+
+
+def _divide_to_even(numerator: int, denominator: int) -> int:
+    """numerator / denominator rounded half to even, like Decimal.quantize."""
+    quotient, remainder = divmod(numerator, denominator)
+    if 2 * remainder > denominator or (
+        2 * remainder == denominator and quotient % 2 == 1
+    ):
+        return quotient + 1
+    return quotient
+
+
+def _get_ticks(price_numerator: int, price_denominator: int, ratio: Decimal) -> int:
+    """The price moved by `ratio`, in ticks."""
+    numerator, denominator = ratio.as_integer_ratio()
+    return _divide_to_even(
+        price_numerator * (denominator + numerator) * TICKS_PER_DOLLAR,
+        price_denominator * denominator,
+    )
+
+
+def _to_price(ticks: int) -> Decimal:
+    return Decimal(ticks) * PERSUMED_TICK_SIZE
+
+
+def get_bracket_order(
+    stock_price: Decimal, group_ratio: GroupRatio, account_usd: Decimal
+) -> Optional[BracketOrder]:
+    """The bracket to place for a signal, None if the group's ratios are
+    outside the allowed target profit / stop loss.
+
+    Prices are worked out in whole ticks on exact integer ratios, rounding
+    like quantizing the Decimal products would.
+    """
+    action = "BUY" if group_ratio.target_profit > 0 else "SELL"
+    price_numerator, price_denominator = stock_price.as_integer_ratio()
+    usd_numerator, usd_denominator = account_usd.as_integer_ratio()
+    quantity = (usd_numerator * price_denominator) // (
+        usd_denominator * price_numerator
+    )
+    price_limit = _divide_to_even(
+        price_numerator
+        * (100 + PRICE_LIMIT_PERCENT if action == "BUY" else 100 - PRICE_LIMIT_PERCENT)
+        * TICKS_PER_DOLLAR,
+        price_denominator * 100,
+    )
+    target_profit = _get_ticks(
+        price_numerator, price_denominator, group_ratio.target_profit
+    )
+    stop_loss = _get_ticks(price_numerator, price_denominator, group_ratio.stop_loss)
+
+    # |ticks / price - 1| against the bounds, cross multiplied.
+    price_ticks = price_numerator * TICKS_PER_DOLLAR
+    target_move = abs(target_profit * price_denominator - price_ticks)
+    stop_move = abs(stop_loss * price_denominator - price_ticks)
+    if (
+        target_move * _MIN_TARGET_PROFIT[1] >= _MIN_TARGET_PROFIT[0] * price_ticks
+        and stop_move * _MAX_STOP_LOSS[1] <= _MAX_STOP_LOSS[0] * price_ticks
+    ):
+        return BracketOrder(
+            action,
+            quantity,
+            _to_price(price_limit),
+            _to_price(target_profit),
+            _to_price(stop_loss),
+        )
+    return None
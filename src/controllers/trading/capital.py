@@ -0,0 +1,30 @@
+from decimal import Decimal
+from threading import Lock
+
+from consts.trading_consts import MAX_CASH_VALUE
+
+
+class CapitalAllocator:
+    """Cash shared by the trading lanes, at most `limit` of it committed."""
+
+    limit: Decimal
+
+    def __init__(self, limit: Decimal = MAX_CASH_VALUE) -> None:
+        self.limit = limit
+        self.reserved = Decimal(0)
+        self._lock = Lock()
+
+    def reserve(self, amount: Decimal) -> Decimal:
+        """Reserves up to `amount`, returning how much was reserved."""
+        with self._lock:
+            granted = max(min(amount, self.limit - self.reserved), Decimal(0))
+            self.reserved += granted
+            return granted
+
+    def release(self, amount: Decimal) -> None:
+        with self._lock:
+            self.reserved = max(self.reserved - amount, Decimal(0))
+
+    def get_available(self) -> Decimal:
+        with self._lock:
+            return self.limit - self.reserved
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from queue import Empty, Full, Queue
+import time
+from typing import Any, Optional
+
+from consts.trading_consts import (
+    SIGNAL_COALESCE_WINDOW_SECONDS,
+    SIGNAL_DEDUP_MAX_ENTRIES,
+    SIGNAL_DEDUP_TTL_SECONDS,
+)
+from logger.latency import latency_recorder
+from logger.logger import logger
+from models.trading import Stock
+
+# How long to wait for a signal when no window is open, so kills are noticed.
+IDLE_POLL_SECONDS = 1
+
+
+class StockCoalescer:
+    """Merges bursts of signals before they reach the trader.
+
+    A signal whose (symbol, article url) was seen in the last `ttl` seconds is
+    dropped. The first signal for a symbol opens a `window` during which later
+    ones replace it when their score is further from 0, and the strongest is
+    passed on when the window closes. Windows all have the same length and TTL
+    entries the same lifetime, so both are kept in insertion ordered dicts and
+    expire from the front.
+
+    Putting on a full `out_queue` blocks, so a trader that falls behind stops
+    the coalescer from reading `in_queue` and the listener's backpressure
+    engages.
+    """
+
+    in_queue: Queue[Optional[Stock]]
+    out_queue: Queue[Optional[Stock]]
+    window: float
+    ttl: float
+    max_entries: int
+
+    def __init__(
+        self,
+        in_queue: Queue[Optional[Stock]],
+        out_queue: Queue[Optional[Stock]],
+        window: float = SIGNAL_COALESCE_WINDOW_SECONDS,
+        ttl: float = SIGNAL_DEDUP_TTL_SECONDS,
+        max_entries: int = SIGNAL_DEDUP_MAX_ENTRIES,
+    ) -> None:
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.window = window
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (symbol, url) -> expiry, oldest first.
+        self.seen: OrderedDict[tuple[str, str], float] = OrderedDict()
+        # symbol -> (window end, strongest stock), oldest window first.
+        self.pending: OrderedDict[str, tuple[float, Stock]] = OrderedDict()
+
+    def add(self, stock: Stock, now: float) -> bool:
+        """Adds a signal, returning False when it was a duplicate."""
+        self._evict(now)
+        key = (stock.symbol, stock.article.url)
+        if key in self.seen:
+            logger.info("Dropping a duplicate signal for %s", stock.symbol)
+            return False
+        self.seen[key] = now + self.ttl
+        if len(self.seen) > self.max_entries:
+            self.seen.popitem(last=False)
+
+        if stock.symbol not in self.pending:
+            self.pending[stock.symbol] = (now + self.window, stock)
+            return True
+        closes_at, strongest = self.pending[stock.symbol]
+        logger.info("Coalescing a signal for %s", stock.symbol)
+        if abs(stock.score) > abs(strongest.score):
+            self.pending[stock.symbol] = (closes_at, stock)
+        return True
+
+    def pop_due(self, now: float) -> list[Stock]:
+        """Takes the strongest signal of every window that closed by `now`."""
+        due: list[Stock] = []
+        while len(self.pending) > 0:
+            symbol, (closes_at, stock) = next(iter(self.pending.items()))
+            if closes_at > now:
+                break
+            del self.pending[symbol]
+            due.append(stock)
+        return due
+
+    def get_timeout(self, now: float) -> float:
+        """Seconds until the next window closes."""
+        if len(self.pending) == 0:
+            return IDLE_POLL_SECONDS
+        closes_at, _ = next(iter(self.pending.values()))
+        return max(closes_at - now, 0)
+
+    def _evict(self, now: float) -> None:
+        while len(self.seen) > 0 and next(iter(self.seen.values())) <= now:
+            self.seen.popitem(last=False)
+
+    def run(self, kill_queue: Queue[Any]) -> None:
+        while kill_queue.empty():
+            stock: Optional[Stock] = None
+            try:
+                stock = self.in_queue.get(timeout=self.get_timeout(time.monotonic()))
+            except Empty:
+                pass
+            now = time.monotonic()
+            if stock is not None:
+                self.add(stock, now)
+            for due in self.pop_due(now):
+                latency_recorder.mark(due.timestamps, "coalesced")
+                self._put(due, kill_queue)
+
+    def _put(self, stock: Stock, kill_queue: Queue[Any]) -> None:
+        while kill_queue.empty():
+            try:
+                self.out_queue.put(stock, timeout=IDLE_POLL_SECONDS)
+                return
+            except Full:
+                continue
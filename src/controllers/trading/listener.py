@@ -1,14 +1,23 @@
+import asyncio
 import time
 import ujson
 from queue import Queue
-import socket
-from typing import Any, Optional
+from threading import Event, Thread
+from typing import Any, Coroutine, Optional
 
 import arrow
 from consts.time_consts import DATETIME_FORMATTING, TIMEZONE
 from ib.app import IBapi  # type: ignore
+from logger.latency import latency_recorder
 from logger.logger import logger
-from consts.networking_consts import LISTENING_PORT
+from consts.networking_consts import (
+    LISTENER_BACKPRESSURE_POLL_SECONDS,
+    LISTENER_FRAMING_WAIT_SECONDS,
+    LISTENER_MAX_MESSAGE_BYTES,
+    LISTENER_MAX_QUEUED_STOCKS,
+    LISTENER_READ_SIZE,
+    LISTENING_PORT,
+)
 from models.article import Article
 from models.trading import Stock
 
@@ -48,24 +57,169 @@ def wait_for_time(kill_queue: Queue[Any]) -> bool:
                 return has_slept
 
 
-def listen_for_stocks(queue: Queue[Optional[Stock]], kill_queue: Queue[Any]) -> None:
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind(("127.0.0.1", LISTENING_PORT))
-    server.listen(5)
-    server.settimeout(10)
-    logger.info("Server is listening")
-    while True:
-        logger.info("Waiting for connections")
-        if not kill_queue.empty():
-            return
+class StockIngestionServer:
+    """Takes stocks from many producers over persistent connections.
+
+    Every stock is one JSON object on its own line. Each read is handled as a
+    batch and acked with one "OK <count>" line, count being the messages
+    handled on the connection so far; malformed ones are logged and counted.
+    The framing is decided once, by the first bytes: a connection whose first
+    object comes without a newline is an old style one, its single message
+    gets the bare "OK" and the connection is closed. Connections aren't read
+    while the trader's queue is full.
+    """
+
+    queue: Queue[Optional[Stock]]
+    port: int
+    max_queued: int
+    started: Event
+
+    def __init__(
+        self,
+        queue: Queue[Optional[Stock]],
+        port: int = LISTENING_PORT,
+        max_queued: int = LISTENER_MAX_QUEUED_STOCKS,
+    ) -> None:
+        self.queue = queue
+        self.port = port
+        self.max_queued = max_queued
+        self.started = Event()
+        self._is_stopping = False
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def serve(self, stop: asyncio.Event) -> None:
+        server = await asyncio.start_server(self._connect, "127.0.0.1", self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info("Server is listening")
+        self.started.set()
+        async with server:
+            await stop.wait()
+            logger.info("Closing the server")
+            self._is_stopping = True
+            server.close()
+            for writer in list(self._writers):
+                writer.close()
+
+    async def serve_until_killed(self, kill_queue: Queue[Any]) -> None:
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+
+        def wait_for_kill() -> None:
+            kill_queue.get()
+            loop.call_soon_threadsafe(stop.set)
+
+        Thread(target=wait_for_kill, daemon=True).start()
+        await self.serve(stop)
+
+    def _connect(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Coroutine[Any, Any, None]:
+        # Called as the connection is made, so a stop closes it even before
+        # its handler started.
+        self._writers.add(writer)
+        return self._handle(reader, writer)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        logger.info("Connected by %s", writer.get_extra_info("peername"))
+        buffer = bytearray()
+        handled = 0
+        is_framed: Optional[bool] = None
         try:
-            conn, addr = server.accept()
-            logger.info(f"Connected by {addr}")
-            data = conn.recv(100000).decode("utf-8")
-        except Exception:
-            continue
-        stock_json = ujson.loads(data)
-        stock = json_to_stock(stock_json)
-        conn.sendall("OK".encode("utf-8"))
-        queue.put(stock)
-        conn.close()
+            while True:
+                chunk = await reader.read(LISTENER_READ_SIZE)
+                timestamps: dict[str, int] = {}
+                latency_recorder.mark(timestamps, "received")
+                if len(chunk) == 0:
+                    # A producer that closes after its last message.
+                    if not self._is_stopping:
+                        self._ingest([buffer], timestamps)
+                    return
+                buffer += chunk
+                if is_framed is None:
+                    is_framed = await _get_framing(reader, buffer)
+                if is_framed and b"\n" in buffer:
+                    *messages, rest = buffer.split(b"\n")
+                    buffer = bytearray(rest)
+                elif is_framed is False:
+                    messages, buffer = [buffer], bytearray()
+                elif len(buffer) > LISTENER_MAX_MESSAGE_BYTES:
+                    logger.warning("Closing a connection sending a too large message")
+                    writer.write(b"ERROR message too large\n")
+                    await writer.drain()
+                    return
+                else:
+                    continue
+
+                await self._wait_for_room()
+                handled += self._ingest(messages, timestamps)
+                writer.write(f"OK {handled}\n".encode() if is_framed else b"OK")
+                await writer.drain()
+                if not is_framed:
+                    return
+        except ConnectionError:
+            logger.info("Connection lost")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _wait_for_room(self) -> None:
+        while self.queue.qsize() >= self.max_queued:
+            await asyncio.sleep(LISTENER_BACKPRESSURE_POLL_SECONDS)
+
+    def _ingest(self, messages: list[bytearray], received: dict[str, int]) -> int:
+        """Queues the stocks of the messages, returning how many there were."""
+        count = 0
+        for message in messages:
+            if len(message.strip()) == 0:
+                continue
+            count += 1
+            timestamps = dict(received)
+            try:
+                stock_json = ujson.loads(message)
+                latency_recorder.mark(timestamps, "parsed")
+                stock = json_to_stock(stock_json)
+            except Exception:
+                logger.warning("Skipping a malformed stock message", exc_info=True)
+                continue
+            stock.timestamps = timestamps
+            latency_recorder.mark(timestamps, "validated")
+            self.queue.put(stock)
+            latency_recorder.mark(timestamps, "queued")
+        return count
+
+
+async def _get_framing(
+    reader: asyncio.StreamReader, buffer: bytearray
+) -> Optional[bool]:
+    """True for newline framing, False for a single object without one and
+    None while the first bytes tell neither. Reads into `buffer`."""
+    if b"\n" in buffer:
+        return True
+    if not _is_json(buffer):
+        return None
+    # The newline of a framed producer may come in a later read.
+    try:
+        buffer += await asyncio.wait_for(
+            reader.read(LISTENER_READ_SIZE), LISTENER_FRAMING_WAIT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        return False
+    return b"\n" in buffer
+
+
+def _is_json(data: bytearray) -> bool:
+    try:
+        ujson.loads(data)
+    except ValueError:
+        return False
+    return True
+
+
+def listen_for_stocks(
+    queue: Queue[Optional[Stock]],
+    kill_queue: Queue[Any],
+    port: int = LISTENING_PORT,
+) -> None:
+    asyncio.run(StockIngestionServer(queue, port).serve_until_killed(kill_queue))
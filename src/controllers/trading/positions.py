@@ -0,0 +1,180 @@
+from decimal import Decimal
+import heapq
+from threading import Condition, Thread
+import time
+from typing import Any, Optional
+
+from ibapi.execution import Execution
+from ibapi.order import Order
+
+from consts.trading_consts import (
+    CLOSE_PRICE_SLIPPAGE,
+    DEAD_ORDER_STATUSES,
+    POSITION_MAX_HOLD_SECONDS,
+)
+from controllers.trading.capital import CapitalAllocator
+from ib.app import IBapi, IBError  # type: ignore
+from ib.market_data import MarketDataManager
+from ib.wrapper import get_cached_contract
+from logger.logger import logger
+from models.trading import Position
+from utils.math_utils import D
+
+
+class PositionManager:
+    """Follows many open brackets from their order callbacks.
+
+    The manager is registered with the order router as the queue of every
+    order of a bracket, so orderStatus and execDetails land in `put` on the
+    EReader thread, which only updates the position. Positions are indexed by
+    all their order ids, and their time based exits wait in a heap that a
+    thread of their own pops, so trading never waits on an open position.
+    """
+
+    app: IBapi
+    market_data: MarketDataManager
+    capital: Optional[CapitalAllocator]
+    max_hold: float
+
+    def __init__(
+        self,
+        app: IBapi,
+        market_data: MarketDataManager,
+        capital: Optional[CapitalAllocator] = None,
+        max_hold: float = POSITION_MAX_HOLD_SECONDS,
+    ) -> None:
+        self.app = app
+        self.market_data = market_data
+        self.capital = capital
+        self.max_hold = max_hold
+        # Order id of every order of a bracket -> its position.
+        self.positions: dict[int, Position] = {}
+        # (monotonic deadline, parent order id), closed positions are skipped.
+        self.exits: list[tuple[float, int]] = []
+        self.condition = Condition()
+        self.is_running = False
+        self.thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        self.is_running = True
+        self.thread = Thread(target=self._run_exits, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def track(self, position: Position) -> None:
+        """Starts following a bracket, to be called before it's placed."""
+        with self.condition:
+            for order_id in position.get_order_ids():
+                self.positions[order_id] = position
+                self.app.order_router.register(order_id, self)
+            heapq.heappush(
+                self.exits, (time.monotonic() + self.max_hold, position.order_id)
+            )
+            self.condition.notify()
+
+    def forget(self, position: Position) -> None:
+        """Stops following a bracket that couldn't be placed."""
+        with self.condition:
+            self._forget(position)
+
+    def get_open(self) -> list[Position]:
+        with self.condition:
+            return list(
+                {
+                    position.order_id: position for position in self.positions.values()
+                }.values()
+            )
+
+    def put(self, item: tuple[int, Any]) -> None:
+        order_id, response = item
+        with self.condition:
+            position = self.positions.get(order_id)
+            if position is None:
+                return
+            if isinstance(response, IBError):
+                # Rejections also come as a Cancelled or Inactive status.
+                logger.error("Order error for %s: %s", position.symbol, response)
+                return
+            if isinstance(response, Execution):
+                if order_id == position.order_id:
+                    position.filled = max(position.filled, D(response.cumQty))
+                return
+            status = response["status"]
+            if order_id == position.order_id:
+                if status == "Filled" or response["filled"] > 0:
+                    position.filled = max(position.filled, D(response["filled"]))
+                elif status in DEAD_ORDER_STATUSES:
+                    logger.info("Bracket for %s was cancelled", position.symbol)
+                    self._forget(position)
+            elif status == "Filled":
+                logger.info("Position in %s is closed", position.symbol)
+                self._forget(position)
+
+    def _forget(self, position: Position) -> None:
+        if self.positions.get(position.order_id) is not position:
+            return
+        if self.capital is not None:
+            self.capital.release(position.capital)
+        for order_id in position.get_order_ids():
+            self.positions.pop(order_id, None)
+            self.app.order_router.unregister(order_id)
+
+    def _run_exits(self) -> None:
+        while True:
+            with self.condition:
+                while self.is_running and not self._is_exit_due():
+                    timeout = (
+                        self.exits[0][0] - time.monotonic() if self.exits else None
+                    )
+                    self.condition.wait(timeout)
+                if not self.is_running:
+                    return
+                _, order_id = heapq.heappop(self.exits)
+                position = self.positions.get(order_id)
+            if position is not None and position.exit_order_id is None:
+                try:
+                    self.close(position)
+                except Exception:
+                    logger.error("Error closing %s", position.symbol, exc_info=True)
+
+    def _is_exit_due(self) -> bool:
+        return len(self.exits) > 0 and self.exits[0][0] <= time.monotonic()
+
+    def close(self, position: Position) -> None:
+        """Cancels what is left of the bracket and closes the filled shares."""
+        logger.info(f"Closing trade for stock: {position.symbol}")
+        for order_id in position.child_order_ids:
+            self.app.cancelOrder(order_id, "")
+        with self.condition:
+            filled = position.filled
+        if filled < abs(position.quantity):
+            self.app.cancelOrder(position.order_id, "")
+        if filled == 0:
+            with self.condition:
+                self._forget(position)
+            return
+
+        price = self.market_data.get_price(position.symbol, "SMART")
+        order = Order()
+        order.orderId = self.app.order_ids.allocate()
+        order.action = "SELL" if position.quantity > 0 else "BUY"
+        order.orderType = "LMT"
+        order.totalQuantity = filled
+        slippage = (
+            -CLOSE_PRICE_SLIPPAGE if order.action == "SELL" else CLOSE_PRICE_SLIPPAGE
+        )
+        order.lmtPrice = D(price + slippage * price, precision=Decimal("0.00"))
+        with self.condition:
+            position.exit_order_id = order.orderId
+            self.positions[order.orderId] = position
+            self.app.order_router.register(order.orderId, self)
+        self.app.placeOrder(
+            order.orderId, get_cached_contract(position.symbol, "SMART"), order
+        )
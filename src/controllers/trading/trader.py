@@ -1,98 +1,86 @@
 from decimal import Decimal
 from queue import Queue
+from threading import Thread
 import time
 from typing import Any, Optional
-from ibapi.order import Order
 import arrow
 
 from consts.algorithem_consts import PRECISION
 from consts.time_consts import TIMEZONE
-from consts.trading_consts import MAX_STOP_LOSS, MIN_TARGET_PROFIT, PERSUMED_TICK_SIZE
-from controllers.evaluation.groups import get_group_for_score
+from consts.trading_consts import TRADING_LANE_MAX_QUEUED_STOCKS, TRADING_LANES
+from controllers.evaluation.groups import GroupIndex
+from controllers.trading.brackets import get_bracket_order, is_tradable_price
+from controllers.trading.capital import CapitalAllocator
+from controllers.trading.positions import PositionManager
 from ib.app import IBapi  # type: ignore
 from ibapi.contract import Contract
-from ib.wrapper import get_account_usd, get_contract, get_current_stock_price
+from ib.account import AccountService
+from ib.market_data import MarketDataManager
+from ib.order_ids import BRACKET_ORDER_IDS
+from ib.wrapper import get_cached_contract
 from models.trading import GroupRatio, Position, Stock
 from persistency.data_handler import load_groups_from_file
 from utils.math_utils import D
+from logger.latency import latency_recorder
 from logger.logger import logger
 
 
 class Trader:
+    """Takes signals off the queue and trades them on per-symbol lanes.
+
+    Every lane is a thread with its own queue, and a symbol always goes to the
+    same lane, so signals of different symbols are priced, sized and ordered
+    side by side while those of one symbol are traded in order. The lanes share
+    the market data, the account state and the capital allocator.
+    """
+
     app: IBapi
-    groups: list[GroupRatio]
+    groups: GroupIndex
     trade_events_queue: Queue[Optional[Stock]]
-    app_queue: Queue[Any]
     kill_queue: Queue[Any]
-
-    open_positions: list[Position] = []
+    market_data: MarketDataManager
+    account: AccountService
+    capital: CapitalAllocator
+    positions: PositionManager
+    lanes: list[Queue[Optional[Stock]]]
 
     def __init__(
         self,
         app: IBapi,
         trade_event_queue: Queue[Optional[Stock]],
-        app_queue: Queue[Any],
         kill_queue: Queue[Any],
+        lanes: int = TRADING_LANES,
     ) -> None:
         self.app = app
-        self.groups = load_groups_from_file()
+        self.groups = GroupIndex(load_groups_from_file())
         self.trade_events_queue = trade_event_queue
-        self.app_queue = app_queue
         self.kill_queue = kill_queue
+        self.market_data = MarketDataManager(app)
+        self.account = AccountService(app)
+        self.account.start()
+        self.capital = CapitalAllocator()
+        self.positions = PositionManager(app, self.market_data, self.capital)
+        self.positions.start()
+        # Bounded, so a backlog backs up to the trade events queue.
+        self.lanes = [
+            Queue[Optional[Stock]](TRADING_LANE_MAX_QUEUED_STOCKS) for _ in range(lanes)
+        ]
 
     def should_exit(self) -> bool:
         return not self.kill_queue.empty()
 
-    def wait_for_open_positions(self) -> None:
-        logger.info("Waiting for open positions")
-        while len(self.open_positions) > 0:
-            trade: Optional[dict[Any, Any]] = None
-            try:
-                trade = self.app_queue.get(timeout=10)
-            except:
-                pass
-            if trade is not None and trade["status"] == "Filled":
-                for open_position in self.open_positions:
-                    if open_position.order_id == trade["order_id"]:
-                        self.open_positions.remove(open_position)
-                        break
-            for open_position in self.open_positions:
-                if (
-                    open_position.datetime
-                    >= arrow.get(open_position.datetime, TIMEZONE)
-                    .shift(minute=5)
-                    .datetime
-                ):
-                    self.close_trade(open_position)
-                    self.open_positions.remove(open_position)
-
-    def close_trade(self, position: Position) -> None:
-        logger.info(f"Closing trade for stock: {position.symbol}")
-        contract: Contract = get_contract(position.symbol, "SMART")
-        order_id = self.app.nextValidOrderId
-        current_stock_price = get_current_stock_price(
-            self.app, position.symbol, "SMART", self.app_queue
-        )
-        order = Order()
-        order.orderId = order_id
-        order.action = "SELL" if position.quantity > 0 else "BUY"
-        order.orderType = "LMT"
-        order.totalQuantity = position.quantity
-        order.lmtPrice = (
-            current_stock_price + D("0.01") * current_stock_price
-            if order.action == "BUY"
-            else current_stock_price + D("0.01") * current_stock_price
-        )
-        self.app.placeOrder(self.app.nextValidOrderId, contract, order)
-        response = self.app_queue.get()
-        logger.info(response)
-
     def main_loop(self, is_test: bool = False) -> None:
+        lane_threads = [
+            Thread(target=self.run_lane, args=(lane,), daemon=True)
+            for lane in self.lanes
+        ]
+        for lane_thread in lane_threads:
+            lane_thread.start()
         try:
             while True:
-                self.wait_for_open_positions()
+                latency_recorder.report_if_due()
                 if self.should_exit():
-                    return
+                    break
                 stock: Optional[Stock] = None
                 try:
                     stock = self.trade_events_queue.get(timeout=10)
@@ -100,22 +88,40 @@ class Trader:
                     continue
                 if stock is None:
                     continue
-
-                datetime = stock.article.datetime
-                if datetime < arrow.now(tz=TIMEZONE).shift(minutes=-2).datetime:
-                    logger.info("Stock is too old, skipping")
-                    continue
-                matching_group = get_group_for_score(
-                    self.groups,
-                    stock.score,
-                )
-                self.trade(stock, matching_group)
+                latency_recorder.mark(stock.timestamps, "dequeued")
                 if is_test:
-                    self.wait_for_open_positions()
-                    return
+                    self.handle(stock)
+                    break
+                self.lanes[hash(stock.symbol) % len(self.lanes)].put(stock)
         except Exception:
             logger.critical("Error in main loop", exc_info=True)
             raise
+        finally:
+            for lane in self.lanes:
+                lane.put(None)
+            for lane_thread in lane_threads:
+                lane_thread.join()
+            self.account.stop()
+            self.positions.stop()
+
+    def run_lane(self, lane: Queue[Optional[Stock]]) -> None:
+        while True:
+            stock = lane.get()
+            if stock is None:
+                return
+            self.handle(stock)
+
+    def handle(self, stock: Stock) -> None:
+        try:
+            datetime = stock.article.datetime
+            if datetime < arrow.now(tz=TIMEZONE).shift(minutes=-2).datetime:
+                logger.info("Stock is too old, skipping")
+                return
+            matching_group = self.groups.get_group(stock.score)
+            self.trade(stock, matching_group)
+            latency_recorder.record(stock.timestamps)
+        except Exception:
+            logger.error(f"Error trading stock: {stock.symbol}", exc_info=True)
 
     def trade(
         self,
@@ -125,54 +131,55 @@ class Trader:
         logger.info(
             f"Trading stock: {stock.symbol} with group ratio: {group_ratio.get_json()}"
         )
-        contract: Contract = get_contract(stock.symbol, "SMART")
-        action = "BUY" if group_ratio.target_profit > 0 else "SELL"
-        stock_price = get_current_stock_price(
-            self.app, stock.symbol, "SMART", self.app_queue
-        )
-        if not (1 <= stock_price <= 30):
+        contract: Contract = get_cached_contract(stock.symbol, "SMART")
+        stock_price = self.market_data.get_price(stock.symbol, "SMART")
+        latency_recorder.mark(stock.timestamps, "priced")
+        if not is_tradable_price(stock_price):
             return
-        account_usd = get_account_usd(self.app, self.app_queue)
-        quantity = int(account_usd / stock_price)
-        price_limit = D(
-            (
-                stock_price + stock_price * D("0.01")
-                if action == "BUY"
-                else stock_price - stock_price * D("0.01")
-            ),
-            precision=Decimal("0.00"),
-        )
-        target_profit = D(
-            stock_price + (group_ratio.target_profit * stock_price),
-            precision=Decimal("0.00"),
-        )
-        stop_loss = D(
-            stock_price + (group_ratio.stop_loss * stock_price),
-            precision=Decimal("0.00"),
-        )
-        if (
-            abs((target_profit / stock_price) - 1) >= MIN_TARGET_PROFIT
-            and abs((stop_loss / stock_price) - 1) <= MAX_STOP_LOSS
-        ):
-            self.app.placeBracketOrder(
-                self.app.nextValidOrderId,
-                action,
-                quantity,
-                price_limit,
-                target_profit,
-                stop_loss,
-                contract,
-            )
-            response = self.app_queue.get()
-            logger.info(response)
-            self.open_positions.append(
-                Position(
-                    order_id=response["order_id"],
+        account_usd = self.account.get_account_usd()
+        latency_recorder.mark(stock.timestamps, "account")
+        capital = self.capital.reserve(account_usd)
+        position: Optional[Position] = None
+        try:
+            bracket_order = get_bracket_order(stock_price, group_ratio, capital)
+            if bracket_order is None or bracket_order.quantity == 0:
+                logger.info(f"Not trading stock: {stock.symbol}, capital: {capital}")
+                self.capital.release(capital)
+            else:
+                latency_recorder.mark(stock.timestamps, "sized")
+                cost = bracket_order.quantity * stock_price
+                order_id = self.app.order_ids.allocate(BRACKET_ORDER_IDS)
+                quantity = Decimal(bracket_order.quantity)
+                new_position = Position(
+                    order_id=order_id,
                     symbol=stock.symbol,
-                    quantity=D(quantity),
+                    quantity=quantity if bracket_order.action == "BUY" else -quantity,
                     datetime=arrow.now(tz=TIMEZONE).datetime,
+                    child_order_ids=(order_id + 1, order_id + 2),
+                    capital=cost,
+                )
+                self.positions.track(new_position)
+                position = new_position
+                self.app.placeBracketOrder(
+                    order_id,
+                    bracket_order.action,
+                    bracket_order.quantity,
+                    bracket_order.price_limit,
+                    bracket_order.target_profit,
+                    bracket_order.stop_loss,
+                    contract,
                 )
-            )
+                # What the shares don't take is free for the other lanes.
+                self.capital.release(capital - cost)
+                latency_recorder.mark(stock.timestamps, "ordered")
+        except Exception:
+            # Forgetting the position releases its cost, the rest is released
+            # here.
+            if position is not None:
+                self.positions.forget(position)
+                capital -= position.capital
+            self.capital.release(capital)
+            raise
 
         print(
             f"Trading stock: {stock.symbol} with group ratio: {group_ratio.get_json()}"
@@ -0,0 +1,142 @@
+from decimal import Decimal
+from threading import Lock
+import time
+from typing import Any, Optional
+
+from consts.trading_consts import (
+    ACCOUNT_STATE_MAX_AGE_SECONDS,
+    ACCOUNT_SUBSCRIPTION_RETRY_SECONDS,
+    ACCOUNT_SUMMARY_TAGS,
+    MAX_CASH_VALUE,
+)
+from ib.app import IBapi, IBError  # type: ignore
+from ib.wrapper import get_account_usd
+from logger.logger import logger
+from utils.math_utils import D
+
+
+class AccountService:
+    """In-memory account state fed by one standing account summary.
+
+    The service is registered with the response router as the queue of its
+    summary request, so TWS updates land in `put` on the EReader thread and
+    reads never wait on the network. TWS only resends values that changed, so
+    they stay current for as long as the subscription is live: until an error
+    or until the session it was made in is lost. Reads then request it again,
+    at most every `retry_interval`, and a summary requested in the meantime is
+    kept for `max_age`. Positions come from reqPositions and are kept by
+    IBapi.position.
+    """
+
+    app: IBapi
+    max_age: float
+    retry_interval: float
+
+    def __init__(
+        self,
+        app: IBapi,
+        max_age: float = ACCOUNT_STATE_MAX_AGE_SECONDS,
+        retry_interval: float = ACCOUNT_SUBSCRIPTION_RETRY_SECONDS,
+    ) -> None:
+        self.app = app
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.values: dict[str, str] = {}
+        self.is_live = False
+        # Cash balance of the last requested summary, with its monotonic time.
+        self.requested_usd: Optional[tuple[Decimal, float]] = None
+        self.req_id: Optional[int] = None
+        # IBapi.sessions and the monotonic time of the last subscription.
+        self.session = 0
+        self.subscribed_at = 0.0
+        self.lock = Lock()
+
+    def start(self) -> None:
+        with self.lock:
+            self.req_id = self._claim_subscription()
+        self._subscribe(self.req_id)
+        self.app.reqPositions()
+
+    def _claim_subscription(self) -> int:
+        self.session = self.app.sessions
+        self.subscribed_at = time.monotonic()
+        req_id: int = self.app.get_request_id()
+        return req_id
+
+    def _subscribe(self, req_id: int) -> None:
+        self.app.router.register(req_id, self)
+        self.app.reqAccountSummary(req_id, "All", ACCOUNT_SUMMARY_TAGS)
+
+    def _resubscribe_if_dead(self) -> None:
+        with self.lock:
+            if self.req_id is None or not self.app.isConnected():
+                return
+            is_lost = self.session != self.app.sessions
+            if is_lost:
+                self.is_live = False
+            if (
+                self.is_live
+                or time.monotonic() - self.subscribed_at < self.retry_interval
+            ):
+                return
+            dead_req_id = self.req_id
+            req_id = self.req_id = self._claim_subscription()
+            self.values = {}
+        logger.info("Requesting the account summary subscription again")
+        self.app.router.unregister(dead_req_id)
+        if not is_lost:
+            self.app.cancelAccountSummary(dead_req_id)
+        self._subscribe(req_id)
+        if is_lost:
+            self.app.reqPositions()
+
+    def stop(self) -> None:
+        if self.req_id is None:
+            return
+        self.app.cancelAccountSummary(self.req_id)
+        self.app.cancelPositions()
+        self.app.router.unregister(self.req_id)
+        self.req_id = None
+        with self.lock:
+            self.is_live = False
+
+    def put(self, item: tuple[int, Any]) -> None:
+        _, response = item
+        if isinstance(response, IBError):
+            logger.error("Account summary error: %s", response)
+            with self.lock:
+                self.is_live = False
+            return
+        with self.lock:
+            # None marks accountSummaryEnd, sent after every full update.
+            if response is not None:
+                tag, value = response
+                self.values[tag] = value
+            self.is_live = True
+
+    def get_value(self, tag: str) -> Optional[Decimal]:
+        """The latest value of `tag`, or None when missing or stale."""
+        self._resubscribe_if_dead()
+        with self.lock:
+            if not self.is_live or not self.app.isConnected() or tag not in self.values:
+                return None
+            return D(self.values[tag])
+
+    def get_position(self, symbol: str) -> Decimal:
+        return D(self.app.positions.get(symbol, 0))
+
+    def get_account_usd(self) -> Decimal:
+        usd = self.get_value("CashBalance")
+        if usd is not None:
+            return usd.min(MAX_CASH_VALUE)
+        with self.lock:
+            requested_usd = self.requested_usd
+        if requested_usd is not None:
+            usd, requested_at = requested_usd
+            if time.monotonic() - requested_at <= self.max_age:
+                return usd
+        logger.info("Account state is stale, requesting account summary")
+        usd = get_account_usd(self.app)
+        with self.lock:
+            self.requested_usd = (usd, time.monotonic())
+        return usd
@@ -1,44 +1,158 @@
 # type: ignore
 from decimal import Decimal
+import inspect
+import itertools
 import logging
+import time
 from queue import Queue
-from typing import Any
+import threading
+from threading import Lock
+from typing import Any, NamedTuple, Optional
+from ibapi import comm
 from ibapi.client import EClient
 from ibapi.wrapper import EWrapper
 from ibapi.utils import current_fn_name
 import pandas as pd
-import arrow
-from ibapi.order import Order
 from ibapi.contract import Contract
+from ibapi.execution import Execution
 from ibapi.common import TickAttrib, TickerId
 from ibapi.ticktype import TickType
 
-from consts.time_consts import AWARE_DATETIME_FORMATTING
+from consts.networking_consts import (
+    DATA_LOST_ERROR_CODE,
+    HISTORICAL_DATA_PACING_BURST,
+    HISTORICAL_DATA_PACING_RATE,
+    INFORMATIONAL_ERROR_CODES,
+    REQUEST_ID_START,
+)
+from consts.data_consts import CALLBACK_LOG_LEVEL
+from consts.time_consts import HISTORICAL_DATA_BARS_CAPACITY
+from ib.bars import BarsBuffer
+from ib.order_ids import OrderIdAllocator
+from ib.orders import get_bracket_orders
 from logger.logger import logger
 from utils.math_utils import D
+from utils.rate_utils import TokenBucket
+
+
+# The pinned ibapi 10.19 takes the time of a manual cancel, older ones don't.
+CANCEL_ORDER_TAKES_TIME = (
+    "manualCancelOrderTime" in inspect.signature(EClient.cancelOrder).parameters
+)
+
+
+class IBError(NamedTuple):
+    reqId: int
+    errorCode: int
+    errorString: str
+
+
+# Live and delayed tick types of each quote field.
+BID_TICK_TYPES = (1, 66)
+ASK_TICK_TYPES = (2, 67)
+LAST_TICK_TYPES = (4, 68)
+
+
+class Quote(NamedTuple):
+    """Latest prices of a symbol, with the time.time() each was updated."""
+
+    bid: Optional[float] = None
+    bid_time: Optional[float] = None
+    ask: Optional[float] = None
+    ask_time: Optional[float] = None
+    last: Optional[float] = None
+    last_time: Optional[float] = None
+
+
+class ResponseRouter:
+    """Routes replies to the queue registered for their reqId / orderId.
+
+    IBapi keeps one router for reqIds and one for order ids: both count up
+    from wherever TWS or REQUEST_ID_START put them, so the same number can be
+    live as both.
+
+    Every reply is put as a (reqId, data) tuple, so one queue can be
+    registered for several requests.
+    """
+
+    def __init__(self) -> None:
+        self.queues: dict[int, Queue[Any]] = {}
+        self.lock = Lock()
+
+    def register(
+        self, request_id: int, queue: Optional[Queue[Any]] = None
+    ) -> Queue[Any]:
+        if queue is None:
+            queue = Queue[Any]()
+        with self.lock:
+            self.queues[request_id] = queue
+        return queue
+
+    def unregister(self, request_id: int) -> None:
+        with self.lock:
+            self.queues.pop(request_id, None)
+
+    def is_registered(self, request_id: int) -> bool:
+        with self.lock:
+            return request_id in self.queues
+
+    def put(self, request_id: int, data: Any) -> bool:
+        with self.lock:
+            queue = self.queues.get(request_id)
+        if queue is None:
+            return False
+        queue.put((request_id, data))
+        return True
 
 
 class IBapi(EWrapper, EClient):  # type: ignore
     def __init__(self, queue: Queue[Any]) -> None:
         EClient.__init__(self, self)
-        self.data = []
-        self.df = None
         self.queue = queue
         self.nextValidOrderId = 0
+        self.order_ids = OrderIdAllocator()
+        # Messages of the current thread held back to be sent in one write.
+        self.batched_messages = threading.local()
+        self.request_ids = itertools.count(REQUEST_ID_START)
+        # Bars buffered per reqId until historicalDataEnd.
+        self.historical_data = {}
+        self.router = ResponseRouter()
+        self.order_router = ResponseRouter()
+        # Streaming market data: reqId -> symbol, and symbol -> latest Quote.
+        self.quote_subscriptions = {}
+        self.quotes = {}
+        # symbol -> position, kept by reqPositions.
+        self.positions = {}
+        # Counts the times subscriptions were lost, by a new connection or by
+        # TWS losing its own.
+        self.sessions = 0
+        self.historical_data_pacing = TokenBucket(
+            HISTORICAL_DATA_PACING_BURST, HISTORICAL_DATA_PACING_RATE
+        )
+
+    def get_request_id(self) -> int:
+        return next(self.request_ids)
 
     # Logging
 
     def insert_to_queue(self, data: Any) -> None:
         self.queue.put(data)
 
-    def logAnswer(self, fnName, fnParams):
-        if logger.isEnabledFor(logging.INFO):
+    def insert_response(self, reqId: int, data: Any) -> None:
+        if not self.router.put(reqId, data):
+            logger.warning("Dropping response for unknown reqId: %s", reqId)
+
+    def logAnswer(self, fnName, fnParams, level=CALLBACK_LOG_LEVEL):
+        """Callbacks are logged at CALLBACK_LOG_LEVEL, below the logger's by
+        default, so the EReader thread doesn't spend its time on them. Orders'
+        callbacks pass INFO, they're the audit trail."""
+        if logger.isEnabledFor(level):
             if "self" in fnParams:
                 prms = dict(fnParams)
                 del prms["self"]
             else:
                 prms = fnParams
-            logger.info("ANSWER function: %s, parameters: %s", fnName, prms)
+            logger.log(level, "ANSWER function: %s, parameters: %s", fnName, prms)
 
     def error(
         self,
@@ -50,8 +164,16 @@ class IBapi(EWrapper, EClient):  # type: ignore
         """This event is called when there is an error with the
         communication or when TWS wants to send a message to the client."""
         self.logAnswer(current_fn_name(), vars())
+        if errorCode == DATA_LOST_ERROR_CODE:
+            self.sessions += 1
+        # Informational codes are only logged, their request goes on.
+        is_informational = (
+            2100 <= errorCode < 2200 or errorCode in INFORMATIONAL_ERROR_CODES
+        )
+        level = logging.WARNING if is_informational else logging.ERROR
         if advancedOrderRejectJson:
-            logger.error(
+            logger.log(
+                level,
                 "ERROR %s %s %s %s",
                 reqId,
                 errorCode,
@@ -59,23 +181,32 @@ class IBapi(EWrapper, EClient):  # type: ignore
                 advancedOrderRejectJson,
             )
         else:
-            logger.error("ERROR %s %s %s", reqId, errorCode, errorString)
+            logger.log(level, "ERROR %s %s %s", reqId, errorCode, errorString)
+        if is_informational:
+            return
+        # Errors of orders come with the order id, of requests with the reqId.
+        # An order registered under the id takes it.
+        if self.order_router.is_registered(reqId):
+            self.order_router.put(reqId, IBError(reqId, errorCode, errorString))
+        elif self.router.is_registered(reqId):
+            self.historical_data.pop(reqId, None)
+            self.router.put(reqId, IBError(reqId, errorCode, errorString))
 
     def historicalData(self, reqId, bar):
-        self.logAnswer(current_fn_name(), vars())
-        bar_dict = vars(bar)
-        bar_dict["date"] = arrow.get(
-            bar_dict["date"], AWARE_DATETIME_FORMATTING
-        ).datetime
-        self.data.append(vars(bar))
+        # Hot path of the evaluation sweep: bars aren't logged one by one.
+        bars = self.historical_data.get(reqId)
+        if bars is None:
+            bars = self.historical_data[reqId] = BarsBuffer(
+                bar, HISTORICAL_DATA_BARS_CAPACITY
+            )
+        bars.append(bar)
 
     def historicalDataEnd(self, reqId: int, start: str, end: str):
         self.logAnswer(current_fn_name(), vars())
-        self.df = pd.DataFrame(self.data)
-        self.df.set_index("date", inplace=True)
-        self.insert_to_queue(self.df)
-        self.df = None
-        self.data = []
+        bars = self.historical_data.pop(reqId, None)
+        df = bars.to_df() if bars is not None else pd.DataFrame()
+        logger.info("Got %s bars for reqId: %s", len(df), reqId)
+        self.insert_response(reqId, df)
 
     def placeBracketOrder(
         self,
@@ -87,50 +218,57 @@ class IBapi(EWrapper, EClient):  # type: ignore
         stopLossPrice: float,
         contract: Contract,
     ):
-        self.logAnswer(current_fn_name(), vars())
-        parent = Order()
-
-        parent.orderId = parentOrderId
-        parent.action = action
-        parent.orderType = "LMT"
-        parent.totalQuantity = quantity
-        parent.lmtPrice = priceLimit
-        parent.transmit = False
-        parent.outsideRth = True
-
-        takeProfit = Order()
-        takeProfit.orderId = parent.orderId + 1
-        takeProfit.action = "SELL" if action == "BUY" else "BUY"
-        takeProfit.orderType = "LMT"
-        takeProfit.totalQuantity = quantity
-        takeProfit.lmtPrice = takeProfitLimitPrice
-        takeProfit.parentId = parentOrderId
-        takeProfit.transmit = False
-        takeProfit.outsideRth = True
-
-        stopLoss = Order()
-        stopLoss.orderId = parent.orderId + 2
-        stopLoss.action = "SELL" if action == "BUY" else "BUY"
-        stopLoss.orderType = "STP"
-        stopLoss.auxPrice = stopLossPrice
-        stopLoss.totalQuantity = quantity
-        stopLoss.parentId = parentOrderId
-        stopLoss.transmit = True
-        stopLoss.outsideRth = True
-
-        bracketOrder = [parent, takeProfit, stopLoss]
-        for order in bracketOrder:
-            self.placeOrder(order.orderId, contract, order)
+        logger.info(
+            "Placing bracket %s: %s %s %s at %s, take profit %s, stop loss %s",
+            parentOrderId,
+            action,
+            quantity,
+            contract.symbol,
+            priceLimit,
+            takeProfitLimitPrice,
+            stopLossPrice,
+        )
+        orders = get_bracket_orders(
+            parentOrderId,
+            action,
+            quantity,
+            priceLimit,
+            takeProfitLimitPrice,
+            stopLossPrice,
+        )
+        # One write for the three orders, which no other thread's can split.
+        self.batched_messages.messages = []
+        try:
+            for order in orders:
+                self.placeOrder(order.orderId, contract, order)
+        finally:
+            messages = self.batched_messages.messages
+            self.batched_messages.messages = None
+        if len(messages) > 0:
+            self.conn.sendMsg(b"".join(messages))
+
+    def sendMsg(self, msg):
+        messages = getattr(self.batched_messages, "messages", None)
+        if messages is None:
+            EClient.sendMsg(self, msg)
+        else:
+            messages.append(comm.make_msg(msg))
+
+    def cancelOrder(self, orderId: int, manualCancelOrderTime: str):
+        if CANCEL_ORDER_TAKES_TIME:
+            EClient.cancelOrder(self, orderId, manualCancelOrderTime)
+        else:
+            EClient.cancelOrder(self, orderId)
 
     def accountSummary(
         self, reqId: int, account: str, tag: str, value: str, currency: str
     ):
         self.logAnswer(current_fn_name(), vars())
-        self.insert_to_queue((tag, value))
+        self.insert_response(reqId, (tag, value))
 
     def accountSummaryEnd(self, reqId: int):
         self.logAnswer(current_fn_name(), vars())
-        self.insert_to_queue(None)
+        self.insert_response(reqId, None)
 
     # def historicalDataUpdate(self, reqId, bar):
     #     line = vars(bar)
@@ -144,12 +282,42 @@ class IBapi(EWrapper, EClient):  # type: ignore
         """Market data tick price callback. Handles all price related ticks."""
 
         self.logAnswer(current_fn_name(), vars())
-        if tickType == 2:
-            self.insert_to_queue(price)
+        symbol = self.quote_subscriptions.get(reqId)
+        if symbol is not None:
+            self.update_quote(symbol, tickType, price)
+        elif tickType == 2:
+            self.router.put(reqId, price)
 
-    def nextValidId(self, orderId: int):
+    def update_quote(self, symbol: str, tickType: TickType, price: float):
+        now = time.time()
+        quote = self.quotes.get(symbol, Quote())
+        if tickType in BID_TICK_TYPES:
+            quote = quote._replace(bid=price, bid_time=now)
+        elif tickType in ASK_TICK_TYPES:
+            quote = quote._replace(ask=price, ask_time=now)
+        elif tickType in LAST_TICK_TYPES:
+            quote = quote._replace(last=price, last_time=now)
+        else:
+            return
+        self.quotes[symbol] = quote
+
+    def position(
+        self, account: str, contract: Contract, position: Decimal, avgCost: float
+    ):
         self.logAnswer(current_fn_name(), vars())
+        if position == 0:
+            self.positions.pop(contract.symbol, None)
+        else:
+            self.positions[contract.symbol] = position
+
+    def connectAck(self):
+        self.logAnswer(current_fn_name(), vars(), logging.INFO)
+        self.sessions += 1
+
+    def nextValidId(self, orderId: int):
+        self.logAnswer(current_fn_name(), vars(), logging.INFO)
         self.nextValidOrderId = orderId
+        self.order_ids.seed(orderId)
 
     def orderStatus(
         self,
@@ -165,20 +333,24 @@ class IBapi(EWrapper, EClient):  # type: ignore
         whyHeld: str,
         mktCapPrice: float,
     ):
-        self.logAnswer(current_fn_name(), vars())
-        if status == "Filled":
-            self.insert_to_queue(
-                {
-                    "order_id": orderId,
-                    "status": status,
-                    "filled": filled,
-                    "remaining": remaining,
-                    "avgFillPrice": avgFillPrice,
-                    "permId": permId,
-                    "parentId": parentId,
-                    "lastFillPrice": lastFillPrice,
-                    "clientId": clientId,
-                    "whyHeld": whyHeld,
-                    "mktCapPrice": mktCapPrice,
-                }
-            )
+        self.logAnswer(current_fn_name(), vars(), logging.INFO)
+        order_status = {
+            "order_id": orderId,
+            "status": status,
+            "filled": filled,
+            "remaining": remaining,
+            "avgFillPrice": avgFillPrice,
+            "permId": permId,
+            "parentId": parentId,
+            "lastFillPrice": lastFillPrice,
+            "clientId": clientId,
+            "whyHeld": whyHeld,
+            "mktCapPrice": mktCapPrice,
+        }
+        # Fills of orders nobody tracks go to the shared queue.
+        if not self.order_router.put(orderId, order_status) and status == "Filled":
+            self.insert_to_queue(order_status)
+
+    def execDetails(self, reqId: int, contract: Contract, execution: Execution):
+        self.logAnswer(current_fn_name(), vars(), logging.INFO)
+        self.order_router.put(execution.orderId, execution)
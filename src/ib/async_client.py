@@ -0,0 +1,221 @@
+import asyncio
+from decimal import Decimal
+from typing import Any, Optional, Union
+import arrow
+from ibapi.contract import Contract
+from pandas import DataFrame
+
+from consts.networking_consts import (
+    HISTORICAL_DATA_MAX_RETRIES,
+    HISTORICAL_DATA_RETRY_ERROR_CODES,
+    HISTORICAL_DATA_TIMEOUT_SECONDS,
+    MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS,
+)
+from consts.time_consts import TIMEZONE
+from consts.trading_consts import BRACKET_FILL_TIMEOUT_SECONDS, DEAD_ORDER_STATUSES
+from ib.app import IBapi, IBError, ResponseRouter  # type: ignore
+from ib.scheduler import HistoricalDataRequest
+from ib.wrapper import (
+    get_contract,
+    get_end_date_time,
+    get_historical_data_cache_key,
+    get_historical_data_request,
+)
+from models.evaluation import Evaluation
+from persistency.bars_cache import load_bars_from_cache, save_bars_to_cache
+from logger.logger import logger
+from utils.math_utils import D
+
+
+class LoopQueue:
+    """Queue-like end of the response router that hands replies to a loop.
+
+    The router calls `put` on the EReader thread; the reply is moved onto an
+    asyncio queue with call_soon_threadsafe so coroutines can await it.
+    """
+
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue[Any]
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, item: Any) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    async def get_response(self) -> Any:
+        """The next reply, IBError included."""
+        _, response = await self.queue.get()
+        return response
+
+    async def get(self) -> Any:
+        response = await self.get_response()
+        if isinstance(response, IBError):
+            raise ValueError(f"Error {response.errorCode} for reqId {response.reqId}")
+        return response
+
+
+class AsyncIBClient:
+    """Awaitable facade over IBapi for code running on an event loop."""
+
+    app: IBapi
+
+    def __init__(self, app: IBapi) -> None:
+        self.app = app
+
+    def _register(
+        self, request_id: int, router: Optional[ResponseRouter] = None
+    ) -> LoopQueue:
+        loop_queue = LoopQueue(asyncio.get_running_loop())
+        (router or self.app.router).register(request_id, loop_queue)
+        return loop_queue
+
+    async def historical_data(self, evaluation: Evaluation) -> Optional[DataFrame]:
+        request = get_historical_data_request(evaluation)
+        cache_key = get_historical_data_cache_key(request)
+        cached_df = load_bars_from_cache(cache_key)
+        if cached_df is not None:
+            return cached_df
+
+        attempts = 0
+        while True:
+            response = await self._request_historical_data(request)
+            if isinstance(response, DataFrame):
+                df = response
+                break
+            if response is None:
+                reason = "timeout"
+            elif response.errorCode in HISTORICAL_DATA_RETRY_ERROR_CODES:
+                # Back off in case the error is a pacing violation.
+                self.app.historical_data_pacing.drain()
+                reason = f"error {response.errorCode}"
+            else:
+                logger.error(
+                    "Error %s getting historical data for %s",
+                    response.errorCode,
+                    evaluation,
+                )
+                return None
+            attempts += 1
+            if attempts > HISTORICAL_DATA_MAX_RETRIES:
+                logger.error(
+                    "Giving up on historical data for %s: %s", evaluation, reason
+                )
+                return None
+
+        if len(df) == 0:
+            return None
+        # Bars of a window that hasn't ended yet may still change.
+        if get_end_date_time(evaluation) < arrow.now(tz=TIMEZONE):
+            save_bars_to_cache(cache_key, df)
+        return df
+
+    async def _request_historical_data(
+        self, request: HistoricalDataRequest
+    ) -> Union[DataFrame, IBError, None]:
+        """The bars or the error of one request, None if it timed out."""
+        while not self.app.historical_data_pacing.try_acquire():
+            await asyncio.sleep(self.app.historical_data_pacing.get_wait_time())
+        req_id = self.app.get_request_id()
+        loop_queue = self._register(req_id)
+        try:
+            self.app.reqHistoricalData(
+                req_id,
+                request.contract,
+                request.end_date_time,  # end date time
+                request.duration,  # duration
+                request.bar_size,  # bar size
+                request.what_to_show,  # what to show
+                0,  # is regular trading hours
+                1,  # format date
+                False,  # keep up to date
+                [],  # chart options
+            )
+            response: Union[DataFrame, IBError] = await asyncio.wait_for(
+                loop_queue.get_response(), HISTORICAL_DATA_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            self.app.cancelHistoricalData(req_id)
+            return None
+        finally:
+            self.app.router.unregister(req_id)
+        return response
+
+    async def snapshot_price(self, symbol: str, exchange: str) -> Decimal:
+        req_id = self.app.get_request_id()
+        loop_queue = self._register(req_id)
+        try:
+            self.app.reqMktData(
+                req_id, get_contract(symbol, exchange), "", True, False, []
+            )
+            return D(
+                await asyncio.wait_for(
+                    loop_queue.get(), MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS
+                )
+            )
+        except asyncio.TimeoutError:
+            self.app.cancelMktData(req_id)
+            raise ValueError(f"Timed out getting snapshot price for {symbol}")
+        finally:
+            self.app.router.unregister(req_id)
+
+    async def account_summary(self, tags: str = "$LEDGER") -> dict[str, str]:
+        req_id = self.app.get_request_id()
+        loop_queue = self._register(req_id)
+        summary: dict[str, str] = {}
+        try:
+            self.app.reqAccountSummary(req_id, "All", tags)
+            while (response := await loop_queue.get()) is not None:
+                tag, value = response
+                summary[tag] = value
+            self.app.cancelAccountSummary(req_id)
+        finally:
+            self.app.router.unregister(req_id)
+        return summary
+
+    async def place_bracket_order(
+        self,
+        parent_order_id: int,
+        action: str,
+        quantity: float,
+        price_limit: Decimal,
+        take_profit_limit_price: Decimal,
+        stop_loss_price: Decimal,
+        contract: Contract,
+        timeout: float = BRACKET_FILL_TIMEOUT_SECONDS,
+    ) -> Optional[dict[str, Any]]:
+        """Places the bracket and returns the parent's final status, Filled or
+        one of DEAD_ORDER_STATUSES. None if the parent didn't get there in
+        `timeout`, in which case it's cancelled."""
+        loop_queue = self._register(parent_order_id, self.app.order_router)
+        try:
+            self.app.placeBracketOrder(
+                parent_order_id,
+                action,
+                quantity,
+                price_limit,
+                take_profit_limit_price,
+                stop_loss_price,
+                contract,
+            )
+            order_status: dict[str, Any] = await asyncio.wait_for(
+                self._wait_for_final_status(loop_queue), timeout
+            )
+        except asyncio.TimeoutError:
+            self.app.cancelOrder(parent_order_id, "")
+            logger.error("Timed out waiting for order %s to fill", parent_order_id)
+            return None
+        finally:
+            self.app.order_router.unregister(parent_order_id)
+        return order_status
+
+    async def _wait_for_final_status(self, loop_queue: LoopQueue) -> dict[str, Any]:
+        # Every status of the parent is routed, Submitted comes first.
+        while True:
+            order_status: dict[str, Any] = await loop_queue.get()
+            if (
+                order_status["status"] == "Filled"
+                or order_status["status"] in DEAD_ORDER_STATUSES
+            ):
+                return order_status
@@ -0,0 +1,88 @@
+from operator import attrgetter
+from typing import Any
+import arrow
+import numpy as np
+from numpy import ndarray as NDArray
+import pandas as pd
+from pandas import DataFrame
+
+from consts.time_consts import AWARE_DATETIME_FORMATTING
+
+# Bar fields that aren't stored as float columns.
+DATE_FIELD = "date"
+BAR_COUNT_FIELD = "barCount"
+# Length of "YYYYMMDD HH:mm:ss" at the start of bar dates.
+NAIVE_DATE_LENGTH = 17
+
+
+def parse_bar_dates(dates: list[str]) -> "pd.Index[Any]":
+    """Parses "YYYYMMDD HH:mm:ss ZZZ" bar dates in one go.
+
+    Requests are answered in a single time zone, so the naive part is parsed
+    vectorized and localized once; anything else goes through arrow.
+    """
+    raw_dates = pd.Index(dates)
+    time_zones = raw_dates.str.slice(NAIVE_DATE_LENGTH + 1).unique()
+    if len(time_zones) == 1:
+        try:
+            naive_dates = pd.to_datetime(
+                raw_dates.str.slice(0, NAIVE_DATE_LENGTH), format="%Y%m%d %H:%M:%S"
+            )
+            return pd.DatetimeIndex(naive_dates).tz_localize(
+                time_zones[0], ambiguous="infer"
+            )
+        except Exception:
+            # Unknown zone names and times DST makes ambiguous or missing.
+            pass
+    return pd.Index(
+        [arrow.get(date, AWARE_DATETIME_FORMATTING).datetime for date in dates]
+    )
+
+
+class BarsBuffer:
+    """Bars of one historical data request kept in preallocated columns.
+
+    The float fields of every bar are written into one (fields x capacity)
+    array that doubles when full, dates are kept raw until `to_df`.
+    """
+
+    columns: list[str]
+    bar_count_position: int
+    values: NDArray[Any, Any]
+    bar_counts: NDArray[Any, Any]
+    dates: list[str]
+    size: int
+
+    def __init__(self, first_bar: Any, capacity: int) -> None:
+        fields = [field for field in vars(first_bar) if field != DATE_FIELD]
+        self.bar_count_position = fields.index(BAR_COUNT_FIELD)
+        self.columns = [field for field in fields if field != BAR_COUNT_FIELD]
+        self.get_values = attrgetter(*self.columns)
+        self.values = np.empty((len(self.columns), capacity), dtype=np.float64)
+        self.bar_counts = np.empty(capacity, dtype=np.int64)
+        self.dates = []
+        self.size = 0
+
+    def append(self, bar: Any) -> None:
+        if self.size == self.values.shape[1]:
+            self.values = np.concatenate([self.values, np.empty_like(self.values)], 1)
+            self.bar_counts = np.concatenate(
+                [self.bar_counts, np.empty_like(self.bar_counts)]
+            )
+        self.values[:, self.size] = self.get_values(bar)
+        self.bar_counts[self.size] = bar.barCount
+        self.dates.append(bar.date)
+        self.size += 1
+
+    def to_df(self) -> DataFrame:
+        # The transposed slice is the float block itself, so no bar is copied.
+        df = DataFrame(
+            self.values[:, : self.size].T,
+            columns=self.columns,
+            index=parse_bar_dates(self.dates).rename(DATE_FIELD),
+            copy=False,
+        )
+        df.insert(
+            self.bar_count_position, BAR_COUNT_FIELD, self.bar_counts[: self.size]
+        )
+        return df
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from decimal import Decimal
+from threading import Lock
+import time
+from typing import Optional
+
+from consts.trading_consts import MAX_MARKET_DATA_SUBSCRIPTIONS, MAX_QUOTE_AGE_SECONDS
+from ib.app import IBapi, Quote  # type: ignore
+from ib.wrapper import get_contract, get_current_stock_price
+from logger.logger import logger
+from utils.math_utils import D
+
+
+class MarketDataManager:
+    """Keeps streaming market data for the most recently used symbols.
+
+    IBapi.tickPrice writes the quote table on the EReader thread by swapping in
+    a new immutable Quote, so reads need no lock. Subscribing past
+    `max_subscriptions` cancels the least recently used stream.
+    """
+
+    app: IBapi
+    max_subscriptions: int
+    max_quote_age: float
+
+    def __init__(
+        self,
+        app: IBapi,
+        max_subscriptions: int = MAX_MARKET_DATA_SUBSCRIPTIONS,
+        max_quote_age: float = MAX_QUOTE_AGE_SECONDS,
+    ) -> None:
+        self.app = app
+        self.max_subscriptions = max_subscriptions
+        self.max_quote_age = max_quote_age
+        # symbol -> reqId, least recently used first.
+        self.subscriptions: OrderedDict[str, int] = OrderedDict()
+        self.lock = Lock()
+
+    def subscribe(self, symbol: str, exchange: str = "SMART") -> None:
+        with self.lock:
+            if symbol in self.subscriptions:
+                self.subscriptions.move_to_end(symbol)
+                return
+            if len(self.subscriptions) >= self.max_subscriptions:
+                self._unsubscribe(next(iter(self.subscriptions)))
+            req_id: int = self.app.get_request_id()
+            self.subscriptions[symbol] = req_id
+            self.app.quote_subscriptions[req_id] = symbol
+        logger.info("Subscribing to market data for: %s", symbol)
+        self.app.reqMktData(
+            req_id, get_contract(symbol, exchange), "", False, False, []
+        )
+
+    def _unsubscribe(self, symbol: str) -> None:
+        req_id = self.subscriptions.pop(symbol)
+        logger.info("Unsubscribing from market data for: %s", symbol)
+        self.app.cancelMktData(req_id)
+        self.app.quote_subscriptions.pop(req_id, None)
+        self.app.quotes.pop(symbol, None)
+
+    def get_quote(self, symbol: str) -> Optional[Quote]:
+        quote: Optional[Quote] = self.app.quotes.get(symbol)
+        return quote
+
+    def get_price(self, symbol: str, exchange: str = "SMART") -> Decimal:
+        """The streamed ask, or a snapshot the first time a symbol is seen and
+        when the stream hasn't updated the ask in `max_quote_age`."""
+        self.subscribe(symbol, exchange)
+        quote = self.get_quote(symbol)
+        if (
+            quote is not None
+            and quote.ask is not None
+            and quote.ask > 0
+            and time.time() - quote.ask_time <= self.max_quote_age
+        ):
+            return D(quote.ask)
+        return get_current_stock_price(self.app, symbol, exchange)
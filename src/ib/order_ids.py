@@ -0,0 +1,33 @@
+from threading import Lock
+from typing import Optional
+
+# Parent, take profit and stop loss.
+BRACKET_ORDER_IDS: int = 3
+
+
+class OrderIdAllocator:
+    """Hands out order ids without a reqIds round trip per order.
+
+    Seeded by nextValidId, which TWS sends on connecting. Ids only go up, so a
+    later seed lower than what was already handed out is ignored. Request ids
+    for market and historical data come from IBapi.get_request_id, starting
+    at REQUEST_ID_START far above the order ids.
+    """
+
+    def __init__(self) -> None:
+        self._next_id: Optional[int] = None
+        self._lock = Lock()
+
+    def seed(self, order_id: int) -> None:
+        with self._lock:
+            if self._next_id is None or order_id > self._next_id:
+                self._next_id = order_id
+
+    def allocate(self, count: int = 1) -> int:
+        """The first of `count` consecutive order ids reserved for the caller."""
+        with self._lock:
+            if self._next_id is None:
+                raise ValueError("No valid order id from TWS yet")
+            order_id = self._next_id
+            self._next_id += count
+            return order_id
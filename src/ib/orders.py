@@ -0,0 +1,73 @@
+from decimal import Decimal
+from typing import Union
+
+from ibapi.order import Order
+
+Price = Union[float, Decimal]
+
+
+def _get_template(action: str, order_type: str, transmit: bool) -> Order:
+    order = Order()
+    order.action = action
+    order.orderType = order_type
+    order.transmit = transmit
+    order.outsideRth = True
+    return order
+
+
+def _get_opposite_action(action: str) -> str:
+    return "SELL" if action == "BUY" else "BUY"
+
+
+# Parent, take profit and stop loss of the brackets opened with each action.
+BRACKET_TEMPLATES: dict[str, tuple[Order, Order, Order]] = {
+    action: (
+        _get_template(action, "LMT", False),
+        _get_template(_get_opposite_action(action), "LMT", False),
+        _get_template(_get_opposite_action(action), "STP", True),
+    )
+    for action in ["BUY", "SELL"]
+}
+
+
+def clone_order(template: Order) -> Order:
+    """A copy of the template without running Order.__init__'s ~150 sets.
+
+    The copy is shallow: besides scalars, templates only hold the empty lists
+    and SoftDollarTier Order starts with, which placing an order doesn't
+    change.
+    """
+    order: Order = Order.__new__(Order)
+    order.__dict__.update(template.__dict__)
+    return order
+
+
+def get_bracket_orders(
+    parent_order_id: int,
+    action: str,
+    quantity: Union[int, float, Decimal],
+    price_limit: Price,
+    take_profit_limit_price: Price,
+    stop_loss_price: Price,
+) -> list[Order]:
+    """The parent, take profit and stop loss, ids following the parent's."""
+    parent_template, take_profit_template, stop_loss_template = BRACKET_TEMPLATES[
+        action
+    ]
+    parent = clone_order(parent_template)
+    parent.orderId = parent_order_id
+    parent.totalQuantity = quantity
+    parent.lmtPrice = price_limit
+
+    take_profit = clone_order(take_profit_template)
+    take_profit.orderId = parent_order_id + 1
+    take_profit.parentId = parent_order_id
+    take_profit.totalQuantity = quantity
+    take_profit.lmtPrice = take_profit_limit_price
+
+    stop_loss = clone_order(stop_loss_template)
+    stop_loss.orderId = parent_order_id + 2
+    stop_loss.parentId = parent_order_id
+    stop_loss.totalQuantity = quantity
+    stop_loss.auxPrice = stop_loss_price
+    return [parent, take_profit, stop_loss]
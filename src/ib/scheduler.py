@@ -0,0 +1,137 @@
+from collections import deque
+from queue import Empty, Queue
+import time
+from typing import Any, NamedTuple, Optional
+from ibapi.contract import Contract
+from pandas import DataFrame
+
+from consts.networking_consts import (
+    HISTORICAL_DATA_MAX_IN_FLIGHT,
+    HISTORICAL_DATA_MAX_RETRIES,
+    HISTORICAL_DATA_RETRY_ERROR_CODES,
+    HISTORICAL_DATA_TIMEOUT_SECONDS,
+)
+from ib.app import IBapi  # type: ignore
+from logger.logger import logger
+
+
+class HistoricalDataRequest(NamedTuple):
+    contract: Contract
+    end_date_time: str
+    duration: str
+    bar_size: str
+    what_to_show: str
+
+
+class HistoricalDataScheduler:
+    """Keeps up to `max_in_flight` historical data requests open at once.
+
+    Requests are sent as fast as the app's pacing token bucket allows, replies
+    are matched back by reqId, and requests that time out or fail with a
+    retryable error code are sent again up to `max_retries` times.
+    """
+
+    app: IBapi
+    max_in_flight: int
+    timeout: float
+    max_retries: int
+
+    def __init__(
+        self,
+        app: IBapi,
+        max_in_flight: int = HISTORICAL_DATA_MAX_IN_FLIGHT,
+        timeout: float = HISTORICAL_DATA_TIMEOUT_SECONDS,
+        max_retries: int = HISTORICAL_DATA_MAX_RETRIES,
+    ) -> None:
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def _send(self, request: HistoricalDataRequest, responses: Queue[Any]) -> int:
+        req_id: int = self.app.get_request_id()
+        self.app.router.register(req_id, responses)
+        self.app.reqHistoricalData(
+            req_id,
+            request.contract,
+            request.end_date_time,  # end date time
+            request.duration,  # duration
+            request.bar_size,  # bar size
+            request.what_to_show,  # what to show
+            0,  # is regular trading hours
+            1,  # format date
+            False,  # keep up to date
+            [],  # chart options
+        )
+        return req_id
+
+    def fetch(self, requests: list[HistoricalDataRequest]) -> list[Optional[DataFrame]]:
+        results: list[Optional[DataFrame]] = [None] * len(requests)
+        attempts = [0] * len(requests)
+        pending = deque(range(len(requests)))
+        # reqId -> (request index, deadline)
+        in_flight: dict[int, tuple[int, float]] = {}
+        responses = Queue[Any]()
+
+        def retry_or_fail(index: int, reason: str) -> None:
+            attempts[index] += 1
+            if attempts[index] <= self.max_retries:
+                pending.append(index)
+            else:
+                logger.error(
+                    "Giving up on historical data for %s: %s", requests[index], reason
+                )
+
+        while pending or in_flight:
+            while (
+                pending
+                and len(in_flight) < self.max_in_flight
+                and self.app.historical_data_pacing.try_acquire()
+            ):
+                index = pending.popleft()
+                req_id = self._send(requests[index], responses)
+                in_flight[req_id] = (index, time.monotonic() + self.timeout)
+
+            now = time.monotonic()
+            wait_time = min(
+                [deadline - now for _, deadline in in_flight.values()]
+                + (
+                    [self.app.historical_data_pacing.get_wait_time()]
+                    if pending and len(in_flight) < self.max_in_flight
+                    else []
+                )
+            )
+            reply: Optional[tuple[int, Any]] = None
+            try:
+                reply = responses.get(timeout=max(wait_time, 0))
+            except Empty:
+                pass
+            if reply is not None and reply[0] in in_flight:
+                self.app.router.unregister(reply[0])
+                index, _ = in_flight.pop(reply[0])
+                response = reply[1]
+                if isinstance(response, DataFrame):
+                    if len(response) > 0:
+                        results[index] = response
+                    else:
+                        logger.error("No historical data for %s", requests[index])
+                elif response.errorCode in HISTORICAL_DATA_RETRY_ERROR_CODES:
+                    # Back off in case the error is a pacing violation.
+                    self.app.historical_data_pacing.drain()
+                    retry_or_fail(index, f"error {response.errorCode}")
+                else:
+                    logger.error(
+                        "Error %s getting historical data for %s",
+                        response.errorCode,
+                        requests[index],
+                    )
+
+            now = time.monotonic()
+            for req_id, (index, deadline) in list(in_flight.items()):
+                if deadline <= now:
+                    del in_flight[req_id]
+                    self.app.router.unregister(req_id)
+                    self.app.cancelHistoricalData(req_id)
+                    retry_or_fail(index, "timeout")
+
+        return results
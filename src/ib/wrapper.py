@@ -1,10 +1,12 @@
 from decimal import Decimal
-from queue import Queue
+from functools import lru_cache
+from queue import Empty, Queue
 from typing import Any, Optional
 import arrow
 from ibapi.contract import Contract
 from pandas import DataFrame
 
+from consts.networking_consts import MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS
 from consts.time_consts import (
     BAR_SIZE_SECONDS,
     DATETIME_FORMATTING,
@@ -12,70 +14,127 @@ from consts.time_consts import (
     SECONDS_FROM_END,
     TIMEZONE,
 )
-from consts.trading_consts import MAX_CASH_VALUE
-from ib.app import IBapi  # type: ignore
+from consts.trading_consts import CONTRACT_CACHE_SIZE, MAX_CASH_VALUE
+from ib.app import IBapi, IBError  # type: ignore
+from ib.scheduler import HistoricalDataRequest, HistoricalDataScheduler
 from models.evaluation import Evaluation
+from persistency.bars_cache import (
+    get_bars_cache_key,
+    load_bars_from_cache,
+    save_bars_to_cache,
+)
 from logger.logger import logger
 from utils.math_utils import D
 
 
-def get_historical_data(
-    app: IBapi,
-    evaluation: Evaluation,
-    response_queue: Queue[Any],
-    id: Optional[int] = None,
-) -> DataFrame:
-    logger.info(f"Getting historical data for evaluation: {evaluation}")
+def get_historical_data_request(evaluation: Evaluation) -> HistoricalDataRequest:
     contract = Contract()
     contract.symbol = evaluation.symbol
     contract.secType = "STK"
     contract.exchange = "SMART"  # TODO: change this
     contract.currency = "USD"
 
-    endDate = f"{arrow.get(evaluation.datetime, TIMEZONE).shift(hours=HOURS_FROM_START).format(DATETIME_FORMATTING)} {TIMEZONE}"
-    app.reqHistoricalData(
-        app.nextValidOrderId if id is None else id,
-        contract,
-        endDate,  # end date time
-        f"{SECONDS_FROM_END} S",  # duration
-        f"{BAR_SIZE_SECONDS} secs",  # bar size
-        "MIDPOINT",  # what to show
-        0,  # is regular trading hours
-        1,  # format date
-        False,  # keep up to date
-        [],  # chart options
+    endDate = f"{get_end_date_time(evaluation).format(DATETIME_FORMATTING)} {TIMEZONE}"
+    return HistoricalDataRequest(
+        contract=contract,
+        end_date_time=endDate,
+        duration=f"{SECONDS_FROM_END} S",
+        bar_size=f"{BAR_SIZE_SECONDS} secs",
+        what_to_show="MIDPOINT",
     )
-    df: DataFrame = response_queue.get()
 
-    return df
 
+def get_end_date_time(evaluation: Evaluation) -> arrow.Arrow:
+    return arrow.get(evaluation.datetime, TIMEZONE).shift(hours=HOURS_FROM_START)
+
+
+def get_historical_data_cache_key(request: HistoricalDataRequest) -> str:
+    return get_bars_cache_key(
+        request.contract.symbol,
+        request.end_date_time,
+        request.duration,
+        request.bar_size,
+        request.what_to_show,
+    )
+
+
+def get_historical_data_batch(
+    app: IBapi, evaluations: list[Evaluation]
+) -> list[Optional[DataFrame]]:
+    requests = [get_historical_data_request(evaluation) for evaluation in evaluations]
+    results: list[Optional[DataFrame]] = [
+        load_bars_from_cache(get_historical_data_cache_key(request))
+        for request in requests
+    ]
+    missing = [index for index, result in enumerate(results) if result is None]
+    logger.info(
+        "Getting historical data for %s evaluations, %s cached",
+        len(evaluations),
+        len(evaluations) - len(missing),
+    )
+    fetched = HistoricalDataScheduler(app).fetch([requests[index] for index in missing])
+    now = arrow.now(tz=TIMEZONE)
+    for index, df in zip(missing, fetched):
+        results[index] = df
+        # Bars of a window that hasn't ended yet may still change.
+        if df is not None and get_end_date_time(evaluations[index]) < now:
+            save_bars_to_cache(get_historical_data_cache_key(requests[index]), df)
+
+    return results
 
-def get_account_usd(app: IBapi, response_queue: Queue[Any]) -> Decimal:
-    app.reqAccountSummary(app.nextValidOrderId, "All", "$LEDGER")
-    usd: Decimal = D("-1")
-    response: Any = ""
-    while response is not None:
-        response = response_queue.get()
-        if response is None:
-            break
-        if response[0] == "CashBalance":
-            usd = D(response[1])
+
+def get_historical_data(app: IBapi, evaluation: Evaluation) -> Optional[DataFrame]:
+    logger.info(f"Getting historical data for evaluation: {evaluation}")
+    return get_historical_data_batch(app, [evaluation])[0]
+
+
+def _get_response(response_queue: Queue[Any], timeout: Optional[float] = None) -> Any:
+    req_id, response = response_queue.get(timeout=timeout)
+    if isinstance(response, IBError):
+        raise ValueError(f"Error {response.errorCode} for reqId {req_id}")
+    return response
+
+
+def get_account_usd(app: IBapi) -> Decimal:
+    req_id = app.get_request_id()
+    response_queue = app.router.register(req_id)
+    try:
+        app.reqAccountSummary(req_id, "All", "$LEDGER")
+        usd: Decimal = D("-1")
+        response: Any = ""
+        while response is not None:
+            response = _get_response(response_queue)
+            if response is None:
+                break
+            if response[0] == "CashBalance":
+                usd = D(response[1])
+        app.cancelAccountSummary(req_id)
+    finally:
+        app.router.unregister(req_id)
 
     if usd == -1:
         raise ValueError("Error getting account USD")
     return usd.min(MAX_CASH_VALUE)
 
 
-def get_current_stock_price(
-    app: IBapi, symbol: str, exchange: str, response_queue: Queue[Any]
-) -> Decimal:
+def get_current_stock_price(app: IBapi, symbol: str, exchange: str) -> Decimal:
     contract = Contract()
     contract.symbol = symbol
     contract.secType = "STK"
     contract.exchange = exchange
     contract.currency = "USD"
-    app.reqMktData(app.nextValidOrderId, contract, "", True, False, [])
-    value: Decimal = D(response_queue.get())
+    req_id = app.get_request_id()
+    response_queue = app.router.register(req_id)
+    try:
+        app.reqMktData(req_id, contract, "", True, False, [])
+        value: Decimal = D(
+            _get_response(response_queue, MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS)
+        )
+    except Empty:
+        app.cancelMktData(req_id)
+        raise ValueError(f"Timed out getting snapshot price for {symbol}")
+    finally:
+        app.router.unregister(req_id)
     return value
 
 
@@ -86,3 +145,10 @@ def get_contract(symbol: str, exchange: str) -> Contract:
     contract.exchange = exchange
     contract.currency = "USD"
     return contract
+
+
+@lru_cache(maxsize=CONTRACT_CACHE_SIZE)
+def get_cached_contract(symbol: str, exchange: str) -> Contract:
+    """The symbol's contract, built once. It's shared, so it must not be
+    changed."""
+    return get_contract(symbol, exchange)
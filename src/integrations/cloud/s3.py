@@ -1,25 +1,70 @@
+import os
 import time
-import ujson
-from typing import Any
+from typing import Any, Iterator
 import boto3
+from botocore.exceptions import ClientError
 
-from consts.networking_consts import S3_BUCKET_NAME
+from consts.data_consts import STOCKS_JSON_CACHE_FILE_PATH
+from consts.networking_consts import S3_BUCKET_NAME, S3_CHUNK_SIZE
+from logger.logger import logger
+from utils.json_utils import iterate_json_array
 
 
-def get_file_from_bucket(file_name: str) -> str:
+def get_bucket_object(file_name: str) -> Any:
     s3 = boto3.resource(
         "s3",
         region_name="il-central-1",
     )
-    obj = s3.Object(S3_BUCKET_NAME, file_name)
+    return s3.Object(S3_BUCKET_NAME, file_name)
+
 
-    data: str = obj.get()["Body"].read()
+def get_file_from_bucket(file_name: str) -> str:
+    data: str = get_bucket_object(file_name).get()["Body"].read()
 
     return data
 
 
-def get_stocks_json_from_bucket() -> Any:
-    return ujson.loads(get_file_from_bucket("stocks.json"))
+def _read_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := file.read(S3_CHUNK_SIZE):
+            yield chunk
+
+
+def stream_object(obj: Any, cache_path: str) -> Iterator[bytes]:
+    """Yields the object's body in chunks, keeping a local copy of it.
+
+    The copy's ETag is sent with the GET, so an unchanged object is read back
+    from the copy instead of downloaded again.
+    """
+    etag_path = f"{cache_path}.etag"
+    etag = None
+    if os.path.isfile(cache_path) and os.path.isfile(etag_path):
+        with open(etag_path, "r") as etag_file:
+            etag = etag_file.read()
+    try:
+        response = obj.get(**({"IfNoneMatch": etag} if etag else {}))
+    except ClientError as error:
+        if error.response["Error"]["Code"] not in ("304", "NotModified"):
+            raise
+        logger.info("%s is unchanged, reading the local copy", obj.key)
+        yield from _read_chunks(cache_path)
+        return
+
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, "wb") as cache_file:
+        for chunk in response["Body"].iter_chunks(S3_CHUNK_SIZE):
+            cache_file.write(chunk)
+            yield chunk
+    os.replace(temp_path, cache_path)
+    with open(etag_path, "w") as etag_file:
+        etag_file.write(response["ETag"])
+
+
+def iterate_stocks_json_from_bucket() -> Iterator[Any]:
+    return iterate_json_array(
+        stream_object(get_bucket_object("stocks.json"), STOCKS_JSON_CACHE_FILE_PATH)
+    )
 
 
 def wait_for_kill_all_command() -> None:
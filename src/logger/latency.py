@@ -0,0 +1,148 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+from threading import Lock, Thread
+import time
+from typing import Any
+import ujson
+
+from consts.networking_consts import LATENCY_ENDPOINT_PORT
+from consts.time_consts import LATENCY_REPORT_INTERVAL_SECONDS
+from logger.logger import logger
+
+# Hot path stages from a signal arriving to its order being placed, in order.
+LATENCY_STAGES = [
+    "received",
+    "parsed",
+    "validated",
+    "queued",
+    "coalesced",
+    "dequeued",
+    "priced",
+    "account",
+    "sized",
+    "ordered",
+]
+# Each power of two is split into this many buckets, ~3% relative error.
+SUB_BUCKETS_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKETS_BITS
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of nanosecond latencies."""
+
+    def __init__(self) -> None:
+        self.counts: list[int] = [0] * (2 * SUB_BUCKETS + 64 * SUB_BUCKETS)
+        self.count = 0
+        self.max = 0
+
+    @staticmethod
+    def _get_bucket(value: int) -> int:
+        if value < 2 * SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKETS_BITS - 1
+        return shift * SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def _get_bucket_top(bucket: int) -> int:
+        if bucket < 2 * SUB_BUCKETS:
+            return bucket
+        shift = bucket // SUB_BUCKETS - 1
+        return ((bucket - shift * SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        value = max(value, 0)
+        self.counts[self._get_bucket(value)] += 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def get_percentile(self, percentile: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = max(1, round(self.count * percentile / 100))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._get_bucket_top(bucket), self.max)
+        return self.max
+
+
+class LatencyRecorder:
+    """Collects per-stage latencies of signals carried in their timestamps.
+
+    Disabled, `mark` and `record` return right away, so the hot path pays one
+    attribute check per stage.
+    """
+
+    enabled: bool
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.lock = Lock()
+        self.last_report = time.monotonic()
+
+    def mark(self, timestamps: dict[str, int], stage: str) -> None:
+        if self.enabled:
+            timestamps[stage] = time.perf_counter_ns()
+
+    def record(self, timestamps: dict[str, int]) -> None:
+        """Records the time between every reached stage and the one before."""
+        if not self.enabled:
+            return
+        stages = [stage for stage in LATENCY_STAGES if stage in timestamps]
+        with self.lock:
+            for previous, stage in zip(stages, stages[1:]):
+                self._record(stage, timestamps[stage] - timestamps[previous])
+            if len(stages) > 1:
+                self._record("total", timestamps[stages[-1]] - timestamps[stages[0]])
+
+    def _record(self, stage: str, value: int) -> None:
+        if stage not in self.histograms:
+            self.histograms[stage] = LatencyHistogram()
+        self.histograms[stage].record(value)
+
+    def get_summary(self) -> dict[str, dict[str, Any]]:
+        """Count, p50, p99 and max (in microseconds) of every stage."""
+        with self.lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    "p50_us": histogram.get_percentile(50) / 1000,
+                    "p99_us": histogram.get_percentile(99) / 1000,
+                    "max_us": histogram.max / 1000,
+                }
+                for stage, histogram in self.histograms.items()
+            }
+
+    def report_if_due(self) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self.last_report < LATENCY_REPORT_INTERVAL_SECONDS:
+            return
+        self.last_report = now
+        logger.info("Signal latency: %s", ujson.dumps(self.get_summary()))
+
+
+latency_recorder = LatencyRecorder(os.environ.get("LATENCY_TRACING") == "True")
+
+
+class LatencyRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = ujson.dumps(latency_recorder.get_summary()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve_latency_endpoint(port: int = LATENCY_ENDPOINT_PORT) -> ThreadingHTTPServer:
+    """Serves the latency summary as JSON on localhost from a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), LatencyRequestHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
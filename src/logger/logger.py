@@ -1,24 +1,167 @@
+import atexit
+from collections import deque
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
+from queue import Full, Queue
 import sys
+from threading import Condition, Lock, Thread
+import time
+import traceback
+from typing import Any, Optional
 
 from discord_webhook import DiscordWebhook
 
-from consts.data_consts import BACKUP_COUNT, LOG_FILE_PATH, ROTATING_FILE_MAX_SIZE
+from consts.data_consts import (
+    BACKUP_COUNT,
+    LOG_FILE_PATH,
+    LOG_QUEUE_SIZE,
+    ROTATING_FILE_MAX_SIZE,
+)
+from consts.networking_consts import (
+    DISCORD_BUFFER_SIZE,
+    DISCORD_CLOSE_TIMEOUT_SECONDS,
+    DISCORD_MESSAGE_MAX_SIZE,
+    DISCORD_RATE_LIMIT_BURST,
+    DISCORD_RATE_LIMIT_PER_SECOND,
+)
+from utils.rate_utils import TokenBucket
 
 
-class DiscordHandler(logging.StreamHandler):  # type: ignore
-    def emit(self, record: logging.LogRecord) -> None:
-        message = self.format(record)
-        webhook_url = os.environ.get("DISCORD_WEBHOOK")
-        if not webhook_url:
-            raise ValueError("DISCORD_WEBHOOK environment variable is not set")
-        discord_webhook = DiscordWebhook(
-            url=webhook_url,
-            content=message[0:1900],
+class DiscordHandler(logging.Handler):
+    """Sends records to a Discord webhook from a thread of its own.
+
+    Messages wait in a bounded buffer, dropping the oldest, and are joined
+    into as few webhooks as the size limit allows, sent no faster than the
+    rate limit.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        capacity: int = DISCORD_BUFFER_SIZE,
+        rate_limit: Optional[TokenBucket] = None,
+    ) -> None:
+        super().__init__()
+        self.url = url
+        self.messages: deque[str] = deque(maxlen=capacity)
+        self.dropped = 0
+        self.rate_limit = rate_limit or TokenBucket(
+            DISCORD_RATE_LIMIT_BURST, DISCORD_RATE_LIMIT_PER_SECOND
         )
-        discord_webhook.execute()
+        self.condition = Condition()
+        self.is_closed = False
+        self.thread: Optional[Thread] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # It runs on the logging thread, which an exception would end.
+        try:
+            message = self.format(record)
+            with self.condition:
+                if self.thread is None:
+                    self.thread = Thread(target=self._run, daemon=True)
+                    self.thread.start()
+                if len(self.messages) == self.messages.maxlen:
+                    self.dropped += 1
+                self.messages.append(message[0:DISCORD_MESSAGE_MAX_SIZE])
+                self.condition.notify()
+        except Exception:
+            self.handleError(record)
+
+    def get_batch(self) -> str:
+        """Takes the waiting messages that fit in one webhook."""
+        with self.condition:
+            lines = []
+            if self.dropped > 0:
+                lines.append(f"({self.dropped} messages dropped)")
+                self.dropped = 0
+            size = sum(len(line) + 1 for line in lines)
+            while (
+                len(self.messages) > 0
+                and size + len(self.messages[0]) <= DISCORD_MESSAGE_MAX_SIZE
+            ):
+                message = self.messages.popleft()
+                lines.append(message)
+                size += len(message) + 1
+            return "\n".join(lines)
+
+    def send(self, content: str) -> None:
+        DiscordWebhook(url=self.url, content=content).execute()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while len(self.messages) == 0 and not self.is_closed:
+                    self.condition.wait()
+                if len(self.messages) == 0:
+                    return
+            # Messages logged while waiting for the rate limit join the batch.
+            if not self.rate_limit.try_acquire():
+                time.sleep(self.rate_limit.get_wait_time())
+                continue
+            try:
+                self.send(self.get_batch())
+            except Exception:
+                # Logging it would come back here.
+                traceback.print_exc(file=sys.stderr)
+
+    def close(self) -> None:
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(DISCORD_CLOSE_TIMEOUT_SECONDS)
+        super().close()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the logging thread without ever waiting for it.
+
+    When the queue is full the record is dropped, and the logging thread
+    reports how many were before its next record.
+    """
+
+    def __init__(self, queue: "Queue[Any]") -> None:
+        super().__init__(queue)
+        self.dropped = 0
+        self._dropped_lock = Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
+
+
+class LogListener(QueueListener):
+    """Writes the records of a DroppingQueueHandler to the real handlers."""
+
+    def __init__(
+        self, queue_handler: DroppingQueueHandler, *handlers: logging.Handler
+    ) -> None:
+        super().__init__(queue_handler.queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+
+    def handle(self, record: logging.LogRecord) -> None:
+        dropped = self.queue_handler.take_dropped()
+        if dropped > 0:
+            super().handle(
+                logging.makeLogRecord(
+                    {
+                        "name": record.name,
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": f"Dropped {dropped} log records",
+                    }
+                )
+            )
+        super().handle(record)
 
 
 logger = logging.getLogger(__name__)
@@ -38,10 +181,21 @@ stdout_handler = logging.StreamHandler(sys.stdout)
 stdout_handler.setLevel(logging.DEBUG)
 stdout_handler.setFormatter(formatter)
 
-discord_handler = DiscordHandler()
-discord_handler.setLevel(logging.ERROR)
-discord_handler.setFormatter(formatter)
+handlers: list[logging.Handler] = [file_handler, stdout_handler]
+discord_webhook_url = os.environ.get("DISCORD_WEBHOOK")
+if discord_webhook_url:
+    discord_handler = DiscordHandler(discord_webhook_url)
+    discord_handler.setLevel(logging.ERROR)
+    discord_handler.setFormatter(formatter)
+    handlers.append(discord_handler)
+else:
+    print("DISCORD_WEBHOOK environment variable is not set, not logging to Discord")
 
-logger.addHandler(file_handler)
-logger.addHandler(stdout_handler)
-logger.addHandler(discord_handler)
+# Callers only put records on a bounded queue, the logging thread does the
+# file, stdout and Discord I/O.
+queue_handler = DroppingQueueHandler(Queue(LOG_QUEUE_SIZE))
+log_listener = LogListener(queue_handler, *handlers)
+logger.addHandler(queue_handler)
+log_listener.start()
+# Runs before logging's own shutdown, which closes the handlers.
+atexit.register(log_listener.stop)
@@ -1,20 +1,32 @@
 import os
+import sys
 from queue import Queue
 from typing import Any, Optional
 import time
 from threading import Thread
 
-from controllers.evaluation.evaluate import get_evaluations, iterate_evaluations
+from consts.networking_consts import LISTENER_MAX_QUEUED_STOCKS
+from controllers.evaluation.backtest import load_cached_bars, run_backtest
+from controllers.evaluation.evaluate import (
+    get_evaluations,
+    iterate_evaluations,
+    warm_bars_cache,
+)
+from controllers.trading.coalescer import StockCoalescer
 from controllers.trading.listener import listen_for_stocks
 from controllers.trading.trader import Trader
 from ib.app import IBapi  # type: ignore
 from integrations.cloud.s3 import wait_for_kill_all_command
+from logger.latency import latency_recorder, serve_latency_endpoint
 from models.trading import Stock
+from persistency.data_handler import (
+    load_groups_from_file,
+    save_backtest_report_to_file,
+)
 from logger.logger import logger
 
 
 def main() -> None:
-    evaluations = get_evaluations()
     app_queue = Queue[Any]()
     app = IBapi(app_queue)
     app.connect("127.0.0.1", 7497, 1)
@@ -31,16 +43,27 @@ def main() -> None:
 
     time.sleep(2)
 
+    if latency_recorder.enabled:
+        serve_latency_endpoint()
+
     if os.environ.get("TRADE") == "True":
         trader_kill_queue = Queue[Any]()
-        trader = Trader(app, server_queue, app_queue, trader_kill_queue)
+        # Bounded like the listener's queue, so the trader falling behind
+        # holds up the coalescer and then the listener.
+        trader_queue = Queue[Optional[Stock]](LISTENER_MAX_QUEUED_STOCKS)
+        coalescer = StockCoalescer(server_queue, trader_queue)
+        coalescer_thread = Thread(
+            target=coalescer.run, args=(trader_kill_queue,), daemon=True
+        )
+        coalescer_thread.start()
+        trader = Trader(app, trader_queue, trader_kill_queue)
         trader_thread = Thread(target=trader.main_loop, daemon=True)
         trader_thread.start()
 
     evaluations_analysis_kill_queue = Queue[Any]()
     evaluations_analysis_thread = Thread(
         target=iterate_evaluations,
-        args=(app, evaluations, app_queue, evaluations_analysis_kill_queue),
+        args=(app, evaluations_analysis_kill_queue),
         daemon=True,
     )
     evaluations_analysis_thread.start()
@@ -49,6 +72,7 @@ def main() -> None:
     logger.info("Sending exit signal")
     if os.environ.get("TRADE") == "True":
         trader_kill_queue.put(None)
+        coalescer_thread.join()
         trader_thread.join()
 
     server_kill_queue.put(None)
@@ -59,5 +83,38 @@ def main() -> None:
     ib_app_thread.join()
 
 
+def warm_cache() -> None:
+    evaluations = get_evaluations()
+    app_queue = Queue[Any]()
+    app = IBapi(app_queue)
+    app.connect("127.0.0.1", 7497, 1)
+    ib_app_thread = Thread(target=app.run, daemon=True)
+    ib_app_thread.start()
+
+    time.sleep(2)
+    warm_bars_cache(app, evaluations)
+    app.disconnect()
+    ib_app_thread.join()
+
+
+def backtest() -> None:
+    evaluations = get_evaluations()
+    report = run_backtest(
+        evaluations, load_cached_bars(evaluations), load_groups_from_file()
+    )
+    logger.info(
+        "Backtest: %s trades, hit rate %s, pnl %s",
+        report.trades,
+        report.hit_rate,
+        report.pnl,
+    )
+    save_backtest_report_to_file(report)
+
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["warm-cache"]:
+        warm_cache()
+    elif sys.argv[1:] == ["backtest"]:
+        backtest()
+    else:
+        main()
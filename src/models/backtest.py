@@ -0,0 +1,41 @@
+from decimal import Decimal
+from typing import Any
+from pydantic import BaseModel
+
+
+class GroupBacktest(BaseModel):
+    score_range: tuple[Decimal, Decimal]
+    signals: int
+    trades: int
+    target_profit_hits: int
+    stop_loss_hits: int
+    hit_rate: Decimal
+    pnl: Decimal
+
+    def get_json(self) -> dict[str, Any]:
+        return {
+            "score_range": self.score_range,
+            "signals": self.signals,
+            "trades": self.trades,
+            "target_profit_hits": self.target_profit_hits,
+            "stop_loss_hits": self.stop_loss_hits,
+            "hit_rate": self.hit_rate,
+            "pnl": self.pnl,
+        }
+
+
+class BacktestReport(BaseModel):
+    signals: int
+    trades: int
+    hit_rate: Decimal
+    pnl: Decimal
+    groups: list[GroupBacktest]
+
+    def get_json(self) -> dict[str, Any]:
+        return {
+            "signals": self.signals,
+            "trades": self.trades,
+            "hit_rate": self.hit_rate,
+            "pnl": self.pnl,
+            "groups": [group.get_json() for group in self.groups],
+        }
@@ -0,0 +1,192 @@
+from array import array
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Sequence, Union
+from dateutil import tz
+import numpy as np
+from numpy import ndarray as NDArray
+
+from consts.time_consts import TIMEZONE
+from models.evaluation import Evaluation, EvaluationResults
+
+
+class EvaluationTable:
+    """Evaluations and their extremums held in columns.
+
+    Symbols and URLs are interned, `symbol_ids` / `url_ids` index into
+    `symbols` / `urls`. `timestamps` are epoch microseconds. The extremums of
+    row i are `values[offsets[i] : offsets[i + 1]]` (CSR), kept as the floats
+    the bars gave: Decimal(repr(value)) is what EvaluationResults would hold.
+    """
+
+    __slots__ = (
+        "symbols",
+        "symbol_ids",
+        "urls",
+        "url_ids",
+        "scores",
+        "timestamps",
+        "offsets",
+        "values",
+    )
+
+    symbols: list[str]
+    symbol_ids: NDArray[Any, Any]
+    urls: list[str]
+    url_ids: NDArray[Any, Any]
+    scores: NDArray[Any, Any]
+    timestamps: NDArray[Any, Any]
+    offsets: NDArray[Any, Any]
+    values: NDArray[Any, Any]
+
+    def __init__(
+        self,
+        symbols: list[str],
+        symbol_ids: NDArray[Any, Any],
+        urls: list[str],
+        url_ids: NDArray[Any, Any],
+        scores: NDArray[Any, Any],
+        timestamps: NDArray[Any, Any],
+        offsets: NDArray[Any, Any],
+        values: NDArray[Any, Any],
+    ) -> None:
+        self.symbols = symbols
+        self.symbol_ids = symbol_ids
+        self.urls = urls
+        self.url_ids = url_ids
+        self.scores = scores
+        self.timestamps = timestamps
+        self.offsets = offsets
+        self.values = values
+
+    @staticmethod
+    def from_results(results: list[EvaluationResults]) -> "EvaluationTable":
+        builder = EvaluationTableBuilder()
+        for result in results:
+            builder.add(result.evaluation, result.data)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def get_lengths(self) -> NDArray[Any, Any]:
+        lengths: NDArray[Any, Any] = np.diff(self.offsets)
+        return lengths
+
+    def get_data(self, row: int) -> NDArray[Any, Any]:
+        data: NDArray[Any, Any] = self.values[self.offsets[row] : self.offsets[row + 1]]
+        return data
+
+    def get_lasts(self) -> NDArray[Any, Any]:
+        lasts: NDArray[Any, Any] = self.values[self.offsets[1:] - 1]
+        return lasts
+
+    def get_urls(self) -> list[str]:
+        return [self.urls[url_id] for url_id in self.url_ids]
+
+    def get_evaluation(self, row: int) -> Evaluation:
+        return Evaluation(
+            datetime=datetime.fromtimestamp(
+                int(self.timestamps[row]) / 1000000, tz=tz.gettz(TIMEZONE)
+            ),
+            score=Decimal(repr(float(self.scores[row]))),
+            symbol=self.symbols[self.symbol_ids[row]],
+            url=self.urls[self.url_ids[row]],
+        )
+
+    def to_results(self) -> list[EvaluationResults]:
+        return [
+            EvaluationResults(
+                evaluation=self.get_evaluation(row), data=self.get_data(row).tolist()
+            )
+            for row in range(len(self))
+        ]
+
+    def take(self, rows: NDArray[Any, Any]) -> "EvaluationTable":
+        """A table of the given rows, sharing the interned symbols and URLs."""
+        lengths = self.get_lengths()[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Position of every taken value in self.values.
+        positions = np.repeat(self.offsets[rows] - offsets[:-1], lengths)
+        positions += np.arange(offsets[-1])
+        return EvaluationTable(
+            symbols=self.symbols,
+            symbol_ids=self.symbol_ids[rows],
+            urls=self.urls,
+            url_ids=self.url_ids[rows],
+            scores=self.scores[rows],
+            timestamps=self.timestamps[rows],
+            offsets=offsets,
+            values=self.values[positions],
+        )
+
+
+class EvaluationTableBuilder:
+    """Appends evaluations row by row into compact buffers."""
+
+    __slots__ = (
+        "_symbol_ids",
+        "_url_ids",
+        "symbol_ids",
+        "url_ids",
+        "scores",
+        "timestamps",
+        "lengths",
+        "values",
+    )
+
+    def __init__(self) -> None:
+        self._symbol_ids: dict[str, int] = {}
+        self._url_ids: dict[str, int] = {}
+        self.symbol_ids = array("i")
+        self.url_ids = array("i")
+        self.scores = array("d")
+        self.timestamps = array("q")
+        self.lengths = array("q")
+        self.values = array("d")
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def add_row(
+        self,
+        symbol: str,
+        url: str,
+        timestamp: int,
+        score: float,
+        data: Sequence[Union[float, Decimal]],
+    ) -> None:
+        self.symbol_ids.append(
+            self._symbol_ids.setdefault(symbol, len(self._symbol_ids))
+        )
+        self.url_ids.append(self._url_ids.setdefault(url, len(self._url_ids)))
+        self.timestamps.append(timestamp)
+        self.scores.append(score)
+        self.lengths.append(len(data))
+        self.values.extend(float(value) for value in data)
+
+    def add(
+        self, evaluation: Evaluation, data: Sequence[Union[float, Decimal]]
+    ) -> None:
+        self.add_row(
+            evaluation.symbol,
+            evaluation.url,
+            round(evaluation.datetime.timestamp() * 1000000),
+            float(evaluation.score),
+            data,
+        )
+
+    def build(self) -> "EvaluationTable":
+        offsets = np.zeros(len(self.lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(self.lengths, dtype=np.int64), out=offsets[1:])
+        return EvaluationTable(
+            symbols=list(self._symbol_ids),
+            symbol_ids=np.array(self.symbol_ids, dtype=np.int32),
+            urls=list(self._url_ids),
+            url_ids=np.array(self.url_ids, dtype=np.int32),
+            scores=np.array(self.scores, dtype=np.float64),
+            timestamps=np.array(self.timestamps, dtype=np.int64),
+            offsets=offsets,
+            values=np.array(self.values, dtype=np.float64),
+        )
@@ -1,6 +1,6 @@
 from decimal import Decimal
-from typing import Annotated, Any
-from pydantic import BaseModel
+from typing import Annotated, Any, Optional
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 from models.article import Article
@@ -32,6 +32,8 @@ class Stock(BaseModel):
     symbol: str
     score: Annotated[Decimal, checkScoreValidation]
     article: Article
+    # perf_counter_ns per hot path stage, filled in when latency tracing is on.
+    timestamps: dict[str, int] = Field(default_factory=dict, exclude=True)
 
     def get_json(self) -> dict[str, Any]:
         return {
@@ -44,5 +46,19 @@ class Stock(BaseModel):
 class Position(BaseModel):
     order_id: int
     symbol: str
+    # Negative for shorts.
     quantity: Decimal
     datetime: datetime
+    # Take profit and stop loss of the bracket.
+    child_order_ids: tuple[int, ...] = ()
+    # Shares of the parent order filled so far.
+    filled: Decimal = Decimal(0)
+    exit_order_id: Optional[int] = None
+    # Cash reserved for the position until it closes.
+    capital: Decimal = Decimal(0)
+
+    def get_order_ids(self) -> list[int]:
+        order_ids = [self.order_id, *self.child_order_ids]
+        if self.exit_order_id is not None:
+            order_ids.append(self.exit_order_id)
+        return order_ids
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional
+import numpy as np
+import pandas as pd
+import ujson
+from pandas import DataFrame
+
+from consts.data_consts import BARS_CACHE_DIR_PATH, BARS_CACHE_MAX_SIZE
+from consts.time_consts import TIMEZONE
+from logger.logger import logger
+
+INDEX_FILE_NAME = "date.npy"
+COLUMNS_FILE_NAME = "columns.json"
+
+
+def get_bars_cache_key(
+    symbol: str, end_date_time: str, duration: str, bar_size: str, what_to_show: str
+) -> str:
+    key = "|".join([symbol, end_date_time, duration, bar_size, what_to_show])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def load_bars_from_cache(
+    key: str, cache_dir: str = BARS_CACHE_DIR_PATH
+) -> Optional[DataFrame]:
+    entry_path = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry_path):
+        return None
+    try:
+        with open(os.path.join(entry_path, COLUMNS_FILE_NAME), "r") as columns_file:
+            columns: list[str] = ujson.load(columns_file)
+        index = pd.to_datetime(
+            np.load(os.path.join(entry_path, INDEX_FILE_NAME), mmap_mode="r"),
+            utc=True,
+        ).tz_convert(TIMEZONE)
+        df = DataFrame(
+            {
+                column: np.load(
+                    os.path.join(entry_path, f"{column}.npy"), mmap_mode="r"
+                )
+                for column in columns
+            },
+            index=index.rename("date"),
+        )
+    except (OSError, ValueError):
+        logger.error("Corrupted bars cache entry: %s", key, exc_info=True)
+        shutil.rmtree(entry_path, ignore_errors=True)
+        return None
+    # The entry mtime is the LRU clock used by evict_bars_cache.
+    os.utime(entry_path)
+    return df
+
+
+def save_bars_to_cache(
+    key: str, df: DataFrame, cache_dir: str = BARS_CACHE_DIR_PATH
+) -> None:
+    entry_path = os.path.join(cache_dir, key)
+    if os.path.isdir(entry_path):
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    try:
+        np.save(
+            os.path.join(temp_path, INDEX_FILE_NAME),
+            pd.DatetimeIndex(df.index).tz_convert("UTC").tz_localize(None).to_numpy(),
+        )
+        # Object columns (Decimal volumes) are stored as floats so no entry
+        # ever needs pickling.
+        for column in df.columns:
+            np.save(
+                os.path.join(temp_path, f"{column}.npy"),
+                df[column].to_numpy(
+                    dtype=np.float64 if df[column].dtype == object else None
+                ),
+            )
+        with open(os.path.join(temp_path, COLUMNS_FILE_NAME), "w") as columns_file:
+            ujson.dump([str(column) for column in df.columns], columns_file)
+        os.rename(temp_path, entry_path)
+    except OSError:
+        logger.error("Failed saving bars cache entry: %s", key, exc_info=True)
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _get_entry_size(entry_path: str) -> int:
+    return sum(
+        entry.stat().st_size for entry in os.scandir(entry_path) if entry.is_file()
+    )
+
+
+def evict_bars_cache(
+    max_size: int = BARS_CACHE_MAX_SIZE, cache_dir: str = BARS_CACHE_DIR_PATH
+) -> None:
+    if not os.path.isdir(cache_dir):
+        return
+    entries = [
+        (entry.stat().st_mtime, entry.path, _get_entry_size(entry.path))
+        for entry in os.scandir(cache_dir)
+        if entry.is_dir() and not entry.name.startswith(".")
+    ]
+    total_size = sum(size for _, _, size in entries)
+    for _, entry_path, size in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= size
+    logger.info("Bars cache size: %s bytes", total_size)
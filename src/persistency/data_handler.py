@@ -1,8 +1,9 @@
 import ujson
 import os
 
-from consts.data_consts import GROUPS_FILE_PATH
+from consts.data_consts import BACKTEST_REPORT_FILE_PATH, GROUPS_FILE_PATH
 from logger.logger import logger
+from models.backtest import BacktestReport
 from models.trading import GroupRatio
 
 
@@ -27,3 +28,9 @@ def load_groups_from_file() -> list[GroupRatio]:
             )
             for group_ratio_json in ujson.load(stocks_file)
         ]
+
+
+def save_backtest_report_to_file(report: BacktestReport) -> None:
+    logger.info("Saving backtest report to file")
+    with open(BACKTEST_REPORT_FILE_PATH, "w") as report_file:
+        report_file.write(ujson.dumps(report.get_json()))
@@ -0,0 +1,100 @@
+from datetime import datetime
+import os
+from typing import Any, Optional
+import ujson
+
+from consts.data_consts import EVALUATION_STORE_FILE_PATH
+from logger.logger import logger
+from models.evaluation import Evaluation, EvaluationResults
+from models.evaluation_table import EvaluationTable, EvaluationTableBuilder
+
+
+def get_evaluation_key(evaluation: Evaluation) -> str:
+    return f"{evaluation.url}|{evaluation.symbol}"
+
+
+def _results_to_json(results: EvaluationResults) -> dict[str, Any]:
+    return {
+        "url": results.evaluation.url,
+        "symbol": results.evaluation.symbol,
+        "datetime": results.evaluation.datetime.isoformat(),
+        "score": str(results.evaluation.score),
+        "data": [str(value) for value in results.data],
+    }
+
+
+def _add_json_row(builder: EvaluationTableBuilder, results_json: Any) -> None:
+    builder.add_row(
+        symbol=results_json["symbol"],
+        url=results_json["url"],
+        timestamp=round(
+            datetime.fromisoformat(results_json["datetime"]).timestamp() * 1000000
+        ),
+        score=float(results_json["score"]),
+        data=[float(value) for value in results_json["data"]],
+    )
+
+
+class EvaluationStore:
+    """Extremums of every evaluated article, keyed by article URL and symbol.
+
+    Kept in memory as an EvaluationTable and appended to a JSON lines file,
+    so an evaluation's bars are only fetched and reduced once.
+    """
+
+    path: str
+    keys: set[str]
+
+    def __init__(self, path: str = EVALUATION_STORE_FILE_PATH) -> None:
+        self.path = path
+        self.keys = set()
+        self._builder = EvaluationTableBuilder()
+        self._table: Optional[EvaluationTable] = None
+        if not os.path.isfile(path):
+            return
+        with open(path, "r") as store_file:
+            for line in store_file:
+                try:
+                    results_json = ujson.loads(line)
+                    key = f"{results_json['url']}|{results_json['symbol']}"
+                    if key not in self.keys:
+                        _add_json_row(self._builder, results_json)
+                        self.keys.add(key)
+                except (ValueError, KeyError, TypeError):
+                    # A run killed mid-write leaves a partial last line.
+                    logger.warning("Skipping corrupted evaluation store line")
+        logger.info("Loaded %s stored evaluations", len(self.keys))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, evaluation: Evaluation) -> bool:
+        return get_evaluation_key(evaluation) in self.keys
+
+    def add(self, results: list[EvaluationResults]) -> EvaluationTable:
+        """Stores the results not stored yet and returns them as a table."""
+        new_results_by_key: dict[str, EvaluationResults] = {}
+        for result in results:
+            key = get_evaluation_key(result.evaluation)
+            if key not in self.keys:
+                new_results_by_key.setdefault(key, result)
+        new_results = list(new_results_by_key.values())
+        if len(new_results) > 0:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as store_file:
+                store_file.write(
+                    "".join(
+                        ujson.dumps(_results_to_json(result)) + "\n"
+                        for result in new_results
+                    )
+                )
+            for result in new_results:
+                self._builder.add(result.evaluation, result.data)
+            self.keys.update(new_results_by_key)
+            self._table = None
+        return EvaluationTable.from_results(new_results)
+
+    def get_table(self) -> EvaluationTable:
+        if self._table is None:
+            self._table = self._builder.build()
+        return self._table
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+
+from algorithems.analysis import RatioStats
+from consts.data_consts import GROUP_STATS_FILE_PATH
+from logger.logger import logger
+
+
+def save_group_stats(
+    group_stats: dict[int, RatioStats], path: str = GROUP_STATS_FILE_PATH
+) -> None:
+    arrays = {}
+    for index, stats in group_stats.items():
+        arrays[f"{index}_count"] = np.array(stats.evaluations_count)
+        # Hit counts are far below 2**31 and compress to almost nothing.
+        arrays[f"{index}_target_hits"] = stats.target_hits.astype(np.int32)
+        arrays[f"{index}_stop_hits"] = stats.stop_hits.astype(np.int32)
+        arrays[f"{index}_last_sums"] = stats.last_sums
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp.npz"
+    np.savez_compressed(temp_path, **arrays)
+    os.replace(temp_path, path)
+
+
+def load_group_stats(path: str = GROUP_STATS_FILE_PATH) -> dict[int, RatioStats]:
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with np.load(path) as arrays:
+            indexes = {int(name.split("_")[0]) for name in arrays.files}
+            return {
+                index: RatioStats(
+                    evaluations_count=int(arrays[f"{index}_count"]),
+                    target_hits=arrays[f"{index}_target_hits"].astype(np.int64),
+                    stop_hits=arrays[f"{index}_stop_hits"].astype(np.int64),
+                    last_sums=arrays[f"{index}_last_sums"],
+                )
+                for index in indexes
+            }
+    except (OSError, ValueError, KeyError):
+        logger.error("Corrupted group stats file: %s", path, exc_info=True)
+        return {}
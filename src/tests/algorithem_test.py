@@ -1,4 +1,6 @@
+import random
 from datetime import datetime
+from decimal import Decimal
 from algorithems.analysis import get_best_ratio
 from models.evaluation import EvaluationResults, Evaluation
 from utils.math_utils import D
@@ -28,3 +30,68 @@ def test_get_best_ratio() -> None:
         assert False
     assert ratio["target_profit"] == D("-0.0350")
     assert ratio["average"] == D("0.0350")
+
+
+def test_get_best_ratio_engines_match() -> None:
+    rng = random.Random(0)
+    evaluation = Evaluation(
+        datetime=datetime(2021, 1, 1),
+        score=D("0.5"),
+        symbol="AAPL",
+        url="www.google.com",
+    )
+
+    def get_group(datas: list[list[Decimal]]) -> list[EvaluationResults]:
+        return [EvaluationResults(data=data, evaluation=evaluation) for data in datas]
+
+    groups = [
+        get_group(
+            [
+                [
+                    Decimal(repr(rng.uniform(-0.12, 0.12)))
+                    for _ in range(rng.randint(1, 8))
+                ]
+                for _ in range(5)
+            ]
+        ),
+        get_group(
+            [
+                [D(rng.randint(-60, 60)) / 1000 for _ in range(rng.randint(1, 8))]
+                for _ in range(5)
+            ]
+        ),
+        # Larger, with longer sequences.
+        get_group(
+            [
+                [
+                    Decimal(repr(rng.uniform(-0.3, 0.3)))
+                    for _ in range(rng.randint(1, 20))
+                ]
+                for _ in range(40)
+            ]
+        ),
+        # Extremums exactly on ticks, as Decimals and as floats, up to the
+        # ends of the grid.
+        get_group(
+            [
+                [D(rng.randint(-40, 40)) / 1000 for _ in range(rng.randint(1, 10))]
+                for _ in range(30)
+            ]
+            + [
+                [Decimal(repr(0.013)), Decimal(repr(-0.011))],
+                [D("0.5"), D("-0.5")],
+            ]
+        ),
+        # Never reaching a target, so many ratios tie.
+        get_group([[D("0.004"), D("-0.006")] for _ in range(6)]),
+    ]
+    for group in groups:
+        assert get_best_ratio(group, engine="numpy") == get_best_ratio(
+            group, engine="decimal"
+        )
+
+    # No profitable combination.
+    group = get_group([[D("0.009"), D("-0.009"), D("-0.005")] for _ in range(3)])
+    ratio = get_best_ratio(group, engine="numpy")
+    assert ratio is not None and ratio["average"] < 0
+    assert ratio == get_best_ratio(group, engine="decimal")
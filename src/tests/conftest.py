@@ -1,17 +1,31 @@
+import os
 from queue import Queue
+import tempfile
 from threading import Thread
 from typing import Any, Callable
 import arrow
 import pytest
 import decimal
 
+from consts import data_consts
+
+# Set before logger.logger is first imported, so the suite doesn't log into
+# the tree.
+data_consts.LOG_FILE_PATH = os.path.join(tempfile.mkdtemp(), "logs.log")
+
 from consts.time_consts import DATETIME_FORMATTING, TIMEZONE
 from ib.app import IBapi  # type: ignore
+from logger.logger import DiscordHandler
 from models.article import Article
 from models.trading import Stock
 from utils.math_utils import D
 
 
+@pytest.fixture(autouse=True)
+def no_discord(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(DiscordHandler, "emit", lambda self, record: None)
+
+
 @pytest.fixture
 def get_app() -> Callable[[], tuple[IBapi, Queue[Any], Thread]]:
     def inside_get_app() -> tuple[IBapi, Queue[Any], Thread]:
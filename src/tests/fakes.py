@@ -0,0 +1,126 @@
+import random
+from queue import Queue
+from threading import Thread
+from typing import Any, Callable
+from ibapi.common import BarData
+from ibapi.contract import Contract
+from ibapi.order import Order
+
+from ib.app import IBapi  # type: ignore
+from ib.wrapper import get_contract
+from utils.math_utils import D
+from utils.rate_utils import TokenBucket
+
+
+class FakeTWSApp(IBapi):  # type: ignore
+    """Replays replies on one reader thread, like EReader, in a random order."""
+
+    def __init__(self) -> None:
+        super().__init__(Queue[Any]())
+        self.historical_data_pacing = TokenBucket(1000, 1000)
+        self.callbacks = Queue[Callable[[], None]]()
+        self.market_data_requests: list[int] = []
+        self.account_summary_requests: list[int] = []
+        self.cancelled_account_summaries: list[int] = []
+        self.cancelled_market_data: list[int] = []
+        # Parents these orders are cancelled or left working instead of filled.
+        self.rejected_orders: set[int] = set()
+        self.held_orders: set[int] = set()
+        self.cancelled_orders: list[int] = []
+        # Snapshots of these never arrive.
+        self.silent_symbols: set[str] = set()
+        # Historical data requests are answered with these errors first.
+        self.historical_data_errors: list[int] = []
+        self.reader_thread = Thread(target=self.read, daemon=True)
+        self.reader_thread.start()
+
+    def isConnected(self) -> bool:
+        return True
+
+    def read(self) -> None:
+        rng = random.Random(0)
+        pending: list[Callable[[], None]] = []
+        while True:
+            if len(pending) == 0:
+                pending.append(self.callbacks.get())
+            while not self.callbacks.empty():
+                pending.append(self.callbacks.get())
+            # Answer in a random order so replies of different requests
+            # interleave.
+            rng.shuffle(pending)
+            pending.pop()()
+
+    def reqMktData(self, reqId: int, contract: Contract, *args: Any) -> None:
+        self.market_data_requests.append(reqId)
+        if contract.symbol in self.silent_symbols:
+            return
+        price = 10 + len(contract.symbol)
+        self.callbacks.put(lambda: self.tickPrice(reqId, 1, price - 1, None))
+        self.callbacks.put(lambda: self.tickPrice(reqId, 2, price, None))
+
+    def cancelMktData(self, reqId: int) -> None:
+        self.cancelled_market_data.append(reqId)
+
+    def reqAccountSummary(self, reqId: int, group: str, tags: str) -> None:
+        self.account_summary_requests.append(reqId)
+
+        # Tags of one request arrive in order, End last.
+        def reply() -> None:
+            self.accountSummary(reqId, "DU1", "NetLiquidation", "900", "USD")
+            self.accountSummary(reqId, "DU1", "CashBalance", "300", "USD")
+            self.accountSummaryEnd(reqId)
+
+        self.callbacks.put(reply)
+
+    def cancelHistoricalData(self, reqId: int) -> None:
+        pass
+
+    def cancelAccountSummary(self, reqId: int) -> None:
+        self.cancelled_account_summaries.append(reqId)
+
+    def reqPositions(self) -> None:
+        contract = get_contract("A", "SMART")
+        self.callbacks.put(lambda: self.position("DU1", contract, D(5), 1.0))
+
+    def cancelPositions(self) -> None:
+        pass
+
+    def reqHistoricalData(self, reqId: int, contract: Contract, *args: Any) -> None:
+        if len(self.historical_data_errors) > 0:
+            error_code = self.historical_data_errors.pop(0)
+            self.callbacks.put(lambda: self.error(reqId, error_code, "Pacing"))
+            return
+
+        def reply() -> None:
+            for second in range(3):
+                bar = BarData()
+                bar.date = f"20240102 09:30:0{second} US/Eastern"
+                bar.close = float(len(contract.symbol))
+                self.historicalData(reqId, bar)
+            self.historicalDataEnd(reqId, "", "")
+
+        self.callbacks.put(reply)
+
+    def placeOrder(self, orderId: int, contract: Contract, order: Order) -> None:
+        # Fill the parent once the whole bracket is transmitted.
+        if order.transmit:
+            self.fill(order.parentId if order.parentId else orderId)
+
+    def cancelOrder(self, orderId: int, manualCancelOrderTime: str) -> None:
+        self.cancelled_orders.append(orderId)
+
+    def fill(self, orderId: int) -> None:
+        def reply() -> None:
+            self.orderStatus(
+                orderId, "Submitted", D(0), D(1), 0.0, 0, 0, 0.0, 1, "", 0.0
+            )
+            if orderId in self.held_orders:
+                return
+            if orderId in self.rejected_orders:
+                self.orderStatus(
+                    orderId, "Cancelled", D(0), D(1), 0.0, 0, 0, 0.0, 1, "", 0.0
+                )
+                return
+            self.orderStatus(orderId, "Filled", D(1), D(0), 1.0, 0, 0, 1.0, 1, "", 0.0)
+
+        self.callbacks.put(reply)
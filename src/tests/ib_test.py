@@ -14,7 +14,7 @@ def test_get_account_usd(
     thread.start()
 
     time.sleep(2)
-    usd = get_account_usd(app, queue)
+    usd = get_account_usd(app)
 
     assert usd >= 0
     app.disconnect()
@@ -28,7 +28,7 @@ def test_get_stock_price(
     thread.start()
 
     time.sleep(2)
-    price = get_current_stock_price(app, "AAPL", "NASDAQ", queue)
+    price = get_current_stock_price(app, "AAPL", "NASDAQ")
     assert price > 0
     app.disconnect()
     thread.join()
@@ -1,18 +1,56 @@
+import asyncio
 import ujson
 from queue import Queue
 from threading import Thread
 import socket, time
-from typing import Any, Callable
+from typing import Any, Callable, Iterator
+
+import pytest
 
 from consts.networking_consts import LISTENING_PORT
-from controllers.trading.listener import listen_for_stocks
+from controllers.trading.coalescer import StockCoalescer
+from controllers.trading.listener import StockIngestionServer, listen_for_stocks
 from ib.app import IBapi  # type: ignore
 from models.trading import Stock
 
 
+def start_server(
+    queue: Queue[Any], kill_queue: Queue[Any], max_queued: int = 3
+) -> tuple[StockIngestionServer, Thread]:
+    server = StockIngestionServer(queue, port=0, max_queued=max_queued)
+    thread = Thread(
+        target=asyncio.run, args=(server.serve_until_killed(kill_queue),), daemon=True
+    )
+    thread.start()
+    server.started.wait(5)
+    return server, thread
+
+
+@pytest.fixture
+def ingestion_server() -> Iterator[tuple[StockIngestionServer, Queue[Any]]]:
+    queue: Queue[Any] = Queue()
+    kill_queue: Queue[Any] = Queue()
+    server, thread = start_server(queue, kill_queue)
+    yield server, queue
+    kill_queue.put(None)
+    thread.join(5)
+
+
+def connect(server: StockIngestionServer) -> socket.socket:
+    return socket.create_connection(("127.0.0.1", server.port))
+
+
+def read_ack(client_socket: socket.socket) -> bytes:
+    ack = b""
+    while not ack.endswith(b"\n"):
+        ack += client_socket.recv(20)
+    return ack
+
+
 def test_listen_for_stocks(stock_short: Stock) -> None:
     queue: Queue[Any] = Queue()
-    server = Thread(target=listen_for_stocks, args=(queue,), daemon=True)
+    kill_queue: Queue[Any] = Queue()
+    server = Thread(target=listen_for_stocks, args=(queue, kill_queue), daemon=True)
     server.start()
     time.sleep(2)
 
@@ -21,11 +59,130 @@ def test_listen_for_stocks(stock_short: Stock) -> None:
     client_socket.sendall(ujson.dumps(stock_short.get_json()).encode("utf-8"))
     data = client_socket.recv(20)
     client_socket.close()
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client_socket.connect(("127.0.0.1", LISTENING_PORT))
-    client_socket.send("EXIT".encode("utf-8"))
+    kill_queue.put(None)
+    server.join(1)
     assert data == b"OK"
     assert queue.get() == stock_short
+    assert not server.is_alive()
+
+
+def test_persistent_connection(
+    stock: Stock,
+    stock_short: Stock,
+    ingestion_server: tuple[StockIngestionServer, Queue[Any]],
+) -> None:
+    server, queue = ingestion_server
+    client_socket = connect(server)
+    messages = [
+        ujson.dumps(stock.get_json()),
+        "EXIT",
+        ujson.dumps(stock_short.get_json()),
+    ]
+    # A message cut between writes is put together again.
+    payload = ("\n".join(messages) + "\n").encode("utf-8")
+    client_socket.sendall(payload[:10])
+    time.sleep(0.1)
+    client_socket.sendall(payload[10:])
+
+    acks = b""
+    while not acks.endswith(b"OK 3\n"):
+        acks += client_socket.recv(20)
+    assert [queue.get(timeout=1), queue.get(timeout=1)] == [stock, stock_short]
+    client_socket.close()
+
+
+def test_newline_after_the_first_object(
+    stock: Stock,
+    stock_short: Stock,
+    ingestion_server: tuple[StockIngestionServer, Queue[Any]],
+) -> None:
+    server, queue = ingestion_server
+    client_socket = connect(server)
+    client_socket.sendall(ujson.dumps(stock.get_json()).encode("utf-8"))
+    time.sleep(0.01)
+    client_socket.sendall(b"\n")
+    assert read_ack(client_socket) == b"OK 1\n"
+    client_socket.sendall((ujson.dumps(stock_short.get_json()) + "\n").encode())
+    assert read_ack(client_socket) == b"OK 2\n"
+    assert [queue.get(timeout=1), queue.get(timeout=1)] == [stock, stock_short]
+    client_socket.close()
+
+
+def test_backpressure(
+    stock: Stock, ingestion_server: tuple[StockIngestionServer, Queue[Any]]
+) -> None:
+    server, queue = ingestion_server
+    client_socket = connect(server)
+    message = (ujson.dumps(stock.get_json()) + "\n").encode("utf-8")
+    for _ in range(3):
+        client_socket.sendall(message)
+        read_ack(client_socket)
+
+    client_socket.sendall(message)
+    client_socket.settimeout(0.3)
+    with pytest.raises(socket.timeout):
+        client_socket.recv(20)
+    assert queue.qsize() == 3
+
+    queue.get()
+    client_socket.settimeout(5)
+    assert read_ack(client_socket) == b"OK 4\n"
+    client_socket.close()
+
+
+def test_backpressure_through_coalescer(stock: Stock) -> None:
+    server_queue: Queue[Any] = Queue()
+    trader_queue: Queue[Any] = Queue(2)
+    kill_queue: Queue[Any] = Queue()
+    coalescer_kill_queue: Queue[Any] = Queue()
+    server, thread = start_server(server_queue, kill_queue)
+    coalescer = StockCoalescer(server_queue, trader_queue, window=0)
+    coalescer_thread = Thread(
+        target=coalescer.run, args=(coalescer_kill_queue,), daemon=True
+    )
+    coalescer_thread.start()
+    client_socket = connect(server)
+
+    def send(index: int) -> None:
+        signal = stock.model_copy(update={"symbol": f"S{index}"})
+        client_socket.sendall((ujson.dumps(signal.get_json()) + "\n").encode())
+
+    # The trader's queue, the signal the coalescer holds and the listener's.
+    for index in range(6):
+        send(index)
+        read_ack(client_socket)
+    send(6)
+    client_socket.settimeout(0.3)
+    with pytest.raises(socket.timeout):
+        client_socket.recv(20)
+    assert trader_queue.qsize() == 2 and server_queue.qsize() == 3
+
+    trader_queue.get()
+    client_socket.settimeout(5)
+    assert read_ack(client_socket) == b"OK 7\n"
+    client_socket.close()
+    coalescer_kill_queue.put(None)
+    coalescer_thread.join(5)
+    kill_queue.put(None)
+    thread.join(5)
+    assert not coalescer_thread.is_alive() and not thread.is_alive()
+
+
+def test_immediate_shutdown() -> None:
+    queue: Queue[Any] = Queue()
+    kill_queue: Queue[Any] = Queue()
+    server, thread = start_server(queue, kill_queue)
+    client_socket = connect(server)
+    client_socket.sendall(b"\n")
+    read_ack(client_socket)
+
+    start = time.monotonic()
+    kill_queue.put(None)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 1
+    assert client_socket.recv(20) == b""
+    client_socket.close()
 
 
 def test_trade_from_socket(
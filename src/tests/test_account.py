@@ -0,0 +1,87 @@
+import time
+
+from ib.account import AccountService
+from ib.app import IBError  # type: ignore
+from tests.fakes import FakeTWSApp
+from utils.math_utils import D
+
+
+def wait_for_account(account: AccountService) -> None:
+    for _ in range(100):
+        if account.is_live and len(account.app.positions) > 0:
+            return
+        time.sleep(0.01)
+
+
+def test_account_service_reads_without_requests() -> None:
+    app = FakeTWSApp()
+    account = AccountService(app)
+    account.start()
+    wait_for_account(account)
+
+    assert account.get_account_usd() == D("300")
+    assert account.get_value("NetLiquidation") == D("900")
+    assert account.get_position("A") == D(5)
+    assert len(app.account_summary_requests) == 1
+
+    account.stop()
+    assert app.router.queues == {}
+
+
+def test_account_service_requests_after_error() -> None:
+    app = FakeTWSApp()
+    account = AccountService(app)
+    account.start()
+    wait_for_account(account)
+    req_id = account.req_id
+    assert req_id is not None
+    account.put((req_id, IBError(req_id, 322, "Error")))
+
+    assert account.get_value("CashBalance") is None
+    assert account.get_account_usd() == D("300")
+    # The requested summary is reused.
+    assert account.get_account_usd() == D("300")
+    assert len(app.account_summary_requests) == 2
+
+
+def test_account_service_requests_again_when_stale() -> None:
+    app = FakeTWSApp()
+    account = AccountService(app, max_age=0)
+    account.get_account_usd()
+    time.sleep(0.01)
+    account.get_account_usd()
+    assert len(app.account_summary_requests) == 2
+
+
+def test_account_service_subscribes_again_after_error() -> None:
+    app = FakeTWSApp()
+    account = AccountService(app, retry_interval=0)
+    account.start()
+    wait_for_account(account)
+    req_id = account.req_id
+    assert req_id is not None
+    app.error(req_id, 322, "Error")
+    assert not account.is_live
+
+    account.get_value("CashBalance")
+    assert app.cancelled_account_summaries == [req_id]
+    wait_for_account(account)
+    assert account.get_account_usd() == D("300")
+    assert len(app.account_summary_requests) == 2
+    assert list(app.router.queues) == [account.req_id]
+
+
+def test_account_service_subscribes_again_after_reconnect() -> None:
+    app = FakeTWSApp()
+    account = AccountService(app, retry_interval=0)
+    account.start()
+    wait_for_account(account)
+    req_id = account.req_id
+    app.connectAck()
+
+    account.get_value("CashBalance")
+    assert account.req_id != req_id
+    wait_for_account(account)
+    assert account.get_account_usd() == D("300")
+    assert len(app.account_summary_requests) == 2
+    assert app.cancelled_account_summaries == []
@@ -1,8 +1,17 @@
+from datetime import datetime
+from decimal import Decimal
+import random
 from typing import Any
-from algorithems.analysis import get_possible_stop_losses
+from algorithems.analysis import (
+    _get_hits_columns,
+    _get_hits_table,
+    get_possible_stop_losses,
+    pack_evaluation_results,
+)
 import numpy as np
 from numpy import ndarray as NDArray
 from consts.algorithem_consts import ANALYSIS_GAP
+from models.evaluation import Evaluation, EvaluationResults
 from utils.math_utils import D
 
 
@@ -22,3 +31,25 @@ def test_get_possible_stop_losses() -> None:
     result = get_possible_stop_losses(target_profit)
 
     assert list(result) == list(expected_result)
+
+
+def test_hits_columns_match_table() -> None:
+    rng = random.Random(0)
+    evaluation = Evaluation(
+        datetime=datetime(2024, 1, 2), score=D("0.5"), symbol="A", url="u"
+    )
+    packed = pack_evaluation_results(
+        [
+            EvaluationResults(
+                data=[
+                    Decimal(repr(rng.uniform(-0.15, 0.15)))
+                    for _ in range(rng.randint(1, 8))
+                ],
+                evaluation=evaluation,
+            )
+            for _ in range(20)
+        ]
+    )
+    table = _get_hits_table(packed)
+    columns = np.array(sorted(rng.sample(range(table.shape[1]), 30)))
+    assert (_get_hits_columns(packed, columns) == table[:, columns]).all()
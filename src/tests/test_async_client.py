@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Optional
+
+from pandas import DataFrame
+import pytest
+
+from ib.async_client import AsyncIBClient
+from ib.wrapper import get_contract
+from models.evaluation import Evaluation
+from tests.fakes import FakeTWSApp
+from utils.math_utils import D
+
+# Prices, account summary, bars and order status of the concurrent requests.
+ConcurrentResults = tuple[
+    Decimal, Decimal, dict[str, str], Optional[DataFrame], Optional[dict[str, Any]]
+]
+
+
+def get_future_evaluation() -> Evaluation:
+    return Evaluation(
+        # Ends in the future so nothing is written to the bars cache.
+        datetime=datetime.now() + timedelta(days=1),
+        score=D("1"),
+        symbol="DD",
+        url="www.google.com",
+    )
+
+
+def test_async_client_runs_requests_concurrently() -> None:
+    client = AsyncIBClient(FakeTWSApp())
+    evaluation = get_future_evaluation()
+
+    async def run() -> ConcurrentResults:
+        results: ConcurrentResults = await asyncio.gather(
+            client.snapshot_price("A", "SMART"),
+            client.snapshot_price("BB", "SMART"),
+            client.account_summary(),
+            client.historical_data(evaluation),
+            client.place_bracket_order(
+                7,
+                "BUY",
+                10,
+                D("10.1"),
+                D("10.5"),
+                D("9.5"),
+                get_contract("A", "SMART"),
+            ),
+        )
+        return results
+
+    price_a, price_bb, summary, df, order_status = asyncio.run(
+        asyncio.wait_for(run(), 10)
+    )
+
+    assert price_a == D("11") and price_bb == D("12")
+    assert summary == {"NetLiquidation": "900", "CashBalance": "300"}
+    assert df is not None and list(df["close"]) == [2.0] * 3
+    assert order_status is not None
+    assert order_status["order_id"] == 7 and order_status["status"] == "Filled"
+    assert client.app.router.queues == {} and client.app.order_router.queues == {}
+
+
+def test_async_historical_data_errors() -> None:
+    client = AsyncIBClient(FakeTWSApp())
+    client.app.historical_data_errors.extend([162, 366])
+    df = asyncio.run(
+        asyncio.wait_for(client.historical_data(get_future_evaluation()), 10)
+    )
+    assert df is not None and len(df) == 3
+
+    client.app.historical_data_errors.append(200)
+    df = asyncio.run(
+        asyncio.wait_for(client.historical_data(get_future_evaluation()), 10)
+    )
+    assert df is None
+    assert client.app.router.queues == {} and client.app.order_router.queues == {}
+
+
+def test_async_snapshot_times_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("ib.async_client.MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS", 0.2)
+    client = AsyncIBClient(FakeTWSApp())
+    client.app.silent_symbols.add("A")
+    with pytest.raises(ValueError):
+        asyncio.run(client.snapshot_price("A", "SMART"))
+    assert client.app.cancelled_market_data == client.app.market_data_requests
+    assert client.app.router.queues == {} and client.app.order_router.queues == {}
+
+
+def test_async_bracket_order_ends_on_cancel() -> None:
+    client = AsyncIBClient(FakeTWSApp())
+    client.app.rejected_orders.add(7)
+    order_status = asyncio.run(
+        asyncio.wait_for(
+            client.place_bracket_order(
+                7,
+                "BUY",
+                10,
+                D("10.1"),
+                D("10.5"),
+                D("9.5"),
+                get_contract("A", "SMART"),
+            ),
+            10,
+        )
+    )
+    assert order_status is not None and order_status["status"] == "Cancelled"
+    assert client.app.router.queues == {} and client.app.order_router.queues == {}
+
+
+def test_async_bracket_order_times_out() -> None:
+    client = AsyncIBClient(FakeTWSApp())
+    client.app.held_orders.add(7)
+    order_status = asyncio.run(
+        client.place_bracket_order(
+            7,
+            "BUY",
+            10,
+            D("10.1"),
+            D("10.5"),
+            D("9.5"),
+            get_contract("A", "SMART"),
+            timeout=0.2,
+        )
+    )
+    assert order_status is None
+    assert client.app.cancelled_orders == [7]
+    assert client.app.router.queues == {} and client.app.order_router.queues == {}
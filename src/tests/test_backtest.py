@@ -0,0 +1,87 @@
+from datetime import datetime
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+
+from algorithems.data_transform import get_starting_index
+from consts.time_consts import BAR_SIZE_SECONDS, SECONDS_FROM_END, TIMEZONE
+from controllers.evaluation.backtest import run_backtest
+from models.evaluation import Evaluation
+from models.trading import GroupRatio
+from utils.math_utils import D
+
+
+def get_flat_bars(price: float) -> pd.DataFrame:
+    length = SECONDS_FROM_END // BAR_SIZE_SECONDS
+    return pd.DataFrame(
+        {
+            "open": np.full(length, price),
+            "high": np.full(length, price),
+            "low": np.full(length, price),
+            "close": np.full(length, price),
+        },
+        index=pd.date_range("2024-01-02 09:30", periods=length, freq="5s", tz=TIMEZONE),
+    )
+
+
+def set_bar(df: pd.DataFrame, index: int, **prices: float) -> None:
+    for column, price in prices.items():
+        df.loc[df.index[index], column] = price
+
+
+def get_evaluation(score: str) -> Evaluation:
+    return Evaluation(
+        datetime=datetime(2024, 1, 2, 9, 30), score=D(score), symbol="A", url="u"
+    )
+
+
+def test_backtest() -> None:
+    groups = [
+        GroupRatio(
+            score_range=(D("-10"), D("0")),
+            target_profit=D("-0.05"),
+            stop_loss=D("0.02"),
+            average=D("0"),
+            urls=[],
+        ),
+        GroupRatio(
+            score_range=(D("0.5"), D("10")),
+            target_profit=D("0.05"),
+            stop_loss=D("-0.02"),
+            average=D("0"),
+            urls=[],
+        ),
+    ]
+    start = get_starting_index()
+
+    # Long, filled at the next open and taking profit at its limit.
+    targeted = get_flat_bars(10)
+    set_bar(targeted, start + 5, open=10.2, high=10.6)
+    # Long, stopped out at an open that gapped through the stop.
+    stopped = get_flat_bars(10)
+    set_bar(stopped, start + 15, open=9.5, low=9.4)
+    # Short, closed at the end of the window.
+    held = get_flat_bars(10)
+    set_bar(held, start + 1, high=10.05)
+    held.loc[held.index[-1], "close"] = 9.8
+    # Outside the price filter.
+    expensive = get_flat_bars(40)
+    # No group for the score.
+    ungrouped = get_flat_bars(10)
+
+    report = run_backtest(
+        [get_evaluation(score) for score in ["5", "5", "-5", "5", "0.2"]],
+        [targeted, stopped, held, expensive, ungrouped],
+        groups,
+    )
+
+    short_group, long_group = report.groups
+    assert (long_group.signals, long_group.trades) == (3, 2)
+    assert (long_group.target_profit_hits, long_group.stop_loss_hits) == (1, 1)
+    assert long_group.pnl == D("24.5") + D("-25.5")
+    assert (short_group.signals, short_group.trades) == (1, 1)
+    assert short_group.target_profit_hits == short_group.stop_loss_hits == 0
+    assert short_group.pnl == D("9.5")
+    assert (report.signals, report.trades) == (4, 3)
+    assert report.hit_rate == D(Decimal(1) / 3)
+    assert report.pnl == D("8.5")
@@ -0,0 +1,51 @@
+import arrow
+from ibapi.common import BarData
+import numpy as np
+
+from consts.time_consts import AWARE_DATETIME_FORMATTING
+from ib.bars import BarsBuffer, parse_bar_dates
+
+
+def get_bar(date: str, close: float) -> BarData:
+    bar = BarData()
+    bar.date = date
+    bar.close = close
+    bar.barCount = 3
+    return bar
+
+
+def test_bars_buffer() -> None:
+    bars = [
+        get_bar(f"20240102 09:{index // 12:02d}:{index % 12 * 5:02d} US/Eastern", index)
+        for index in range(50)
+    ]
+    buffer = BarsBuffer(bars[0], 8)
+    for bar in bars:
+        buffer.append(bar)
+    df = buffer.to_df()
+
+    assert list(df.columns) == [field for field in vars(bars[0]) if field != "date"]
+    assert df["close"].tolist() == list(range(50))
+    assert df["barCount"].tolist() == [3] * 50
+    assert list(df.index) == [
+        arrow.get(bar.date, AWARE_DATETIME_FORMATTING).datetime for bar in bars
+    ]
+    assert np.shares_memory(df["close"].to_numpy(), buffer.values)
+
+
+def test_parse_bar_dates() -> None:
+    # 01:00-02:00 happens twice when DST ends, the second time in EST.
+    parsed = parse_bar_dates(
+        [f"20241103 01:{minute:02d}:00 US/Eastern" for minute in [0, 59, 0, 59]]
+    )
+    assert [date.isoformat() for date in parsed] == [
+        "2024-11-03T01:00:00-04:00",
+        "2024-11-03T01:59:00-04:00",
+        "2024-11-03T01:00:00-05:00",
+        "2024-11-03T01:59:00-05:00",
+    ]
+
+    dates = ["20240102 09:30:00 US/Eastern", "20240102 09:30:00 Europe/London"]
+    assert [date.timestamp() for date in parse_bar_dates(dates)] == [
+        arrow.get(date, AWARE_DATETIME_FORMATTING).timestamp() for date in dates
+    ]
@@ -0,0 +1,56 @@
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from consts.time_consts import TIMEZONE
+from persistency.bars_cache import (
+    evict_bars_cache,
+    get_bars_cache_key,
+    load_bars_from_cache,
+    save_bars_to_cache,
+)
+
+
+def get_bars(length: int) -> pd.DataFrame:
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range(
+                "2024-01-02 09:30", periods=length, freq="5s", tz=TIMEZONE
+            ),
+            "open": np.linspace(10, 11, length),
+            "high": np.linspace(10.1, 11.1, length),
+            "low": np.linspace(9.9, 10.9, length),
+            "close": np.linspace(10, 11, length),
+            "volume": np.full(length, -1),
+        }
+    )
+    return df.set_index("date")
+
+
+def test_bars_cache_round_trip(tmp_path: Path) -> None:
+    key = get_bars_cache_key(
+        "AAPL", "20240102 11:30:00 US/Eastern", "7320 S", "5 secs", "MIDPOINT"
+    )
+    df = get_bars(100)
+
+    assert load_bars_from_cache(key, str(tmp_path)) is None
+    save_bars_to_cache(key, df, str(tmp_path))
+    cached_df = load_bars_from_cache(key, str(tmp_path))
+
+    assert cached_df is not None
+    pd.testing.assert_frame_equal(cached_df, df, check_index_type=False)
+
+
+def test_evict_bars_cache_removes_least_recently_used(tmp_path: Path) -> None:
+    keys = ["oldest", "older", "newest"]
+    for access_time, key in enumerate(keys):
+        save_bars_to_cache(key, get_bars(100), str(tmp_path))
+        os.utime(tmp_path / key, (access_time, access_time))
+    entry_size = sum(file.stat().st_size for file in (tmp_path / "newest").iterdir())
+
+    evict_bars_cache(2 * entry_size, str(tmp_path))
+
+    assert load_bars_from_cache("oldest", str(tmp_path)) is None
+    assert load_bars_from_cache("older", str(tmp_path)) is not None
+    assert load_bars_from_cache("newest", str(tmp_path)) is not None
@@ -0,0 +1,42 @@
+from typing import Any
+
+from algorithems.data_transform import get_extremums_batch
+from benchmarks.generators import (
+    get_bar_series,
+    get_bars_df,
+    get_evaluations_raw_data,
+    get_generator,
+)
+from benchmarks.run import get_regressions
+from consts.time_consts import HISTORICAL_DATA_BARS_CAPACITY
+
+
+def test_generators() -> None:
+    df = get_bars_df(get_bar_series(get_generator()))
+    assert len(df) == HISTORICAL_DATA_BARS_CAPACITY
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert len(get_extremums_batch([df])[0]) > 0
+
+    evaluations_raw_data = get_evaluations_raw_data(get_generator(), 20)
+    assert evaluations_raw_data == get_evaluations_raw_data(get_generator(), 20)
+
+
+def test_get_regressions() -> None:
+    baseline: dict[str, dict[str, Any]] = {
+        "stage[100]": {"seconds": 0.1, "allocated_peak_bytes": 1000},
+        "stage[1000]": {"seconds": 0.001, "allocated_peak_bytes": 1000},
+    }
+    results: dict[str, dict[str, Any]] = {
+        "stage[100]": {"seconds": 0.2, "allocated_peak_bytes": 1000},
+        # Slower, but within the noise floor.
+        "stage[1000]": {"seconds": 0.003, "allocated_peak_bytes": 2000},
+        "new[100]": {"seconds": 1, "allocated_peak_bytes": 1},
+    }
+
+    assert [
+        regression.split(":")[0] for regression in get_regressions(results, baseline)
+    ] == [
+        "stage[100]",
+        "stage[1000]",
+    ]
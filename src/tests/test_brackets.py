@@ -0,0 +1,75 @@
+from decimal import Decimal
+import random
+from typing import Optional
+
+from consts.trading_consts import MAX_STOP_LOSS, MIN_TARGET_PROFIT
+from controllers.trading.brackets import BracketOrder, get_bracket_order
+from models.trading import GroupRatio
+from utils.math_utils import D
+
+
+def get_group_ratio(target_profit: Decimal, stop_loss: Decimal) -> GroupRatio:
+    return GroupRatio(
+        score_range=(D("0"), D("0.5")),
+        target_profit=target_profit,
+        stop_loss=stop_loss,
+        average=D("0"),
+        urls=[],
+    )
+
+
+def get_decimal_bracket_order(
+    stock_price: Decimal, group_ratio: GroupRatio, account_usd: Decimal
+) -> Optional[BracketOrder]:
+    """The bracket worked out with Decimal arithmetic, as it used to be."""
+    action = "BUY" if group_ratio.target_profit > 0 else "SELL"
+    quantity = int(account_usd / stock_price)
+    price_limit = D(
+        (
+            stock_price + stock_price * D("0.01")
+            if action == "BUY"
+            else stock_price - stock_price * D("0.01")
+        ),
+        precision=Decimal("0.00"),
+    )
+    target_profit = D(
+        stock_price + (group_ratio.target_profit * stock_price),
+        precision=Decimal("0.00"),
+    )
+    stop_loss = D(
+        stock_price + (group_ratio.stop_loss * stock_price),
+        precision=Decimal("0.00"),
+    )
+    if (
+        abs((target_profit / stock_price) - 1) >= MIN_TARGET_PROFIT
+        and abs((stop_loss / stock_price) - 1) <= MAX_STOP_LOSS
+    ):
+        return BracketOrder(action, quantity, price_limit, target_profit, stop_loss)
+    return None
+
+
+def test_bracket_order() -> None:
+    bracket_order = get_bracket_order(
+        D("12.345"), get_group_ratio(D("0.05"), D("-0.02")), D("500")
+    )
+    assert bracket_order == BracketOrder("BUY", 40, D("12.47"), D("12.96"), D("12.10"))
+    short = get_bracket_order(D("10"), get_group_ratio(D("-0.05"), D("0.02")), D("500"))
+    assert short == BracketOrder("SELL", 50, D("9.90"), D("9.50"), D("10.20"))
+    assert (
+        get_bracket_order(D("10"), get_group_ratio(D("0.0001"), D("-0.02")), D("500"))
+        is None
+    )
+
+
+def test_matches_decimal_arithmetic() -> None:
+    rng = random.Random(0)
+    for _ in range(5000):
+        stock_price = D(rng.uniform(1, 30))
+        group_ratio = get_group_ratio(
+            Decimal(repr(rng.uniform(-0.05, 0.05))),
+            Decimal(repr(rng.uniform(-0.12, 0.12))),
+        )
+        account_usd = D(rng.uniform(0, 600))
+        assert get_bracket_order(
+            stock_price, group_ratio, account_usd
+        ) == get_decimal_bracket_order(stock_price, group_ratio, account_usd)
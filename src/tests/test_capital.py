@@ -0,0 +1,30 @@
+from decimal import Decimal
+from threading import Thread
+
+from controllers.trading.capital import CapitalAllocator
+from utils.math_utils import D
+
+
+def test_reserve_up_to_limit() -> None:
+    capital = CapitalAllocator(D("500"))
+    assert capital.reserve(D("300")) == D("300")
+    assert capital.reserve(D("300")) == D("200")
+    assert capital.reserve(D("300")) == 0
+    capital.release(D("250"))
+    assert capital.get_available() == D("250")
+
+
+def test_concurrent_reservations() -> None:
+    capital = CapitalAllocator(D("500"))
+    granted: list[Decimal] = []
+
+    def reserve() -> None:
+        for _ in range(1000):
+            granted.append(capital.reserve(D("0.3")))
+
+    threads = [Thread(target=reserve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(granted) == capital.reserved == D("500")
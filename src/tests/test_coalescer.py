@@ -0,0 +1,65 @@
+from queue import Queue
+from threading import Thread
+from typing import Any, Optional
+
+from controllers.trading.coalescer import StockCoalescer
+from models.trading import Stock
+from utils.math_utils import D
+
+
+def get_signal(stock: Stock, url: str, score: str, symbol: str = "AAPL") -> Stock:
+    article = stock.article.model_copy(update={"url": url})
+    return stock.model_copy(
+        update={"symbol": symbol, "score": D(score), "article": article}
+    )
+
+
+def get_coalescer(window: float = 1, ttl: float = 10) -> StockCoalescer:
+    return StockCoalescer(Queue(), Queue(), window=window, ttl=ttl)
+
+
+def test_coalesces_on_strongest_score(stock: Stock) -> None:
+    coalescer = get_coalescer()
+    coalescer.add(get_signal(stock, "a", "2"), 0)
+    coalescer.add(get_signal(stock, "b", "-7"), 0.5)
+    coalescer.add(get_signal(stock, "c", "5"), 0.9)
+    coalescer.add(get_signal(stock, "d", "1", symbol="MSFT"), 0.9)
+
+    assert coalescer.pop_due(0.99) == []
+    assert [due.score for due in coalescer.pop_due(1)] == [D("-7")]
+    assert [due.symbol for due in coalescer.pop_due(1.9)] == ["MSFT"]
+    assert coalescer.get_timeout(2) == 1
+
+
+def test_drops_duplicates_until_expired(stock: Stock) -> None:
+    coalescer = get_coalescer(window=0, ttl=10)
+    assert coalescer.add(get_signal(stock, "a", "2"), 0)
+    assert not coalescer.add(get_signal(stock, "a", "3"), 5)
+    assert coalescer.add(get_signal(stock, "b", "3"), 5)
+    assert coalescer.add(get_signal(stock, "a", "4"), 10)
+    assert len(coalescer.pop_due(10)) == 1
+    assert len(coalescer.seen) == 2
+
+
+def test_bounded_index(stock: Stock) -> None:
+    coalescer = StockCoalescer(Queue(), Queue(), window=0, ttl=10, max_entries=2)
+    for url in ["a", "b", "c"]:
+        coalescer.add(get_signal(stock, url, "1"), 0)
+    assert list(coalescer.seen) == [("AAPL", "b"), ("AAPL", "c")]
+
+
+def test_run(stock: Stock) -> None:
+    in_queue: Queue[Optional[Stock]] = Queue()
+    out_queue: Queue[Optional[Stock]] = Queue()
+    kill_queue: Queue[Any] = Queue()
+    coalescer = StockCoalescer(in_queue, out_queue, window=0.2)
+    thread = Thread(target=coalescer.run, args=(kill_queue,), daemon=True)
+    thread.start()
+    in_queue.put(get_signal(stock, "a", "1"))
+    in_queue.put(get_signal(stock, "b", "3"))
+
+    assert out_queue.get(timeout=2) == get_signal(stock, "b", "3")
+    kill_queue.put(None)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert out_queue.empty()
@@ -0,0 +1,53 @@
+from decimal import Decimal
+from typing import Any
+from hypothesis import given, settings
+from hypothesis import strategies as st
+import pandas as pd
+
+from algorithems.data_transform import (
+    _get_extremums_iterrows,
+    get_extremums,
+    get_extremums_batch,
+    get_starting_index,
+)
+
+# Few distinct prices so bars often tie with the original price and each other.
+prices = st.integers(min_value=36, max_value=44).map(lambda value: value / 4)
+
+
+@st.composite
+def bars(draw: Any) -> pd.DataFrame:
+    original_price = draw(prices)
+    rows = draw(st.lists(st.tuples(prices, prices, prices), min_size=1, max_size=40))
+    lows = [min(low, high) for low, high, _ in rows]
+    highs = [max(low, high) for low, high, _ in rows]
+    closes = [close for _, _, close in rows]
+    padding = [original_price] * (get_starting_index() + 1)
+    columns = {
+        "low": padding + lows,
+        "high": padding + highs,
+        "close": padding + closes,
+    }
+    if draw(st.booleans()):
+        return pd.DataFrame(
+            {
+                name: [Decimal(str(value)) for value in values]
+                for name, values in columns.items()
+            }
+        )
+    return pd.DataFrame(columns)
+
+
+def get_reference(df: pd.DataFrame) -> list[Decimal]:
+    starting_index = get_starting_index()
+    return _get_extremums_iterrows(
+        df.iloc[starting_index + 1 :], df.iloc[starting_index]["close"]
+    )
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(bars(), min_size=1, max_size=5))
+def test_get_extremums_matches_iterrows(dfs: list[pd.DataFrame]) -> None:
+    references = [get_reference(df) for df in dfs]
+    assert get_extremums_batch(dfs) == references
+    assert get_extremums(dfs[0]) == references[0]
@@ -0,0 +1,77 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+import numpy as np
+import pytest
+
+from algorithems.analysis import RatioStats, get_ratio_stats, pack_evaluation_results
+from controllers.evaluation.evaluate import _load_group_stats
+from controllers.evaluation.groups import split_table_to_groups, update_group_stats
+from models.evaluation import Evaluation, EvaluationResults
+from persistency.evaluation_store import EvaluationStore
+from persistency.group_stats import load_group_stats, save_group_stats
+from utils.math_utils import D
+
+
+def get_results(url: str, data: list[str], score: str = "1.5") -> EvaluationResults:
+    return EvaluationResults(
+        evaluation=Evaluation(
+            datetime=datetime.fromisoformat("2024-01-02T09:30:00-05:00"),
+            score=D(score),
+            symbol="AAPL",
+            url=url,
+        ),
+        data=[D(value) for value in data],
+    )
+
+
+def test_evaluation_store(tmp_path: Path) -> None:
+    path = str(tmp_path / "evaluations.jsonl")
+    store = EvaluationStore(path)
+    first = get_results("a", ["0.0070175438596491", "-0.01"])
+    second = get_results("b", ["0.02"])
+
+    assert store.add([first, first]).to_results() == [first]
+    assert store.add([first, second]).to_results() == [second]
+    with open(path, "a") as store_file:
+        store_file.write('{"url": "c", "sym')
+
+    reloaded = EvaluationStore(path)
+    assert len(reloaded) == 2
+    assert first.evaluation in reloaded
+    assert reloaded.get_table().to_results() == [first, second]
+    assert reloaded.get_table().get_urls() == store.get_table().get_urls()
+
+
+def test_group_stats_round_trip(tmp_path: Path) -> None:
+    path = str(tmp_path / "group_stats.npz")
+    stats = get_ratio_stats(
+        pack_evaluation_results([get_results("a", ["0.03", "-0.02", "0.01"])])
+    )
+
+    assert load_group_stats(path) == {}
+    save_group_stats({3: stats}, path)
+    loaded = load_group_stats(path)
+    assert list(loaded) == [3]
+    assert loaded[3].evaluations_count == stats.evaluations_count
+    for name in ["target_hits", "stop_hits", "last_sums"]:
+        assert np.array_equal(getattr(loaded[3], name), getattr(stats, name))
+
+
+def test_group_stats_of_ungrouped_evaluations_are_kept(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = EvaluationStore(str(tmp_path / "evaluations.jsonl"))
+    store.add([get_results("a", ["0.02"]), get_results("b", ["-0.01"], "-11")])
+    group_stats: dict[int, RatioStats] = {}
+    update_group_stats(group_stats, split_table_to_groups(store.get_table()))
+    saved: list[Any] = []
+    monkeypatch.setattr(
+        "controllers.evaluation.evaluate.load_group_stats", lambda: group_stats
+    )
+    monkeypatch.setattr(
+        "controllers.evaluation.evaluate.save_group_stats", saved.append
+    )
+
+    assert _load_group_stats(store) is group_stats
+    assert saved == []
@@ -0,0 +1,51 @@
+from datetime import datetime
+from decimal import Decimal
+import random
+from dateutil import tz
+import numpy as np
+
+from consts.time_consts import TIMEZONE
+from algorithems.analysis import get_best_ratio
+from controllers.evaluation.groups import split_table_to_groups, split_to_groups
+from models.evaluation import Evaluation, EvaluationResults
+from models.evaluation_table import EvaluationTable, EvaluationTableBuilder
+from utils.math_utils import D
+
+
+def get_evaluations_raw_data(seed: int) -> list[EvaluationResults]:
+    rng = random.Random(seed)
+    return [
+        EvaluationResults(
+            data=[
+                Decimal(repr(rng.uniform(-0.1, 0.1))) for _ in range(rng.randint(1, 6))
+            ],
+            evaluation=Evaluation(
+                datetime=datetime(2021, 1, 1, 9, 30, tzinfo=tz.gettz(TIMEZONE)),
+                score=D(rng.choice(["-2.3", "0.2", "0.7", "2", "9.5", "10", "11"])),
+                symbol=rng.choice(["AAPL", "MSFT"]),
+                url=f"https://www.example.com/{index}",
+            ),
+        )
+        for index in range(40)
+    ]
+
+
+def test_table_round_trip() -> None:
+    evaluations_raw_data = get_evaluations_raw_data(2)
+    table = EvaluationTable.from_results(evaluations_raw_data)
+
+    assert len(EvaluationTableBuilder().build()) == 0
+    assert table.to_results() == evaluations_raw_data
+    rows = np.array([5, 0, 17])
+    assert table.take(rows).to_results() == [evaluations_raw_data[row] for row in rows]
+
+
+def test_split_table_to_groups() -> None:
+    evaluations_raw_data = get_evaluations_raw_data(3)
+    tables = split_table_to_groups(EvaluationTable.from_results(evaluations_raw_data))
+    groups = split_to_groups(evaluations_raw_data)
+
+    assert [table.to_results() for table in tables] == groups
+    for table, group in zip(tables, groups):
+        if len(group) > 0:
+            assert get_best_ratio(table) == get_best_ratio(group)
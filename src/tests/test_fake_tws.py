@@ -0,0 +1,74 @@
+from queue import Queue
+from typing import Any
+
+from benchmarks.fake_tws import FakeTWSServer, connect_app, get_canned_bars
+from consts.trading_consts import MAX_CASH_VALUE
+from ib.app import IBError  # type: ignore
+from ib.scheduler import HistoricalDataRequest, HistoricalDataScheduler
+from ib.wrapper import get_account_usd, get_contract, get_current_stock_price
+from utils.math_utils import D
+from utils.rate_utils import TokenBucket
+
+
+def get_request() -> HistoricalDataRequest:
+    return HistoricalDataRequest(
+        get_contract("AAPL", "SMART"),
+        "20240102 09:32:00 US/Eastern",
+        "7320 S",
+        "5 secs",
+        "TRADES",
+    )
+
+
+def test_requests_over_the_wire() -> None:
+    with FakeTWSServer(latency=0.01, prices={"AAPL": 187.5}) as server:
+        app, thread = connect_app(server)
+
+        assert app.nextValidOrderId == 1
+        assert get_current_stock_price(app, "AAPL", "SMART") == D("187.5")
+        assert get_account_usd(app) == D("100000").min(MAX_CASH_VALUE)
+        df = HistoricalDataScheduler(app).fetch([get_request()])[0]
+        assert df is not None
+        assert df["close"].tolist() == [bar.close for bar in get_canned_bars()]
+
+        fills = Queue[Any]()
+        app.order_router.register(1, fills)
+        app.placeBracketOrder(
+            1, "BUY", 10, 187.5, 190, 185, get_contract("AAPL", "SMART")
+        )
+        statuses = [fills.get(timeout=5)[1]["status"] for _ in range(2)]
+        assert statuses == ["Submitted", "Filled"]
+        assert [order.parent_id for order in server.orders.values()] == [0, 1, 1]
+
+        app.disconnect()
+        thread.join()
+
+
+def test_pacing_violation() -> None:
+    with FakeTWSServer(
+        bars=get_canned_bars(3), historical_data_pacing=TokenBucket(1, 0.001)
+    ) as server:
+        app, thread = connect_app(server)
+        responses = Queue[Any]()
+        for req_id in [1, 2]:
+            app.router.register(req_id, responses)
+            request = get_request()
+            app.reqHistoricalData(
+                req_id,
+                request.contract,
+                request.end_date_time,
+                request.duration,
+                request.bar_size,
+                request.what_to_show,
+                0,
+                1,
+                False,
+                [],
+            )
+
+        replies = dict([responses.get(timeout=5), responses.get(timeout=5)])
+        assert len(replies[1]) == 3
+        assert isinstance(replies[2], IBError) and replies[2].errorCode == 162
+
+        app.disconnect()
+        thread.join()
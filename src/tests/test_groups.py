@@ -0,0 +1,137 @@
+import random
+from datetime import datetime
+from decimal import Decimal
+import pytest
+import ujson
+
+from algorithems.analysis import RatioStats
+from controllers.evaluation.groups import (
+    GroupIndex,
+    get_group_ratios,
+    get_group_ratios_from_stats,
+    split_table_to_groups,
+    split_to_groups,
+    update_group_stats,
+)
+from models.evaluation_table import EvaluationTable
+from models.evaluation import Evaluation, EvaluationResults
+from models.trading import GroupRatio
+from utils.math_utils import D
+
+
+def test_get_group_ratios_parallel_matches_serial() -> None:
+    rng = random.Random(0)
+    evaluations_raw_data = [
+        EvaluationResults(
+            data=[
+                Decimal(repr(rng.uniform(-0.1, 0.1))) for _ in range(rng.randint(1, 6))
+            ],
+            evaluation=Evaluation(
+                datetime=datetime(2021, 1, 1),
+                score=D(rng.choice(["-2.3", "0.2", "0.7", "9.5"])),
+                symbol="AAPL",
+                url=f"www.google.com/{index}",
+            ),
+        )
+        for index in range(12)
+    ]
+    groups = split_to_groups(evaluations_raw_data)
+
+    serial = get_group_ratios(groups, workers=1)
+    parallel = get_group_ratios(groups, workers=2)
+
+    assert len(serial) == 4
+    assert ujson.dumps([group.get_json() for group in parallel]) == ujson.dumps(
+        [group.get_json() for group in serial]
+    )
+
+
+def test_group_ratios_from_stats_match_full_optimisation() -> None:
+    rng = random.Random(1)
+    evaluations_raw_data = [
+        EvaluationResults(
+            data=[
+                Decimal(repr(rng.uniform(-0.1, 0.1))) for _ in range(rng.randint(1, 6))
+            ],
+            evaluation=Evaluation(
+                datetime=datetime(2021, 1, 1),
+                score=D(rng.choice(["-2.3", "0.2", "0.7", "9.5"])),
+                symbol="AAPL",
+                url=f"www.google.com/{index}",
+            ),
+        )
+        for index in range(30)
+    ]
+    group_stats: dict[int, RatioStats] = {}
+    for start in range(0, 30, 10):
+        update_group_stats(
+            group_stats,
+            split_table_to_groups(
+                EvaluationTable.from_results(evaluations_raw_data[start : start + 10])
+            ),
+        )
+    groups = split_to_groups(evaluations_raw_data)
+    tables = split_table_to_groups(EvaluationTable.from_results(evaluations_raw_data))
+
+    assert ujson.dumps(
+        [group.get_json() for group in get_group_ratios_from_stats(tables, group_stats)]
+    ) == ujson.dumps(
+        [group.get_json() for group in get_group_ratios(groups, workers=1)]
+    )
+
+
+def test_split_to_groups_bounds() -> None:
+    scores = ["-10.5", "-10", "-9.5", "-0.0001", "0", "9.4999", "9.5", "10", "11"]
+    evaluations_raw_data = [
+        EvaluationResults(
+            data=[D("0.01")],
+            evaluation=Evaluation(
+                datetime=datetime(2021, 1, 1),
+                score=D(score),
+                symbol="AAPL",
+                url=f"www.google.com/{index}",
+            ),
+        )
+        for index, score in enumerate(scores)
+    ]
+    groups = split_to_groups(evaluations_raw_data)
+
+    assert len(groups) == 40
+    assert [
+        [str(result.evaluation.score) for result in group]
+        for group in groups
+        if len(group) > 0
+    ] == [
+        ["-10.0000"],
+        ["-9.5000"],
+        ["-0.0001"],
+        ["0.0000"],
+        ["9.4999"],
+        ["9.5000", "10.0000", "11.0000"],
+    ]
+
+
+def test_group_index_matches_linear_scan() -> None:
+    groups = [
+        GroupRatio(
+            score_range=(D(lower_bound), D(lower_bound) + D("0.5")),
+            target_profit=D("0.01"),
+            stop_loss=D("-0.01"),
+            average=D("0"),
+            urls=[],
+        )
+        for lower_bound in ["-10", "-9.5", "0", "0.5", "9.5"]
+    ]
+    group_index = GroupIndex(groups)
+
+    for score in ["-10.5", "-10", "-9.25", "-9", "-1", "0", "0.5", "0.75", "10", "11"]:
+        matches = [
+            index
+            for index, group in enumerate(groups)
+            if group.score_range[0] <= D(score) <= group.score_range[1]
+        ]
+        if len(matches) == 0:
+            with pytest.raises(ValueError):
+                group_index.get_index(D(score))
+        else:
+            assert group_index.get_index(D(score)) == matches[0]
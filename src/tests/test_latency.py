@@ -0,0 +1,35 @@
+import random
+
+from logger.latency import LatencyHistogram, LatencyRecorder
+
+
+def test_histogram_percentiles() -> None:
+    rng = random.Random(0)
+    values = [rng.randint(0, 10**9) for _ in range(10000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+
+    assert histogram.count == len(values)
+    assert histogram.max == values[-1]
+    for percentile in [1, 50, 90, 99, 100]:
+        exact = values[round(len(values) * percentile / 100) - 1]
+        assert exact <= histogram.get_percentile(percentile) <= exact * 1.04
+
+
+def test_recorder_stages() -> None:
+    recorder = LatencyRecorder(True)
+    recorder.record({"received": 100, "validated": 400, "ordered": 1400})
+    summary = recorder.get_summary()
+    assert summary["validated"]["max_us"] == 0.3
+    assert summary["ordered"]["max_us"] == 1
+    assert summary["total"]["max_us"] == 1.3
+    assert "parsed" not in summary
+
+    disabled_recorder = LatencyRecorder(False)
+    timestamps: dict[str, int] = {}
+    disabled_recorder.mark(timestamps, "received")
+    disabled_recorder.record({"received": 100, "ordered": 1400})
+    assert timestamps == {}
+    assert disabled_recorder.get_summary() == {}
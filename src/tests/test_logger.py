@@ -0,0 +1,93 @@
+import logging
+from queue import Queue
+import time
+from types import MethodType
+from typing import Any
+
+import pytest
+
+from logger.logger import DiscordHandler, DroppingQueueHandler, LogListener
+from utils.rate_utils import TokenBucket
+
+# conftest stubs emit out for every test, these use the real one.
+discord_emit = DiscordHandler.emit
+
+
+class ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def get_record(message: str, level: int = logging.ERROR) -> logging.LogRecord:
+    return logging.makeLogRecord(
+        {"msg": message, "levelno": level, "levelname": logging.getLevelName(level)}
+    )
+
+
+def test_full_queue_drops_records() -> None:
+    queue_handler = DroppingQueueHandler(Queue[Any](2))
+    handler = ListHandler()
+    handler.setLevel(logging.INFO)
+    listener = LogListener(queue_handler, handler)
+    for message in ["first", "second", "third"]:
+        queue_handler.handle(get_record(message))
+    queue_handler.handle(get_record("debug", logging.DEBUG))
+    assert queue_handler.dropped == 2
+
+    listener.start()
+    listener.stop()
+    assert [record.getMessage() for record in handler.records] == [
+        "Dropped 2 log records",
+        "first",
+        "second",
+    ]
+
+
+def test_discord_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    rate_limit = TokenBucket(1, 10)
+    rate_limit.drain()
+    handler = DiscordHandler(
+        "https://discord.invalid", capacity=2, rate_limit=rate_limit
+    )
+    sent: list[str] = []
+    monkeypatch.setattr(handler, "send", sent.append)
+    for message in ["first", "second", "third"]:
+        discord_emit(handler, get_record(message))
+
+    deadline = time.monotonic() + 5
+    while len(sent) == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    handler.close()
+    assert sent == ["(1 messages dropped)\nsecond\nthird"]
+
+
+def test_discord_batch_size() -> None:
+    handler = DiscordHandler("https://discord.invalid")
+    handler.messages.extend(["a" * 1000, "b" * 1000])
+    assert handler.get_batch() == "a" * 1000
+    assert handler.get_batch() == "b" * 1000
+    assert handler.get_batch() == ""
+
+
+def test_discord_errors_keep_the_listener_running(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    queue_handler = DroppingQueueHandler(Queue[Any]())
+    discord_handler = DiscordHandler("https://discord.invalid")
+    monkeypatch.setattr(
+        discord_handler, "emit", MethodType(discord_emit, discord_handler)
+    )
+    # Formatting fails, like any error emit may run into.
+    discord_handler.setFormatter(logging.Formatter("%(message)s %(missing)s"))
+    handler = ListHandler()
+    listener = LogListener(queue_handler, discord_handler, handler)
+    listener.start()
+    queue_handler.handle(get_record("first"))
+    queue_handler.handle(get_record("second"))
+    listener.stop()
+    assert [record.getMessage() for record in handler.records] == ["first", "second"]
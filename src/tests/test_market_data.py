@@ -0,0 +1,41 @@
+import time
+
+from ib.market_data import MarketDataManager
+from tests.fakes import FakeTWSApp
+from utils.math_utils import D
+
+
+def test_get_price_reads_streamed_quote() -> None:
+    app = FakeTWSApp()
+    market_data = MarketDataManager(app)
+
+    assert market_data.get_price("BB") == D("12")
+    for _ in range(100):
+        streamed_quote = market_data.get_quote("BB")
+        if streamed_quote is not None and streamed_quote.ask is not None:
+            break
+        time.sleep(0.01)
+    requests_count = len(app.market_data_requests)
+
+    assert market_data.get_price("BB") == D("12")
+    quote = market_data.get_quote("BB")
+    assert quote is not None and quote.bid == 11 and quote.ask == 12
+    assert len(app.market_data_requests) == requests_count
+
+    app.quotes["BB"] = quote._replace(ask=20, ask_time=time.time() - 60)
+    assert market_data.get_price("BB") == D("12")
+    assert len(app.market_data_requests) == requests_count + 1
+
+
+def test_subscribe_cancels_least_recently_used() -> None:
+    app = FakeTWSApp()
+    market_data = MarketDataManager(app, max_subscriptions=2)
+
+    market_data.subscribe("A")
+    market_data.subscribe("BB")
+    market_data.subscribe("A")
+    market_data.subscribe("CCC")
+
+    assert list(market_data.subscriptions) == ["A", "CCC"]
+    assert app.cancelled_market_data == [app.market_data_requests[1]]
+    assert app.market_data_requests[1] not in app.quote_subscriptions
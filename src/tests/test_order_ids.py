@@ -0,0 +1,36 @@
+from threading import Thread
+
+import pytest
+
+from ib.order_ids import BRACKET_ORDER_IDS, OrderIdAllocator
+
+
+def test_allocate_blocks() -> None:
+    order_ids = OrderIdAllocator()
+    with pytest.raises(ValueError):
+        order_ids.allocate()
+    order_ids.seed(10)
+    assert order_ids.allocate(BRACKET_ORDER_IDS) == 10
+    assert order_ids.allocate() == 13
+    # A reconnect reporting an id already handed out doesn't reuse it.
+    order_ids.seed(12)
+    assert order_ids.allocate() == 14
+    order_ids.seed(100)
+    assert order_ids.allocate() == 100
+
+
+def test_concurrent_allocations() -> None:
+    order_ids = OrderIdAllocator()
+    order_ids.seed(1)
+    allocated: list[int] = []
+
+    def allocate() -> None:
+        for _ in range(1000):
+            allocated.append(order_ids.allocate(BRACKET_ORDER_IDS))
+
+    threads = [Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(allocated) == list(range(1, 12001, BRACKET_ORDER_IDS))
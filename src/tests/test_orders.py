@@ -0,0 +1,41 @@
+from typing import Any
+
+from ibapi.order import Order
+
+from ib.orders import BRACKET_TEMPLATES, get_bracket_orders
+from utils.math_utils import D
+
+
+def get_order(order_id: int, action: str, order_type: str, parent_id: int) -> Order:
+    order = Order()
+    order.orderId = order_id
+    order.action = action
+    order.orderType = order_type
+    order.totalQuantity = 10
+    order.parentId = parent_id
+    order.transmit = order_type == "STP"
+    order.outsideRth = True
+    return order
+
+
+def get_fields(order: Order) -> dict[str, Any]:
+    fields = dict(vars(order))
+    fields["softDollarTier"] = vars(order.softDollarTier)
+    return fields
+
+
+def test_bracket_orders() -> None:
+    parent, take_profit, stop_loss = get_bracket_orders(
+        7, "SELL", 10, D("9.9"), D("9.5"), D("10.2")
+    )
+    expected_parent = get_order(7, "SELL", "LMT", 0)
+    expected_parent.lmtPrice = D("9.9")
+    expected_take_profit = get_order(8, "BUY", "LMT", 7)
+    expected_take_profit.lmtPrice = D("9.5")
+    expected_stop_loss = get_order(9, "BUY", "STP", 7)
+    expected_stop_loss.auxPrice = D("10.2")
+    assert get_fields(parent) == get_fields(expected_parent)
+    assert get_fields(take_profit) == get_fields(expected_take_profit)
+    assert get_fields(stop_loss) == get_fields(expected_stop_loss)
+    # The templates are left as they were.
+    assert BRACKET_TEMPLATES["SELL"][0].orderId == 0
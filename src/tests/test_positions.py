@@ -0,0 +1,94 @@
+from queue import Queue
+import time
+from typing import Any
+
+import arrow
+from ibapi.message import OUT
+
+from benchmarks.fake_tws import FakeTWSServer, connect_app
+from consts.time_consts import TIMEZONE
+from controllers.trading.positions import PositionManager
+from ib.app import IBapi, IBError  # type: ignore
+from ib.market_data import MarketDataManager
+from ib.order_ids import BRACKET_ORDER_IDS
+from ib.wrapper import get_contract
+from models.trading import Position
+from utils.math_utils import D
+
+
+def get_position(order_id: int, quantity: str = "10") -> Position:
+    return Position(
+        order_id=order_id,
+        symbol="AAPL",
+        quantity=D(quantity),
+        datetime=arrow.now(tz=TIMEZONE).datetime,
+        child_order_ids=(order_id + 1, order_id + 2),
+    )
+
+
+def get_order_status(status: str, filled: str = "0") -> dict[str, Any]:
+    return {"status": status, "filled": D(filled)}
+
+
+def wait_for(condition: Any, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_bracket_lifecycle() -> None:
+    with FakeTWSServer(prices={"AAPL": 100}) as server:
+        app, thread = connect_app(server)
+        manager = PositionManager(app, MarketDataManager(app), max_hold=3600)
+        position = get_position(1)
+        manager.track(position)
+        app.placeBracketOrder(1, "BUY", 10, 100, 101, 99, get_contract("AAPL", "SMART"))
+
+        wait_for(lambda: position.filled == 10)
+        assert manager.get_open() == [position]
+        manager.put((2, get_order_status("Filled", "10")))
+        assert manager.get_open() == []
+        assert manager.positions == {}
+        assert not app.order_router.is_registered(1)
+
+        app.disconnect()
+        thread.join()
+
+
+def test_timed_exit() -> None:
+    with FakeTWSServer(prices={"AAPL": 100}) as server:
+        app, thread = connect_app(server)
+        manager = PositionManager(app, MarketDataManager(app), max_hold=0.2)
+        manager.start()
+        short = get_position(app.order_ids.allocate(BRACKET_ORDER_IDS), "-10")
+        manager.track(short)
+        app.placeBracketOrder(
+            short.order_id, "SELL", 10, 100, 99, 101, get_contract("AAPL", "SMART")
+        )
+        wait_for(lambda: short.filled == 10)
+        # Never filled, so it's cancelled without an exit order.
+        manager.track(get_position(app.order_ids.allocate(BRACKET_ORDER_IDS)))
+
+        # The fake TWS fills the exit order right away.
+        wait_for(lambda: manager.get_open() == [])
+        manager.stop()
+        wait_for(lambda: server.request_counts[OUT.CANCEL_ORDER] == 5)
+        assert short.exit_order_id == 7
+        exit_order = server.orders[7]
+        assert exit_order.action == "BUY" and float(exit_order.limit_price) == 101
+
+        app.disconnect()
+        thread.join()
+
+
+def test_cancelled_bracket() -> None:
+    app = IBapi(Queue[Any]())
+    manager = PositionManager(app, MarketDataManager(app))
+    manager.track(get_position(1))
+    manager.put((1, IBError(1, 201, "Order rejected")))
+    manager.put((3, get_order_status("Cancelled")))
+    assert len(manager.positions) == 3
+    manager.put((1, get_order_status("Cancelled")))
+    assert manager.positions == {}
+    assert not app.order_router.is_registered(3)
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from threading import Thread
+import time
+
+import pytest
+
+from consts.networking_consts import REQUEST_ID_START
+from ib.app import IBError  # type: ignore
+from ib.wrapper import get_account_usd, get_current_stock_price, get_historical_data
+from models.evaluation import Evaluation
+from tests.fakes import FakeTWSApp
+from utils.math_utils import D
+
+
+def test_router_keeps_concurrent_replies_apart() -> None:
+    app = FakeTWSApp()
+    errors: list[str] = []
+
+    def prices(symbol: str) -> None:
+        for _ in range(50):
+            price = get_current_stock_price(app, symbol, "SMART")
+            if price != 10 + len(symbol):
+                errors.append(f"price {symbol} {price}")
+
+    def accounts() -> None:
+        for _ in range(30):
+            if get_account_usd(app) != D("300"):
+                errors.append("account")
+
+    def historical(symbol: str) -> None:
+        evaluation = Evaluation(
+            # Ends in the future so nothing is written to the bars cache.
+            datetime=datetime.now() + timedelta(days=1),
+            score=D("1"),
+            symbol=symbol,
+            url="www.google.com",
+        )
+        for _ in range(10):
+            df = get_historical_data(app, evaluation)
+            if df is None or list(df["close"]) != [float(len(symbol))] * 3:
+                errors.append(f"historical {symbol}")
+
+    def fills() -> None:
+        for order_id in range(100):
+            app.fill(order_id)
+            time.sleep(0.001)
+
+    threads = (
+        [Thread(target=prices, args=(symbol,)) for symbol in ["A", "BB", "CCC"]]
+        + [Thread(target=accounts) for _ in range(2)]
+        + [Thread(target=historical, args=(symbol,)) for symbol in ["DD", "EEE"]]
+        + [Thread(target=fills)]
+    )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert errors == []
+    assert app.router.queues == {} and app.order_router.queues == {}
+    order_ids = [app.queue.get(timeout=5)["order_id"] for _ in range(100)]
+    assert app.queue.empty()
+    assert sorted(order_ids) == list(range(100))
+
+
+def test_informational_errors_dont_end_requests() -> None:
+    app = FakeTWSApp()
+    queue = app.router.register(1)
+    for error_code in [2104, 10167, 399]:
+        app.error(1, error_code, "Warning")
+    assert queue.empty()
+    app.error(1, 200, "No security definition")
+    assert queue.get_nowait() == (1, IBError(1, 200, "No security definition"))
+
+
+def test_order_ids_dont_cross_request_ids() -> None:
+    app = FakeTWSApp()
+    request_queue = app.router.register(REQUEST_ID_START)
+    order_queue = app.order_router.register(REQUEST_ID_START)
+    app.orderStatus(REQUEST_ID_START, "Filled", D(1), D(0), 1.0, 0, 0, 1.0, 1, "", 0.0)
+    app.error(REQUEST_ID_START, 201, "Order rejected")
+    assert request_queue.empty()
+    assert order_queue.get_nowait()[1]["status"] == "Filled"
+    assert order_queue.get_nowait()[1] == IBError(
+        REQUEST_ID_START, 201, "Order rejected"
+    )
+    app.order_router.unregister(REQUEST_ID_START)
+    app.error(REQUEST_ID_START, 200, "No security definition")
+    assert request_queue.get_nowait()[1] == IBError(
+        REQUEST_ID_START, 200, "No security definition"
+    )
+
+
+def test_snapshot_times_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("ib.wrapper.MARKET_DATA_SNAPSHOT_TIMEOUT_SECONDS", 0.2)
+    app = FakeTWSApp()
+    app.silent_symbols.add("A")
+    with pytest.raises(ValueError):
+        get_current_stock_price(app, "A", "SMART")
+    assert app.cancelled_market_data == app.market_data_requests
+    assert app.router.queues == {}
@@ -0,0 +1,92 @@
+from queue import Queue
+from threading import Timer
+from typing import Any
+from ibapi.common import BarData
+from ibapi.contract import Contract
+
+from ib.app import IBapi  # type: ignore
+from ib.scheduler import HistoricalDataRequest, HistoricalDataScheduler
+from utils.rate_utils import TokenBucket
+
+
+class FakeHistoricalApp(IBapi):  # type: ignore
+    """Answers reqHistoricalData from timer threads, out of order."""
+
+    def __init__(self, errors: dict[str, list[int]]) -> None:
+        super().__init__(Queue[Any]())
+        self.historical_data_pacing = TokenBucket(100, 100)
+        self.errors = errors
+        self.requested: list[str] = []
+        self.cancelled: list[int] = []
+
+    def reqHistoricalData(self, reqId: int, contract: Contract, *args: Any) -> None:
+        self.requested.append(contract.symbol)
+        symbol_errors = self.errors.get(contract.symbol, [])
+        if len(symbol_errors) > 0:
+            error_code = symbol_errors.pop(0)
+            if error_code != 0:
+                Timer(0.01, self.error, (reqId, error_code, "error")).start()
+            return
+        Timer(
+            0.05 if contract.symbol == "SLOW" else 0.01,
+            self.reply,
+            (reqId, contract.symbol),
+        ).start()
+
+    def reply(self, reqId: int, symbol: str) -> None:
+        for second in range(3):
+            bar = BarData()
+            bar.date = f"20240102 09:30:0{second} US/Eastern"
+            bar.close = float(len(symbol))
+            self.historicalData(reqId, bar)
+        self.historicalDataEnd(reqId, "", "")
+
+    def cancelHistoricalData(self, reqId: int) -> None:
+        self.cancelled.append(reqId)
+
+
+def get_request(symbol: str) -> HistoricalDataRequest:
+    contract = Contract()
+    contract.symbol = symbol
+    return HistoricalDataRequest(
+        contract=contract,
+        end_date_time="20240102 11:30:00 US/Eastern",
+        duration="7320 S",
+        bar_size="5 secs",
+        what_to_show="MIDPOINT",
+    )
+
+
+def test_scheduler_routes_replies_by_req_id() -> None:
+    app = FakeHistoricalApp({})
+    symbols = ["SLOW", "A", "BB", "CCC", "DDDD"]
+    scheduler = HistoricalDataScheduler(app, max_in_flight=3, timeout=5)
+
+    results = scheduler.fetch([get_request(symbol) for symbol in symbols])
+
+    for symbol, df in zip(symbols, results):
+        assert df is not None
+        assert list(df["close"]) == [float(len(symbol))] * 3
+    assert app.historical_data == {}
+    assert app.router.queues == {}
+
+
+def test_scheduler_retries_errors_and_timeouts() -> None:
+    # 0 never answers, so that request times out.
+    app = FakeHistoricalApp(
+        {"A": [162, 366], "BB": [0], "CCC": [200], "DDDD": [162] * 5}
+    )
+    scheduler = HistoricalDataScheduler(
+        app, max_in_flight=2, timeout=0.2, max_retries=2
+    )
+
+    results = scheduler.fetch(
+        [get_request(symbol) for symbol in ["A", "BB", "CCC", "DDDD"]]
+    )
+
+    assert results[0] is not None and results[1] is not None
+    assert results[2] is None and results[3] is None
+    assert app.requested.count("A") == 3
+    assert app.requested.count("CCC") == 1
+    assert app.requested.count("DDDD") == 3
+    assert len(app.cancelled) == 1
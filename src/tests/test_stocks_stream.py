@@ -0,0 +1,75 @@
+from pathlib import Path
+from typing import Any, Iterator
+from botocore.exceptions import ClientError
+import pytest
+import ujson
+
+from integrations.cloud.s3 import stream_object
+from utils.json_utils import iterate_json_array
+
+STOCKS = [
+    {
+        "evaluations": [
+            {
+                "article_date": "2024-01-02 09:30:00",
+                "article_url": "www.example.com/é",
+                "stocks": [{"symbol": "AAPL", "score": 1.5}],
+            }
+        ]
+    },
+    {"evaluations": []},
+    12,
+    "a ] string, with [ brackets",
+    [1, [2]],
+    None,
+]
+
+
+def get_chunks(data: bytes, size: int) -> Iterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_iterate_json_array(size: int) -> None:
+    data = ujson.dumps(STOCKS, ensure_ascii=False, indent=2).encode("utf-8")
+    assert list(iterate_json_array(get_chunks(data, size))) == STOCKS
+    assert list(iterate_json_array([b"[]"])) == []
+    with pytest.raises(ValueError):
+        list(iterate_json_array(get_chunks(data[:-1], size)))
+
+
+class FakeBody:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[bytes]:
+        return get_chunks(self.data, 5)
+
+
+class FakeObject:
+    key = "stocks.json"
+
+    def __init__(self, data: bytes, etag: str) -> None:
+        self.data = data
+        self.etag = etag
+        self.downloads = 0
+
+    def get(self, IfNoneMatch: str = "") -> dict[str, Any]:
+        if IfNoneMatch == self.etag:
+            raise ClientError({"Error": {"Code": "304"}}, "GetObject")
+        self.downloads += 1
+        return {"Body": FakeBody(self.data), "ETag": self.etag}
+
+
+def test_stream_object_skips_unchanged_download(tmp_path: Path) -> None:
+    cache_path = str(tmp_path / "stocks.json")
+    obj = FakeObject(ujson.dumps(STOCKS).encode("utf-8"), '"1"')
+
+    assert list(iterate_json_array(stream_object(obj, cache_path))) == STOCKS
+    assert list(iterate_json_array(stream_object(obj, cache_path))) == STOCKS
+    assert obj.downloads == 1
+
+    obj.data, obj.etag = b"[1]", '"2"'
+    assert list(iterate_json_array(stream_object(obj, cache_path))) == [1]
+    assert obj.downloads == 2
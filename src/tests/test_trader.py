@@ -0,0 +1,111 @@
+from queue import Queue
+from threading import Thread
+import time
+from typing import Any, Optional
+
+import arrow
+from ibapi.message import OUT
+import pytest
+
+from benchmarks.fake_tws import FakeTWSServer, connect_app
+from consts.time_consts import TIMEZONE
+from controllers.trading import trader
+from controllers.trading.trader import Trader
+from ib.order_ids import OrderIdAllocator
+from models.article import Article
+from models.trading import GroupRatio, Stock
+from utils.math_utils import D
+
+
+def get_stock(symbol: str) -> Stock:
+    return Stock(
+        symbol=symbol,
+        score=D("5"),
+        article=Article(
+            website="CNN",
+            url=f"https://cnn.com/{symbol}",
+            content="",
+            datetime=arrow.now(tz=TIMEZONE).datetime,
+        ),
+    )
+
+
+def get_group() -> GroupRatio:
+    return GroupRatio(
+        score_range=(D("-10"), D("10")),
+        target_profit=D("0.05"),
+        stop_loss=D("-0.02"),
+        average=D("0"),
+        urls=[],
+    )
+
+
+def test_lanes_share_capital(monkeypatch: pytest.MonkeyPatch) -> None:
+    groups = [get_group()]
+    monkeypatch.setattr(trader, "load_groups_from_file", lambda: groups)
+    with FakeTWSServer(
+        prices={"AAPL": 29.5, "MSFT": 7, "GME": 25}, fill_orders=False
+    ) as server:
+        app, thread = connect_app(server)
+        queue: Queue[Optional[Stock]] = Queue()
+        kill_queue: Queue[Any] = Queue()
+        stock_trader = Trader(app, queue, kill_queue)
+        for symbol in ["AAPL", "MSFT", "GME"]:
+            queue.put(get_stock(symbol))
+        trader_thread = Thread(target=stock_trader.main_loop, daemon=True)
+        trader_thread.start()
+
+        deadline = time.monotonic() + 5
+        while not queue.empty() or stock_trader.capital.get_available() > 7:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        kill_queue.put(None)
+        queue.put(None)
+        trader_thread.join()
+
+        # Every lane saw what the others had reserved.
+        positions = stock_trader.positions.get_open()
+        assert len(positions) in [1, 2]
+        while len(server.orders) < 3 * len(positions):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert {order.parent_id for order in server.orders.values()} == {
+            0,
+            *[position.order_id for position in positions],
+        }
+        assert stock_trader.capital.reserved == sum(
+            position.capital for position in positions
+        )
+        assert stock_trader.capital.reserved <= D("500")
+
+        app.disconnect()
+        thread.join()
+
+
+def test_failed_order_releases_capital(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(trader, "load_groups_from_file", lambda: [get_group()])
+    with FakeTWSServer(prices={"AAPL": 29.5}, fill_orders=False) as server:
+        app, thread = connect_app(server)
+        stock_trader = Trader(app, Queue(), Queue())
+
+        # No order ids before nextValidId.
+        app.order_ids = OrderIdAllocator()
+        with pytest.raises(ValueError):
+            stock_trader.trade(get_stock("AAPL"), get_group())
+        assert stock_trader.capital.reserved == 0
+
+        app.order_ids.seed(1)
+
+        def fail(*args: Any) -> None:
+            raise ConnectionError()
+
+        monkeypatch.setattr(app, "placeBracketOrder", fail)
+        with pytest.raises(ConnectionError):
+            stock_trader.trade(get_stock("AAPL"), get_group())
+        assert stock_trader.capital.reserved == 0
+        assert stock_trader.positions.get_open() == []
+
+        stock_trader.account.stop()
+        stock_trader.positions.stop()
+        app.disconnect()
+        thread.join()
@@ -22,11 +22,11 @@ def test_trade_long(
     kill_queue = Queue[Any]()
 
     time.sleep(2)
-    trader = Trader(app, trade_event_queue, app_queue, kill_queue)
+    trader = Trader(app, trade_event_queue, kill_queue)
     trader_thread = Thread(target=trader.main_loop, args=(True,), daemon=True)
     trader_thread.start()
     trade_event_queue.put(stock)
-    while len(trader.open_positions) == 0:
+    while len(trader.positions.get_open()) == 0:
         time.sleep(1)
 
     app.disconnect()
@@ -44,11 +44,11 @@ def test_trade_short(
     kill_queue = Queue[Any]()
 
     time.sleep(2)
-    trader = Trader(app, trade_event_queue, app_queue, kill_queue)
+    trader = Trader(app, trade_event_queue, kill_queue)
     trader_thread = Thread(target=trader.main_loop, args=(True,), daemon=True)
     trader_thread.start()
     trade_event_queue.put(stock_short)
-    while len(trader.open_positions) == 0:
+    while len(trader.positions.get_open()) == 0:
         time.sleep(1)
 
     app.disconnect()
@@ -0,0 +1,69 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+WHITESPACE = " \t\n\r"
+
+
+def iterate_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yields the elements of a top level JSON array as its bytes arrive.
+
+    Only the element being parsed is buffered. An element cut by the end of
+    the buffer fails to decode, so it is retried once the buffer has doubled,
+    which keeps huge elements linear.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    retry_length = 0
+    has_started = False
+    has_ended = False
+    for chunk, is_final in _with_final_flag(chunks):
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=is_final)
+        position = 0
+        if len(buffer) < retry_length and not is_final:
+            continue
+        retry_length = 0
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            if has_ended:
+                raise ValueError("Extra data after the JSON array")
+            if not has_started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                has_started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                # Read the source to its end, letting it finish its work.
+                has_ended = True
+                position += 1
+                continue
+            if buffer[position] == ",":
+                position += 1
+                continue
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if is_final:
+                    raise
+                retry_length = 2 * (len(buffer) - position)
+                break
+            # A number at the end of the buffer may go on in the next chunk.
+            if end == len(buffer) and not is_final:
+                retry_length = 2 * (len(buffer) - position)
+                break
+            yield value
+            position = end
+    if not has_ended:
+        raise ValueError("Unterminated JSON array")
+
+
+def _with_final_flag(chunks: Iterable[bytes]) -> Iterator[tuple[bytes, bool]]:
+    for chunk in chunks:
+        yield chunk, False
+    yield b"", True